@@ -85,7 +85,7 @@ import statsmodels.formula.api as smf
 
 # Als Erstes ist es notwendig, die Fahrzeugdaten von der Webseite Autoscout24 zu crawlen und in einem Dataframe zu speichern. 
 # 
-# Für das Crawlen der Daten wird die Methode *extractPageCarDF* definiert. Dieser muss beim Aufruf die Variable *URL* mitgegeben werden. Dabei handelt es sich um den Link zu einem Autoscout24 Suchergebnis, welches stets 20 Autos beinhaltet (sofern sie den Suchkriterien entsprechen). <br>
+# Für das Crawlen der Daten wird die Methode *extractPageCarDF* im Modul *autoscout24/extract.py* definiert. Dieser muss beim Aufruf die Variable *URL* mitgegeben werden. Dabei handelt es sich um den Link zu einem Autoscout24 Suchergebnis, welches stets 20 Autos beinhaltet (sofern sie den Suchkriterien entsprechen). <br>
 # Jedes Auto wird dabei vom HTML Element *Article* umschlossen. Daher wird eine Schleife implementiert, welche für jedes Auto im Suchergebnis die nachfolgenden Daten aus den dazugehörigen HTML Elementen der Webseite extrahiert: <br>
 # * Titel
 # * Fahrzeugversion
@@ -98,102 +98,61 @@ import statsmodels.formula.api as smf
 # 
 # Eine Besonderheit ist zudem der Preis. Wird das Element *ListItem_pricerow* gefunden, handelt es sich um einen Verkaufspreis und kein Leasingangebot. *Leasing* wird daher False gesetzt. Wird dieses Element nicht gefunden, sondern *LeasingPrice_price*, handelt es sich um ein Leasingangebot.
 # 
-# Diese Daten werden dem Dataframe *pageCarDF* hinzugefügt. 
-# 
-# In einer weiteren Schleife werden die folgenden Fahrzeugdetaildaten aus dem HTML Div Container *VehicleDetailTable* abgezogen: <br>
+# Im selben Durchlauf über das Angebot werden die folgenden Fahrzeugdetaildaten aus dem HTML Div Container *VehicleDetailTable* abgezogen: <br>
 # ![Autoscout24 VehicleDetailTable](VehicleDetailTable.png) <br>
-# Es wird zunächst ein leeres Dataframe *VehicleDetailDF* erstellt.
-# In einer Schleife wird für jedes Fahrzeug die leere Liste *VehicleDetailList* erzeugt und dieser in einer inneren Schleife jedes Element der *VehicleDetailTable* hinzugefügt. <br>
-# Die Liste wird anschließend dem *VehicleDetailDF* hinzugefügt. Hierfür ist ein try except notwendig. Leasing Fahrzeuge haben ein zweites Element namens *VehicleDetailTable*, welches allerdings nur 3 Einträge zum Themengebiet Leasing hat. Der Versuch diese Listen mit 3 Einträgen dem *VehicleDetailDF* hinzuzufügen, läuft aufgrund nicht passender Längen auf Fehler. Dieser Fehler wird im except Block bewusst mit einem Continue abgefangen. Die Leasing *VehicleDetailLists* werden nicht weiter benötigt und fallen somit raus. <br>
+# Für die *VehicleDetailTable* des Fahrzeugs wird die Liste *VehicleDetailList* mit jedem Element der Tabelle erzeugt. Leasing Fahrzeuge haben ein zweites Element namens *VehicleDetailTable*, welches allerdings nur 3 Einträge zum Themengebiet Leasing hat. Diese Listen mit 3 Einträgen werden übersprungen und fallen somit raus. <br>
 # 
-# Nun liegt das *pageCarDF* und das *VehicleDetailDF* vor, welche beide je Fahrzeug eine Zeile beinhalten.<br>
-# Die beiden Dataframes werden mithilfe der merge-Methode über den Index gejoined. <br>
+# Da alle Daten eines Fahrzeugs aus seinem eigenen *article* Element stammen, entsteht je Fahrzeug genau ein Datensatz. Ein Join zweier Dataframes über den Index, bei dem Zeilen verrutschen können, ist nicht notwendig. Fehlt einem Fahrzeug die *VehicleDetailTable*, bleiben nur dessen Detailspalten leer. <br>
 # 
 # Die Methode gibt das Dataframe *pageCarDF* als return value zurück. Dieses beinhaltet alle relevanten Daten von den Fahrzeugen einer Suchergebnisseite (in der Regel 20 Fahrzeuge).
 
 # In[4]:
 
 
-def extractPageCarDF(URL):
-
-    soup=BeautifulSoup(requests.get(URL).text,"html.parser")
-    pageCarDF=pd.DataFrame()
-
-    for car in soup.findAll("article"):
-        data = car.find("div", {"class": lambda L: L and L.startswith("ListItem_wrapper")})
-        try:
-            header = data.find("h2").text
-        except:
-            header = np.NaN
-        try:
-            version = data.find("span", {"class": lambda L: L and L.startswith("ListItem_version")}).text
-        except:
-            version = np.NaN
-        try:
-            subtitle = data.find("span", {"class": lambda L: L and L.startswith("ListItem_subtitle")}).text
-        except:
-            subtitle = np.NaN
-        try:
-            #Versuch Preis Element zu finden
-            price = data.find("div", {"class": lambda L: L and L.startswith("ListItem_pricerow")}).text
-            leasing = False
-        except:
-            #wenn oberes Element nicht gefunden werden kann, handelt es sich um einen Leasing Wagen, mit dem nachfolgenden HTML Element
-            price = data.find("span", {"class": lambda L: L and L.startswith("LeasingPrice_price")}).text
-            leasing = True 
-
-        try:
-            location = car.find("span", {"style": lambda L: L and L.startswith("grid-area:address")}).text
-        except:
-            location = np.NaN
-
-        #Daten dem pageCarDF hinzufügen
-        pageCarDF = pageCarDF.append({"Titel":header, "Version":version, "Untertitel":subtitle, "Preis":price, "Leasing":leasing, "Standort":location}, ignore_index=True)
-
-
-    #VehicleDetailTable
-    VehicleDetailDF = pd.DataFrame()
-    for car in soup.findAll("div" , {"class":"VehicleDetailTable_container__mUUbY"}):
-        VehicleDetailList = []
-        for c in car:
-            VehicleDetailList.append(c.text)
-        try:
-            VehicleDetailDF = VehicleDetailDF.append({"km":VehicleDetailList[0], "Erstzulassung":VehicleDetailList[1], "PS":VehicleDetailList[2], "Zustand":VehicleDetailList[3], "Fahrzeughalter":VehicleDetailList[4], "Getriebe":VehicleDetailList[5], "Kraftstoff": VehicleDetailList[6], "Verbrauch_l_pro_100km":VehicleDetailList[7], "Emissionen_g_pro_km":VehicleDetailList[8]}, ignore_index=True)
-        except:
-            continue #VehicleDetailLists mit Länge 3 sind extra VehicleDetailTables, die nur bei Leasing Wagen vorkommen. Diese sollen nicht übernommen werden, daher Continue
-    
-    #Join pageCarDF und VehicleDetailDF
-    pageCarDF = pd.merge(pageCarDF, VehicleDetailDF, left_index=True, right_index=True)   
-
-    return pageCarDF
+from autoscout24 import extractPageCarDF, crawlAutoDF, CrawlerSession, ResponseCache, CrawlJournal, AimdLimiter, PageArchive, CrawlMetrics
 
 
 # Die Methode extractPageCarDF gilt es nun mit den passenden Parametern aufzurufen. 
 # 
-# Es werden zunächst zwei leere Dataframes initialisiert. <br>
 # Die Suche auf Autoscout24 wurde zunächst komplett ohne Filter aufgerufen. Pro Suchergebnis gibt die Webseite ingesamt 20 Suchergebnisseiten mit jeweils 20 Fahrzeugen aus. Somit können mit einer Suche maximal 20 * 20 = 400 Autos von der Webseite gecrawlt werden. <br>
 # Da für die Analysen im Projekt mehr als 400 Datensätze gewünscht sind, wird ein Filter "Erstzulassung von" (*fregfrom*) und "Erstzulassung bis" (*fregto*) gesetzt. Die Jahreszahlen werden in der Liste *fregList* von 1990 bis 2022 in 1 Jahresschritten gewählt. 
 # 
-# In einer Schleife wird zunächst der Filter auf die jeweilige Jahreszahl gesetzt. In einer inneren Schleife wird jeweils die Ergebnisseite der Suche festgelegt. Somit werden pro Iteration der äußeren Schleife 20 Seiten des Suchergebnisses gecrawlt. <br>
-# Dafür wird zunächst die URL aus "Erstzulassung von" *fregfrom=* , "Erstzulassung bis" *fregto=* und Suchergebnisseite *page* erstellt. Die URL wird an die Methode extractPageCarDF übergeben und diese ausgeführt. <br>
-# Das resultierende Dataframe pageCarDF mit 20 Fahrzeugen wird dem Dataframe AutoDFraw angehängt. Anschließend wird die Methode für die nächste Seite im Suchergebnis ausgeführt und das Ergebnis wieder AutoDFraw hinzufügt. <br>
-# Dataframe pageCarDF wird somit bei jeder Ausführung der Methode extractPageCarDF neu erstellt, während Dataframe AutoDFraw immer weiter wächst. 
+# Für jede Jahreszahl und jede der 20 Ergebnisseiten wird die URL aus "Erstzulassung von" *fregfrom=* , "Erstzulassung bis" *fregto=* und Suchergebnisseite *page* erstellt. <br>
+# Die Methode *crawlAutoDF* (Modul *autoscout24/crawl.py*) ruft diese Seiten nicht nacheinander, sondern nebenläufig mit asyncio ab. Über *maxConcurrency* wird die Anzahl gleichzeitiger Requests begrenzt, über *perHostLimit* die Anzahl gleichzeitiger Requests an denselben Host, um die Webseite nicht zu überlasten. <br>
+# Statt einer festen Anzahl gleichzeitiger Requests passt der *AimdLimiter* (Modul *autoscout24/ratecontrol.py*) die Nebenläufigkeit während des Crawls an: Solange Latenz und Fehlerrate unauffällig sind, wird sie schrittweise erhöht, bei Statuscode 429, Timeouts oder steigender Latenz halbiert. Die aktuelle Nebenläufigkeit sowie p50- und p95-Latenz können jederzeit über *crawler.metrics()* abgefragt werden. <br>
+# Alle Requests laufen über eine gemeinsame *CrawlerSession* (Modul *autoscout24/session.py*). Diese verwendet Verbindungen wieder, bricht hängende Requests nach einem Timeout ab und wiederholt Requests bei Statuscode 429 und 5xx mit exponentiellem Backoff. <br>
+# Damit bei einer erneuten Ausführung des Notebooks nicht alle Seiten neu heruntergeladen werden müssen, speichert der *ResponseCache* (Modul *autoscout24/cache.py*) die Seiten komprimiert in der Datei *autoscout24_cache.sqlite*. Seiten, die jünger als ein Tag sind, werden direkt aus dem Cache gelesen, ältere Seiten werden per ETag/If-Modified-Since beim Server angefragt und nur bei Änderungen neu übertragen. <br>
+# Nicht jedes Jahr hat 400 oder mehr Angebote. Daher wird je Jahreszahl zuerst die erste Seite abgerufen und aus der Überschrift ("1.234 Angebote") die Anzahl der tatsächlich vorhandenen Seiten bestimmt. Fehlt diese Angabe, wird so lange weitergeblättert, bis eine Seite leer ist oder die vorherige Seite wiederholt. Die Zusammenfassung am Ende zeigt, wie viele Requests dadurch eingespart wurden. <br>
+# Jede fertig verarbeitete Seite wird zusätzlich im *CrawlJournal* (Modul *autoscout24/journal.py*, Datei *autoscout24_journal.sqlite*) gespeichert. Bricht der Crawl ab, kann die Zelle einfach erneut ausgeführt werden: bereits erledigte Seiten werden aus dem Journal übernommen und der Crawl wird an der abgebrochenen Stelle fortgesetzt. Für einen komplett neuen Crawl wird das Journal mit *journal.clear()* geleert. <br>
+# Das Laden und das Parsen der Seiten laufen in getrennten Stufen: Geladene Seiten werden über eine begrenzte Warteschlange an *parseWorkers* Prozesse übergeben, die das CPU-lastige Parsen parallel übernehmen. <br>
+# Mit *parser="lxml"* wird statt BeautifulSoup ein Parser auf Basis von lxml verwendet (Modul *autoscout24/lxmlparse.py*), der dieselben Daten etwa drei- bis viermal schneller extrahiert. Noch schneller ist *parser="nextdata"* (Modul *autoscout24/nextdata.py*): Die Seiten von Autoscout24 werden mit Next.js erzeugt und enthalten alle Angebote zusätzlich als JSON im Script *__NEXT_DATA__*. Dieses wird ohne Aufbau des DOM gelesen und direkt auf die Spalten des pageCarDF abgebildet; nur wenn es fehlt, wird der lxml-Parser verwendet. Die Übereinstimmung aller Parser lässt sich mit *python -m benchmarks.bench_parsers* prüfen, Geschwindigkeit und Speicherbedarf auf normalen, leasing-lastigen und unvollständigen Seiten mit *python -m benchmarks.bench_corpus* gegen die gespeicherte Baseline. <br>
+# Jede Seite wird wie bei der Methode extractPageCarDF verarbeitet. Statt jede Seite als eigenes Dataframe mit *pd.concat* anzuhängen, was bei jedem Aufruf das gesamte bisherige Dataframe kopiert, sammelt ein *RecordBuilder* (Modul *autoscout24/records.py*) die Fahrzeuge aller Seiten spaltenweise in der Reihenfolge von Jahreszahl und Suchergebnisseite. Das Dataframe AutoDFraw wird erst am Ende einmalig erzeugt. <br>
+# Während des Blätterns verschieben sich die Suchergebnisse, sodass dasselbe Fahrzeug auf zwei Seiten erscheinen kann. Jedes Angebot erhält daher die Spalte *listing_id* aus dem Attribut *id* seines *article* Elements. Vor dem Parsen einer Seite werden die IDs per Textsuche ermittelt; bereits gecrawlte Angebote werden übersprungen und nicht doppelt übernommen. Die Zusammenfassung zeigt den Anteil doppelter Angebote. Mit einem *SeenStore* mit Datei (Modul *autoscout24/seen.py*) bleiben die IDs zusammen mit dem Journal auch über einen Abbruch hinweg erhalten. <br>
+# Wird dem Crawler ein *PageArchive* übergeben (Modul *autoscout24/archive.py*), wird jede geladene Seite zstd-komprimiert im Verzeichnis *autoscout24_archive* archiviert. Ändert Autoscout24 die CSS-Klassen, muss nur der Parser angepasst werden: *replayArchive("autoscout24_archive")* verarbeitet alle archivierten Seiten ohne Netzwerkzugriff auf allen CPU-Kernen erneut zum AutoDFraw. <br>
+# Soll der Crawl nicht komplett im Arbeitsspeicher gehalten werden, liefert *iterListings(fregList, pages)* die Fahrzeuge jeder fertigen Seite einzeln. Mit *crawlToParquet(fregList, "AutoDF_raw.parquet")* werden sie fortlaufend in Row Groups fester Größe in eine Parquet-Datei geschrieben (Modul *autoscout24/parquet.py*). <br>
+# Mit *metrics=CrawlMetrics("autoscout24_metrics")* (Modul *autoscout24/metrics.py*) erfasst der Crawler für jeden Request die Dauer von DNS-Auflösung, Verbindungsaufbau, Time to First Byte und Download sowie die Größe der Seite, außerdem Parse-Zeit und Anzahl Fahrzeuge je Seite. Die Histogramme werden am Ende des Crawls als *autoscout24_metrics.prom* (Textformat von Prometheus) und *autoscout24_metrics.json* gespeichert. Ohne *metrics* wird nichts gemessen.
 # 
 # Die Methode wird für jeden Filter "Erstzulassung bis" für 20 Suchergebnisseiten ausgeführt, sodass das Dataframe AutoDFraw am Ende über 6000 Einträge enhält.
 
 # In[5]:
 
 
-AutoDFraw=pd.DataFrame()
-pageCarDF=pd.DataFrame()
 baselink = "https://www.autoscout24.de/lst?fregfrom="
 fregList = list(range(1990, 2022, 1))
 
-for freg in fregList:
-    for page in range(20):
-        URL = baselink + str(freg) + "&fregto=" + str(freg) + "&page=" + str(page)
-        pageCarDF = extractPageCarDF(URL)
-        AutoDFraw=pd.concat([AutoDFraw, pageCarDF],axis=0, ignore_index=True)
+#Seiten aus dem Cache lesen, sofern sie sich nicht geändert haben
+session = CrawlerSession(poolSize=8, cache=ResponseCache("autoscout24_cache.sqlite", ttl=24*3600))
+#erledigte Seiten speichern, um einen abgebrochenen Crawl fortsetzen zu können
+journal = CrawlJournal("autoscout24_journal.sqlite")
+
+#Nebenläufigkeit adaptiv zwischen 1 und 8 gleichzeitigen Requests
+limiter = AimdLimiter(initial=4, maxLimit=8)
+#geladene Seiten archivieren, um sie später ohne Netzwerk neu parsen zu können
+archive = PageArchive("autoscout24_archive")
+#Zeiten und Größen der Requests als Histogramme exportieren
+metrics = CrawlMetrics("autoscout24_metrics")
+
+AutoDFraw = crawlAutoDF(fregList, pages=20, baselink=baselink, maxConcurrency=8, perHostLimit=8, session=session, journal=journal, limiter=limiter, parseWorkers=4, parser="nextdata", archive=archive, metrics=metrics)
 
 
 # In[67]:
@@ -227,24 +186,46 @@ conn_str ='postgresql://%s:%s@localhost:5432/%s'%(conf["user"], conf["passw"],co
 engine = create_engine(conn_str)
 
 
-# Das Dataframe wird nun in der Tabelle *autoscout24cars* in postgre SQL gespeichert, sofern die Tabelle noch nicht vorhanden ist. 
+# Das Dataframe wird nun in der Tabelle *autoscout24cars* in postgre SQL gespeichert. <br>
+# Statt mit *to_sql*, das jede Zeile als eigenes INSERT sendet, werden die Zeilen mit *copyLoad* (Modul *autoscout24/db.py*) als CSV per *COPY ... FROM STDIN* in Batches innerhalb einer Transaktion übertragen. Das ist um ein Vielfaches schneller (*python -m benchmarks.bench_load*). Statt des Dataframes kann auch direkt *iterListings(fregList)* übergeben werden. <br>
+# Damit auch spätere Crawls gespeichert werden können, ohne die Tabelle zu löschen, lädt *upsertLoad* den Crawl zunächst per COPY in eine temporäre Tabelle und übernimmt ihn anschließend mit *INSERT ... ON CONFLICT (listing_id) DO UPDATE*: Neue Angebote werden angehängt, Angebote mit geänderten Werten aktualisiert und unveränderte Angebote nicht angefasst. Existiert die Tabelle noch nicht, wird sie angelegt; ein eindeutiger Index auf *listing_id* wird bei Bedarf erstellt. Die Ausgabe zeigt die Anzahl eingefügter, aktualisierter und unveränderter Zeilen sowie die Dauer.
 
 # In[28]:
 
 
-if not engine.has_table("autoscout24cars"):
-    AutoDFraw.to_sql(name='autoscout24cars',index=True, index_label='index',con=engine)
-else:
-    print("table already exists")
+from autoscout24.db import upsertLoad
+
+print(upsertLoad(engine, AutoDFraw, "autoscout24cars"))
+
+
+# Die so angelegte Tabelle hat nur einen Index auf der Spalte *index*, jede Abfrage nach Marke oder Preis liest daher die komplette Tabelle. Mit *migrateSchema* wird sie einmalig in ein verwaltetes Schema überführt: eine Partition je Jahr der Erstzulassung, zusätzliche Spalten *Marke*, *Preis_EUR* (Kaufpreis als Zahl) und *crawled_at* sowie Indizes auf Marke, Kraftstoff, Getriebe, Preis und Crawlzeitpunkt. *upsertLoad* füllt diese Spalten danach bei jedem neuen Crawl (*python -m benchmarks.bench_schema*).
+
+# In[ ]:
+
+
+#from autoscout24.db import migrateSchema
+#print(migrateSchema(engine, "autoscout24cars"))
+
+
+# Ist die Tabelle bereits gefüllt, muss für eine tägliche Aktualisierung nicht der komplette Crawl erneut gespeichert werden. Im inkrementellen Modus (Modul *autoscout24/db.py*) werden listing_id und Preis der gespeicherten Angebote gelesen und je Jahreszahl nur so lange weitergeblättert, bis eine Seite ausschließlich bekannte, unveränderte Angebote enthält. Neue Angebote werden eingefügt, geänderte Preise aktualisiert und die Anzahl der Änderungen ausgegeben. Beides läuft über *upsertLoad*, sodass in der migrierten Tabelle auch *Jahr*, *Marke*, *Preis_EUR* und *crawled_at* gesetzt werden.
+
+# In[ ]:
+
+
+#from autoscout24.db import crawlIncremental
+#deltaDF, delta = crawlIncremental(engine, fregList, pages=20, baselink=baselink, session=session, parser="nextdata")
 
 
-# Als Alternative zu SQL können die Daten in Excel gespeichert und wieder eingelesen werden um einen gleichbleibenden Datenstand zur Analyse zu gewährleisten: <br>
+# Als Alternative zu SQL können die Daten als Datei gespeichert und wieder eingelesen werden um einen gleichbleibenden Datenstand zur Analyse zu gewährleisten: <br>
+# Statt in Excel werden sie mit *writeDataset* (Modul *autoscout24/dataset.py*) als Parquet-Datensatz im Verzeichnis *AutoDF_raw* gespeichert, aufgeteilt in ein Unterverzeichnis je Erstzulassungsjahr (*Jahr=2016*). Das Schema ist fest vorgegeben, sodass alle Datentypen beim Einlesen erhalten bleiben. <br>
 # Diese Codezeile ist hier auskommentiert, um das Backup nur bewusst überschreiben zu können.
 
 # In[ ]:
 
 
-#AutoDFraw.to_excel("AutoDF_raw.xlsx")
+from autoscout24.dataset import writeDataset, readDataset, cleanSchema, writeFeather, readFeather
+
+#writeDataset(AutoDFraw, "AutoDF_raw")
 
 
 # Die Fahrzeugdaten von Autoscout24 wurden erfolgreich abgezogen und in einem Dataframe gespeichert. Allerdings entsprechen viele Spalten noch nicht dem gewünschten Format, da beispielsweise Sonderzeichen enthalten sind oder numerische Werte nicht als solche erkannt werden. <br>
@@ -259,12 +240,28 @@ AutoDF = pd.read_sql_query('SELECT * FROM autoscout24cars',engine, index_col="in
 AutoDF
 
 
-# Alternativ können die Daten auch aus dem mitgelieferten Excel geladen werden. Um bei der Analyse die selben Ergebnisse zu gewährleisten, empfehlen wir diese Methode:
+# Enthält die Tabelle sehr viele Angebote, muss sie nicht komplett in den Arbeitsspeicher geladen werden: *readChunks* (Modul *autoscout24/db.py*) liest sie über einen Cursor auf dem Datenbankserver in Dataframes von je 50.000 Zeilen. Dabei werden nur die benötigten Spalten übertragen und Leasing-Angebote schon in SQL entfernt. Die Bereinigung aus dem folgenden Kapitel (*cleanChunks*, Modul *autoscout24/clean.py*) und Kennzahlen wie der Durchschnittspreis je Marke (*ChunkAggregate*) werden dann Chunk für Chunk berechnet.
+
+# In[ ]:
+
+
+#from autoscout24.db import readChunks
+#from autoscout24.clean import cleanChunks, ChunkAggregate, SOURCE_COLUMNS, NO_LEASING
+#PreisProMarke = ChunkAggregate("Marke", "Preis", ["count", "mean", "median"])
+#for chunk in cleanChunks(readChunks(engine, "autoscout24cars", columns=SOURCE_COLUMNS, where=NO_LEASING)):
+#    PreisProMarke.add(chunk)
+#PreisProMarke.result()
+
+
+# Alternativ können die Daten auch aus dem mitgelieferten Datensatz geladen werden. Um bei der Analyse die selben Ergebnisse zu gewährleisten, empfehlen wir diese Methode. <br>
+# Anders als beim Excel wird dabei kein XML geparst, sondern nur die gespeicherten Spalten gelesen. Über *columns* lassen sich einzelne Spalten und über *filters* bestimmte Jahre laden, z.B. *readDataset("AutoDF_raw", columns=["Titel", "Preis"], filters=[("Jahr", ">=", 2015)])*; nicht benötigte Jahresverzeichnisse werden dann gar nicht gelesen (*python -m benchmarks.bench_dataset*). <br>
+# Liegt der mitgelieferte Datensatz noch als *AutoDF_raw.xlsx* vor, wird er einmalig mit der auskommentierten Zeile in den Parquet-Datensatz *AutoDF_raw* umgewandelt (benötigt das Paket *openpyxl*). Die Spalte *listing_id* gab es beim Speichern des Excel noch nicht; sie wird leer ergänzt.
 
 # In[201]:
 
 
-AutoDF=pd.read_excel("AutoDF_raw.xlsx",index_col=0)
+#writeDataset(pd.read_excel("AutoDF_raw.xlsx", index_col=0), "AutoDF_raw")
+AutoDF = readDataset("AutoDF_raw")
 
 
 # ## Feature Engineering
@@ -423,7 +420,7 @@ AutoDF['Navigationssystem'] = AutoDF['Navigationssystem'].replace(np.NaN, False)
 AutoDF.head()
 
 
-# In der Spalte *Leasing* werden die Werte noch mit 0.0 für False und 1.0 für True ausgegeben. Dies wird in Boolean Werte geändert.
+# Beim Einlesen aus Excel wurden die Werte der Spalte *Leasing* noch mit 0.0 für False und 1.0 für True ausgegeben. Aus dem Parquet-Datensatz wird die Spalte bereits als Boolean geladen; für ältere Daten werden die Werte hier weiterhin in Boolean Werte geändert.
 
 # In[215]:
 
@@ -554,23 +551,33 @@ AutoDF['Verbrauch_l_pro_100km'] = AutoDF['Verbrauch_l_pro_100km'].astype('float'
 AutoDF.info()
 
 
-# Die bereinigten Daten können an dieser Stelle optional noch einmal in einer neuen Tabelle in postgre SQL gesichert werden.
+# Die bereinigten Daten können an dieser Stelle optional noch einmal in einer neuen Tabelle *autoscout24cars_clean* in postgre SQL (mit *types=CLEAN_SQL_TYPES*, damit die numerischen Spalten nicht als Text angelegt werden) oder als Parquet-Datensatz *AutoDF_clean* mit dem Schema der bereinigten Spalten gesichert werden.  
+# Für die Analyse in mehreren Notebooks bzw. Prozessen gleichzeitig eignet sich zusätzlich die unkomprimierte Arrow-Datei *AutoDF_clean.arrow*: *readFeather("AutoDF_clean.arrow")* öffnet sie per Memory Map, die numerischen Spalten werden nicht kopiert und alle Prozesse teilen sich dieselben Seiten im Arbeitsspeicher (*python -m benchmarks.bench_mmap*).
 
 # In[228]:
 
 
-#if not engine.has_table("autoscout24cars-cleaned"):
-#    AutoDF.to_sql(name='autoscout24cars-cleaned',index=True, index_label='index',con=engine)
-#else:
-#    print("table already exists")
+#from autoscout24.db import copyLoad, CLEAN_SQL_TYPES
+#copyLoad(engine, AutoDF, "autoscout24cars_clean", ifExists="replace", types=CLEAN_SQL_TYPES)
+#writeDataset(AutoDF, "AutoDF_clean", cleanSchema())
+#writeFeather(AutoDF, "AutoDF_clean.arrow")
 
 
 # ## Datenanalyse
 
-# **Hinweis**: Die folgende Analyse basiert auf den in der mitgelieferten Excel Liste gespeicherten Daten. Diese wurden am 12.09.2022 mit der oben aufgeführten Methode gecrawlt.  
+# **Hinweis**: Die folgende Analyse basiert auf den im mitgelieferten Datensatz (ursprünglich Excel Liste) gespeicherten Daten. Diese wurden am 12.09.2022 mit der oben aufgeführten Methode gecrawlt.  
 # Wenn das komplette Notebook mit Crawling neu ausgeführt wird, können daher unterschiedliche Ergebnisse entstehen (bspw. Anteil Automarken).  
 # 
-# Wir empfehlen daher, mit der mitgelieferten Excel Liste zu arbeiten (Methode zum einlesen siehe oben).
+# Wir empfehlen daher, mit dem mitgelieferten Datensatz zu arbeiten (Methode zum einlesen siehe oben).
+
+# Die Kennzahlen der folgenden Analyse (z.B. Median-Preis je Marke) können statt in pandas auch direkt dort berechnet werden, wo die bereinigten Daten gespeichert sind: Der *Aggregator* (Modul *autoscout24/aggregate.py*) übersetzt die Gruppierungen in SQL und führt sie mit DuckDB auf dem Parquet-Datensatz *AutoDF_clean* oder in postgre SQL auf der Tabelle *autoscout24cars_clean* aus. Übertragen wird nur das Ergebnis mit einer Zeile je Gruppe (wenige Kilobyte statt des kompletten Dataframes); die Ergebnisse haben dieselbe Form wie bei pandas, sodass die Plots unverändert bleiben. Die Alternativen stehen jeweils auskommentiert in den Zellen (*python -m benchmarks.bench_aggregate*). Die unten entfernten Datensätze ohne Getriebe werden über *where* ausgeschlossen.
+
+# In[ ]:
+
+
+#from autoscout24.aggregate import Aggregator
+#AutoAgg = Aggregator.duckdb("AutoDF_clean", where="\"Getriebe\" NOT LIKE '%- (Getriebe)%'")
+#AutoAgg = Aggregator.postgres(engine, "autoscout24cars_clean", where="\"Getriebe\" NOT LIKE '%- (Getriebe)%'")
 
 # ### Vorbereitung & allgemeine Untersuchung des DF
 
@@ -646,6 +653,7 @@ for col in AutoDF.columns:
 
 
 print(AutoDF['Kraftstoff'].value_counts())
+#print(AutoAgg.valueCounts('Kraftstoff'))
 
 
 # Die häufigste Kraftstoffart ist Benzin, gefolgt von Diesel. <br>
@@ -681,6 +689,7 @@ print(AutoDF['Getriebe'].value_counts())
 
 
 print(AutoDF['Marke'].value_counts(normalize=True))
+#print(AutoAgg.valueCounts('Marke', normalize=True))
 
 
 # Die häufigste in unserem Abzug vorkommende Automarke ist Audi, dicht gefolgt von von BMW und Mercedes-Benz. <br>
@@ -823,6 +832,7 @@ fig.show()
 
 #sortieren der Marken nach Durchschnittspreis
 sorted_nb = AutoDF.groupby(['Marke'])['Preis'].median().sort_values()
+#sorted_nb = AutoAgg.groupby(['Marke'], 'Preis', 'median').sort_values()
 #sorted_nb
 
 
@@ -872,6 +882,7 @@ for var, subplot in zip(Austtattung, ax.flatten()):
 
 # Gruppieren des DF nach Kraftstoff mit durschnittlichem Preis
 PriceAveragePerKraftstoff=AutoDF.groupby(by="Kraftstoff")["Preis"].mean()
+#PriceAveragePerKraftstoff=AutoAgg.groupby("Kraftstoff", "Preis", "mean")
 # Erzeugen des Bar Plots mit den zuvor erzeugten Gruppierungen
 PriceAveragePerKraftstoff.plot(kind="bar",figsize=(12,6),color="m",title="Durschnittlicher Preis nach Kraftstoff")
 
@@ -946,6 +957,7 @@ fig.show()
 
 
 MarkenGruppiert=AutoDF.groupby(by="Marke").mean()
+#MarkenGruppiert=AutoAgg.groupby("Marke")
 #MarkenGruppiert
 
 
@@ -966,6 +978,7 @@ fig.show()
 
 #sortieren der Marken nach Durchschnitts PS
 sorted_ps = AutoDF.groupby(['Marke'])['PS'].median().sort_values()
+#sorted_ps = AutoAgg.groupby(['Marke'], 'PS', 'median').sort_values()
 #Anpassen der Größe des Plots
 sns.set(rc={'figure.figsize':(15,15)})
 #Erzeugen des Plots
@@ -978,6 +991,7 @@ sns.boxplot(x=AutoDF['PS'], y=AutoDF['Marke'], order=list(sorted_ps.index),orien
 
 
 sorted_verbrauch = AutoDF.groupby(['Marke'])['Verbrauch_l_pro_100km'].median().sort_values()
+#sorted_verbrauch = AutoAgg.groupby(['Marke'], 'Verbrauch_l_pro_100km', 'median').sort_values()
 sorted_verbrauch
 
 
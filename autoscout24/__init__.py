@@ -0,0 +1,13 @@
+"""Webcrawling der Gebrauchtwagenangebote von Autoscout24."""
+
+from .extract import PARSERS, extractPageCarDF, parsePageCarDF
+from .records import RecordBuilder
+from .crawl import BASELINK, Crawler, CrawlSummary, buildURL, crawlAutoDF, iterListings
+from .session import CrawlerSession, FetchResult, defaultSession
+from .cache import ResponseCache
+from .journal import CrawlJournal
+from .seen import SeenStore
+from .ratecontrol import AimdLimiter
+from .metrics import CrawlMetrics
+from .parquet import ParquetSink, crawlToParquet
+from .archive import PageArchive, replayArchive
@@ -0,0 +1,161 @@
+"""Kennzahlen der Datenanalyse als SQL in PostgreSQL oder DuckDB statt in pandas.
+
+Der :class:`Aggregator` übersetzt Gruppierungen wie
+``AutoDF.groupby("Marke")["Preis"].median()`` oder ``value_counts`` in eine
+SQL-Abfrage und führt sie entweder in PostgreSQL auf der Tabelle des
+bereinigten AutoDF oder mit DuckDB direkt auf dem Parquet-Datensatz
+*AutoDF_clean* aus. Zum Client wird nur das Ergebnis mit einer Zeile je Gruppe
+übertragen, in derselben Form wie bei pandas, sodass die Plots unverändert
+bleiben.
+"""
+
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from .dataset import INDEX_COLUMN, PARTITION_COLUMN
+
+try:
+    import duckdb
+except ImportError:  # pragma: no cover - duckdb ist optional
+    duckdb = None
+
+#Kennzahl -> SQL-Ausdruck, {column} ist die Spalte
+STATS = {"count": "COUNT({column})", "sum": "SUM({column})", "mean": "AVG({column})", "min": "MIN({column})",
+         "max": "MAX({column})", "std": "STDDEV_SAMP({column})",
+         "median": "PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY {column})"}
+#Datentypen, die wie bei pandas als numerisch gelten (bool zählt bei groupby().mean() mit)
+INTEGER = ("smallint", "integer", "bigint", "boolean")
+NUMERIC = INTEGER + ("real", "double", "double precision", "float", "numeric", "decimal")
+#Kennzahlen, die wie bei pandas als Fließkommazahl berechnet werden
+FLOAT_STATS = ("mean", "std", "median")
+
+
+class Aggregator:
+    """Führt gruppierte Kennzahlen auf *source* in PostgreSQL oder DuckDB aus.
+
+    Statt des Konstruktors :meth:`postgres` bzw. :meth:`duckdb` verwenden.
+    *where* ist eine Bedingung in SQL, die für alle Abfragen gilt, z.B. um
+    dieselben Zeilen wie im Notebook zu entfernen.
+    """
+
+    def __init__(self, execute, source, types, where=None):
+        self._execute = execute
+        self.source = source
+        self.types = types
+        self.where = where
+        self.transferred = 0
+
+    @classmethod
+    def postgres(cls, engine, table, where=None, indexLabel="index"):
+        """Kennzahlen auf der PostgreSQL-Tabelle *table*, z.B. dem mit ``copyLoad(..., types=CLEAN_SQL_TYPES)``
+        gespeicherten AutoDF."""
+
+        def execute(sql):
+            with engine.connect() as conn:
+                result = conn.execute(text(sql))
+                return list(result.keys()), result.fetchall()
+
+        types = {column["name"]: str(column["type"]).lower() for column in inspect(engine).get_columns(table)
+                 if column["name"] != indexLabel}
+        return cls(execute, '"%s"' % table, types, where)
+
+    @classmethod
+    def duckdb(cls, path, where=None, connection=None):
+        """Kennzahlen mit DuckDB auf dem Parquet-Datensatz *path* aus :func:`~autoscout24.dataset.writeDataset`."""
+
+        if duckdb is None:
+            raise ImportError("Für Abfragen auf dem Parquet-Datensatz wird das Paket duckdb benötigt "
+                              "(pip install duckdb)")
+        connection = connection or duckdb.connect()
+        source = "read_parquet('%s/**/*.parquet', hive_partitioning = true)" % str(path).replace("'", "''")
+
+        def execute(sql):
+            result = connection.execute(sql)
+            return [column[0] for column in result.description], result.fetchall()
+
+        #Index und Partitionsspalte sind im Dataframe keine Spalten
+        types = {name: type.lower() for name, type, *_ in connection.execute("DESCRIBE SELECT * FROM %s" % source)
+                 .fetchall() if name not in (INDEX_COLUMN, PARTITION_COLUMN)}
+        return cls(execute, source, types, where)
+
+    def numericColumns(self):
+        """Spalten, die pandas bei ``groupby().mean()`` einbezieht."""
+
+        return [column for column, type in self.types.items() if type.split("(")[0] in NUMERIC]
+
+    def _expression(self, column, stat):
+        value = '"%s"' % column
+        #bool lässt sich in PostgreSQL nur über integer in eine Zahl umwandeln
+        if self.types.get(column) == "boolean":
+            value = "CAST(%s AS INTEGER)" % value
+        if stat in FLOAT_STATS:
+            return STATS[stat].format(column="CAST(%s AS DOUBLE PRECISION)" % value)
+        if stat == "sum" and self.types.get(column, "").split("(")[0] in INTEGER:
+            #SUM über Ganzzahlen ist in PostgreSQL numeric
+            return "CAST(SUM(%s) AS BIGINT)" % value
+        return STATS[stat].format(column=value)
+
+    def _conditions(self, by):
+        #wie bei pandas werden fehlende Gruppenwerte nicht gruppiert
+        conditions = ['"%s" IS NOT NULL' % column for column in by]
+        if self.where:
+            conditions.append("(%s)" % self.where)
+        return " WHERE " + " AND ".join(conditions) if conditions else ""
+
+    def sql(self, by, columns=None, stats="mean"):
+        """Gibt die SQL-Abfrage zu :meth:`groupby` zurück."""
+
+        by = [by] if isinstance(by, str) else list(by)
+        columns = self._columns(columns, by)
+        stats = [stats] if isinstance(stats, str) else list(stats)
+        unknown = [stat for stat in stats if stat not in STATS]
+        if unknown:
+            raise ValueError("Unbekannte Kennzahlen: %s (möglich: %s)" % (", ".join(unknown), ", ".join(STATS)))
+        keys = ", ".join('"%s"' % column for column in by)
+        values = ", ".join('%s AS "%s|%s"' % (self._expression(column, stat), column, stat)
+                           for column in columns for stat in stats)
+        return "SELECT %s, %s FROM %s%s GROUP BY %s ORDER BY %s" % (keys, values, self.source,
+                                                                   self._conditions(by), keys, keys)
+
+    def _columns(self, columns, by):
+        if columns is None:
+            return [column for column in self.numericColumns() if column not in by]
+        return [columns] if isinstance(columns, str) else list(columns)
+
+    def _frame(self, sql, index):
+        names, rows = self._execute(sql)
+        frame = pd.DataFrame.from_records(rows, columns=names)
+        #Summen aus PostgreSQL kommen als Decimal
+        for column in frame.columns[len(index):]:
+            if frame[column].dtype == object:
+                frame[column] = pd.to_numeric(frame[column])
+        frame = frame.set_index(index)
+        self.transferred += int(frame.memory_usage(deep=True).sum())
+        return frame
+
+    def groupby(self, by, columns=None, stats="mean"):
+        """Entspricht ``AutoDF.groupby(by)[columns].agg(stats)``, berechnet in der Datenbank.
+
+        *columns* ist eine Spalte (Ergebnis als Series wie bei pandas), eine
+        Liste oder None für alle numerischen Spalten; *stats* ist eine Kennzahl
+        aus count, sum, mean, min, max, std und median oder eine Liste davon
+        (Spalten (Spalte, Kennzahl) wie bei ``agg``).
+        """
+
+        frame = self._frame(self.sql(by, columns, stats), [by] if isinstance(by, str) else list(by))
+        if isinstance(stats, str):
+            frame.columns = [column.rsplit("|", 1)[0] for column in frame.columns]
+            return frame[columns] if isinstance(columns, str) else frame
+        frame.columns = pd.MultiIndex.from_tuples([tuple(column.rsplit("|", 1)) for column in frame.columns])
+        return frame
+
+    def valueCounts(self, column, normalize=False):
+        """Entspricht ``AutoDF[column].value_counts(normalize)``, absteigend nach Anzahl sortiert.
+
+        Wie bei pandas 2 heißt die Series ``count`` bzw. ``proportion`` und der Index *column*.
+        """
+
+        frame = self._frame('SELECT "%s", COUNT(*) AS "count" FROM %s%s GROUP BY 1 ORDER BY 2 DESC, 1'
+                            % (column, self.source, self._conditions([column])), [column])
+        counts = frame["count"]
+        return (counts / counts.sum()).rename("proportion") if normalize else counts
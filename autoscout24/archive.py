@@ -0,0 +1,227 @@
+"""Archiv aller geladenen Suchergebnisseiten und erneutes Parsen ohne Netzwerk.
+
+Ändern sich die generierten CSS-Klassen der Webseite (z.B.
+``VehicleDetailTable_container__mUUbY``), muss nur der Parser angepasst und
+das Archiv erneut verarbeitet werden, statt alle Seiten neu zu crawlen.
+
+Die Seiten werden als WARC-ähnliche Datensätze (Kopfzeilen mit URL und
+Abrufzeit, danach der HTML-Quelltext) an die Datei ``pages.warc.zst``
+angehängt. Jeder Datensatz ist ein eigener zstd-Frame, sodass die Datei nie
+umgeschrieben wird und jeder Datensatz einzeln gelesen werden kann. Ein
+Index in ``index.sqlite`` enthält zu jeder URL und Abrufzeit die Position des
+Frames in der Datei.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlsplit
+
+from .cache import canonicalURL
+from .extract import pageFingerprint, parsePage
+from .fields import ID_COLUMN
+from .records import RecordBuilder
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard ist optional
+    zstandard = None
+
+DATA_FILE = "pages.warc.zst"
+INDEX_FILE = "index.sqlite"
+
+
+def _requireZstd():
+    if zstandard is None:
+        raise ImportError("Für das Seitenarchiv wird das Paket zstandard benötigt (pip install zstandard)")
+
+
+def queryOf(URL):
+    """Gibt (Erstzulassungsjahr, Seite) einer Suchergebnis-URL zurück, sonst (None, None)."""
+
+    query = parse_qs(urlsplit(URL).query)
+    try:
+        return int(query["fregfrom"][0]), int(query.get("page", ["0"])[0])
+    except (KeyError, ValueError):
+        return None, None
+
+
+def formatRecord(URL, html, status, fetchedAt):
+    """WARC-ähnlicher Datensatz einer Seite als Bytes."""
+
+    body = html.encode("utf-8")
+    date = datetime.fromtimestamp(fetchedAt, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    header = ("WARC/1.0\r\nWARC-Type: response\r\nWARC-Target-URI: %s\r\nWARC-Date: %s\r\n"
+              "HTTP-Status: %d\r\nContent-Type: text/html; charset=utf-8\r\nContent-Length: %d\r\n\r\n"
+              % (URL, date, status, len(body)))
+    return header.encode("utf-8") + body + b"\r\n\r\n"
+
+
+def parseRecord(data):
+    """Gibt den HTML-Quelltext eines Datensatzes aus :func:`formatRecord` zurück."""
+
+    header, _, rest = data.partition(b"\r\n\r\n")
+    for line in header.split(b"\r\n"):
+        if line.startswith(b"Content-Length:"):
+            return rest[:int(line.split(b":", 1)[1])].decode("utf-8")
+    raise ValueError("Datensatz ohne Content-Length")
+
+
+class PageArchive:
+    """Append-only Archiv der Suchergebnisseiten im Verzeichnis *path*.
+
+    *level* ist die zstd-Kompressionsstufe.
+    """
+
+    def __init__(self, path="autoscout24_archive", level=10):
+        _requireZstd()
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.dataPath = os.path.join(path, DATA_FILE)
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._lock = threading.Lock()
+        self._file = open(self.dataPath, "ab")
+        self._db = sqlite3.connect(os.path.join(path, INDEX_FILE), check_same_thread=False)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS pages (
+                                url TEXT NOT NULL,
+                                fetchedAt REAL NOT NULL,
+                                freg INTEGER,
+                                page INTEGER,
+                                status INTEGER NOT NULL,
+                                offset INTEGER NOT NULL,
+                                length INTEGER NOT NULL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_url ON pages (url, fetchedAt)")
+        self._db.commit()
+
+    def append(self, URL, html, status=200, fetchedAt=None):
+        """Hängt die Seite *URL* mit der Abrufzeit *fetchedAt* (Standard: jetzt) an das Archiv an."""
+
+        fetchedAt = time.time() if fetchedAt is None else fetchedAt
+        record = formatRecord(URL, html, status, fetchedAt)
+        freg, page = queryOf(URL)
+        with self._lock:
+            #Ein ZstdCompressor darf nicht von mehreren Threads gleichzeitig verwendet werden
+            frame = self._compressor.compress(record)
+            offset = self._file.seek(0, os.SEEK_END)
+            self._file.write(frame)
+            self._file.flush()
+            self._db.execute("INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (canonicalURL(URL), fetchedAt, freg, page, status, offset, len(frame)))
+            self._db.commit()
+
+    def entries(self, before=None):
+        """Index der jeweils letzten Version jeder URL (optional abgerufen vor *before*).
+
+        Liste von (URL, fetchedAt, freg, page, offset, length), sortiert nach
+        Erstzulassungsjahr und Seite.
+        """
+
+        before = time.time() if before is None else before
+        with self._lock:
+            return self._db.execute("""SELECT url, MAX(fetchedAt), freg, page, offset, length FROM pages
+                                       WHERE fetchedAt <= ? GROUP BY url ORDER BY freg, page, url""",
+                                    (before,)).fetchall()
+
+    def versions(self, URL):
+        """Alle archivierten Abrufzeiten der Seite *URL*."""
+
+        with self._lock:
+            rows = self._db.execute("SELECT fetchedAt FROM pages WHERE url = ? ORDER BY fetchedAt",
+                                    (canonicalURL(URL),)).fetchall()
+        return [fetchedAt for fetchedAt, in rows]
+
+    def read(self, URL, before=None):
+        """HTML-Quelltext der letzten Version von *URL* (optional vor *before*), sonst None."""
+
+        before = time.time() if before is None else before
+        with self._lock:
+            row = self._db.execute("""SELECT offset, length FROM pages WHERE url = ? AND fetchedAt <= ?
+                                      ORDER BY fetchedAt DESC LIMIT 1""", (canonicalURL(URL), before)).fetchone()
+        if row is None:
+            return None
+        return readFrame(self.dataPath, *row)
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def close(self):
+        self._file.close()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def readFrame(dataPath, offset, length):
+    """Liest und entpackt den Datensatz an Position *offset* der Archivdatei."""
+
+    _requireZstd()
+    with open(dataPath, "rb") as f:
+        f.seek(offset)
+        frame = f.read(length)
+    return parseRecord(zstandard.ZstdDecompressor().decompress(frame))
+
+
+def _replayChunk(dataPath, entries, parser):
+    #Läuft in einem eigenen Prozess: Seiten lesen, entpacken und parsen
+    decompressor = zstandard.ZstdDecompressor()
+    pages = []
+    with open(dataPath, "rb") as f:
+        for freg, page, offset, length in entries:
+            f.seek(offset)
+            html = parseRecord(decompressor.decompress(f.read(length)))
+            pages.append((freg, page, parsePage(html, parser)[0]))
+    return pages
+
+
+def replayArchive(path="autoscout24_archive", parser="lxml", workers=None, before=None, chunkSize=None):
+    """Erzeugt das AutoDFraw erneut aus dem Archiv *path*, ohne eine einzige Seite zu laden.
+
+    Die Seiten werden in Paketen von *chunkSize* Seiten (Standard: etwa vier
+    Pakete je Prozess) auf *workers* Prozesse (Standard: alle CPU-Kerne)
+    verteilt. Mit *before* wird der Stand
+    des Archivs zu diesem Zeitpunkt verarbeitet. Leere und wiederholte Seiten
+    werden wie beim Crawl übersprungen, ebenso Angebote, deren ID in der
+    Reihenfolge (Jahr, Seite) bereits vorkam.
+    """
+
+    _requireZstd()
+    start = time.perf_counter()
+    with PageArchive(path) as archive:
+        entries = [(freg, page, offset, length)
+                   for _, _, freg, page, offset, length in archive.entries(before)]
+        dataPath = archive.dataPath
+
+    workers = workers or os.cpu_count() or 1
+    chunkSize = chunkSize or max(1, math.ceil(len(entries) / (4 * workers)))
+    chunks = [entries[i:i + chunkSize] for i in range(0, len(entries), chunkSize)]
+    with ProcessPoolExecutor(workers) as processes:
+        results = processes.map(_replayChunk, [dataPath] * len(chunks), chunks, [parser] * len(chunks))
+        pages = [page for chunk in results for page in chunk]
+
+    records = RecordBuilder()
+    seen = {}
+    listings = set()
+    for freg, page, pageRecords in sorted(pages, key=lambda item: (item[0] is None, item[0] or 0, item[1] or 0)):
+        #wie beim Crawl wird nur das erste Vorkommen eines Angebots übernommen
+        ids = pageRecords.data.get(ID_COLUMN) or [None] * len(pageRecords)
+        pageRecords = pageRecords.subset([i for i, listingID in enumerate(ids)
+                                          if listingID is None or listingID not in listings])
+        listings.update(listingID for listingID in ids if listingID is not None)
+        fingerprint = pageFingerprint(pageRecords)
+        if pageRecords.empty or fingerprint in seen.setdefault(freg, set()):
+            continue
+        seen[freg].add(fingerprint)
+        records.extend(pageRecords)
+
+    print("%d Seiten mit %d Fahrzeugen in %.1f s aus dem Archiv verarbeitet (%d Prozesse)"
+          % (len(entries), len(records), time.perf_counter() - start, workers))
+    return records.toDataFrame()
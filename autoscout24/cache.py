@@ -0,0 +1,151 @@
+"""Persistenter HTTP-Cache für die Suchergebnisseiten.
+
+Die Seiten werden komprimiert in einer SQLite-Datei abgelegt, Schlüssel ist
+die kanonische URL. Innerhalb der *ttl* wird eine Seite direkt aus dem Cache
+gelesen, danach wird sie mit ETag/If-Modified-Since beim Server
+revalidiert. Überschreitet der Cache *maxBytes*, werden die am längsten nicht
+gelesenen Seiten entfernt (LRU).
+"""
+
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalURL(URL):
+    """Normalisiert *URL*, damit gleiche Seiten denselben Cache-Schlüssel haben."""
+
+    url = urlsplit(URL)
+    scheme = url.scheme.lower()
+    host = (url.hostname or "").lower()
+    if url.port and url.port != DEFAULT_PORTS.get(scheme):
+        host += ":%d" % url.port
+    query = urlencode(sorted(parse_qsl(url.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, url.path or "/", query, ""))
+
+
+@dataclass
+class CacheEntry:
+    """Eine gecachte Seite mit den Validatoren für einen Conditional GET."""
+
+    URL: str
+    text: str
+    etag: str
+    lastModified: str
+    storedAt: float
+    fresh: bool
+
+
+class ResponseCache:
+    """SQLite-basierter Cache für Suchergebnisseiten.
+
+    *ttl* ist die Zeit in Sekunden, in der eine Seite ohne Revalidierung
+    verwendet wird, *maxBytes* die maximale Größe der komprimierten Seiten.
+    """
+
+    def __init__(self, path="autoscout24_cache.sqlite", ttl=24 * 3600, maxBytes=256 * 1024 ** 2):
+        self.path = path
+        self.ttl = ttl
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS responses (
+                                url TEXT PRIMARY KEY,
+                                etag TEXT,
+                                lastModified TEXT,
+                                storedAt REAL NOT NULL,
+                                lastAccess REAL NOT NULL,
+                                size INTEGER NOT NULL,
+                                body BLOB NOT NULL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_lastAccess ON responses (lastAccess)")
+        self._db.commit()
+        self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def lookup(self, URL):
+        """Gibt den :class:`CacheEntry` zu *URL* zurück oder None."""
+
+        key = canonicalURL(URL)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT etag, lastModified, storedAt, body FROM responses WHERE url = ?",
+                                   (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET lastAccess = ? WHERE url = ?", (now, key))
+            self._db.commit()
+        etag, lastModified, storedAt, body = row
+        fresh = self.ttl is not None and now - storedAt < self.ttl
+        if fresh:
+            with self._lock:
+                self.hits += 1
+        return CacheEntry(key, zlib.decompress(body).decode("utf-8"), etag, lastModified, storedAt, fresh)
+
+    def store(self, URL, text, etag=None, lastModified=None):
+        """Legt die neu übertragene Seite *URL* komprimiert im Cache ab."""
+
+        key = canonicalURL(URL)
+        body = zlib.compress(text.encode("utf-8"), 6)
+        now = time.time()
+        with self._lock:
+            self.misses += 1
+            old = self._db.execute("SELECT size FROM responses WHERE url = ?", (key,)).fetchone()
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (key, etag, lastModified, now, now, len(body), body))
+            self._size += len(body) - (old[0] if old else 0)
+            self._evict()
+            self._db.commit()
+
+    def refresh(self, URL):
+        """Markiert eine per 304 Not Modified bestätigte Seite wieder als frisch."""
+
+        now = time.time()
+        with self._lock:
+            self.revalidated += 1
+            self._db.execute("UPDATE responses SET storedAt = ?, lastAccess = ? WHERE url = ?",
+                             (now, now, canonicalURL(URL)))
+            self._db.commit()
+
+    def _evict(self):
+        #Am längsten nicht gelesene Seiten entfernen, bis die Maximalgröße eingehalten wird
+        if self._size <= self.maxBytes:
+            return
+        rows = self._db.execute("SELECT url, size FROM responses ORDER BY lastAccess").fetchall()
+        for url, size in rows:
+            if self._size <= self.maxBytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            self._size -= size
+
+    @property
+    def size(self):
+        return self._size
+
+    def hitRatio(self):
+        """Anteil der Seiten, die nicht erneut übertragen werden mussten."""
+
+        lookups = self.hits + self.revalidated + self.misses
+        if not lookups:
+            return 0.0
+        return (self.hits + self.revalidated) / lookups
+
+    def stats(self):
+        return {"hits": self.hits, "revalidated": self.revalidated, "misses": self.misses,
+                "hitRatio": self.hitRatio(), "bytes": self._size}
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
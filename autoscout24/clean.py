@@ -0,0 +1,138 @@
+"""Bereinigung des AutoDFraw und gruppierte Kennzahlen, auch schrittweise über Chunks.
+
+:func:`cleanAutoDF` fasst die Schritte des Feature Engineerings und der
+Bereinigung aus dem Notebook zusammen. Da jede Zeile für sich bereinigt wird,
+lässt sich die Funktion mit :func:`cleanChunks` auf einzelne Chunks anwenden,
+z.B. aus :func:`~autoscout24.db.readChunks`, und :class:`ChunkAggregate`
+berechnet daraus die Kennzahlen der Analyse, ohne das komplette AutoDF im
+Arbeitsspeicher zu halten.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .dataset import CLEAN_TYPES
+
+#Spalten des AutoDFraw, die für das bereinigte AutoDF benötigt werden
+SOURCE_COLUMNS = ["Titel", "Version", "Untertitel", "Preis", "km", "Erstzulassung", "PS", "Getriebe", "Kraftstoff",
+                  "Verbrauch_l_pro_100km", "Emissionen_g_pro_km", "listing_id", "Standort"]
+#Bedingung für readChunks, um Leasing-Angebote bereits in SQL zu entfernen
+NO_LEASING = '"Leasing" IS NOT TRUE'
+#Ausstattungsmerkmal -> Begriffe im Untertitel
+EQUIPMENT = {"Alufelgen": ["Alufelgen"], "Sitzheizung": ["Sitzheizung"],
+             "Klimaanlage": ["Klimaanlage", "Klimaautomatik"], "Einparkhilfe": ["Einparkhilfe "],
+             "Navigationssystem": ["Navigationssystem"]}
+
+
+def cleanAutoDF(AutoDF):
+    """Gibt das bereinigte AutoDF zum AutoDFraw *AutoDF* zurück, wie im Notebook beschrieben.
+
+    Erzeugt *Marke*, die Ausstattungsspalten und *Stadt*, entfernt Einheiten
+    und Sonderzeichen, Zeilen mit fehlenden Werten bei Verbrauch, Emissionen,
+    km und PS sowie Leasing-Angebote und wandelt die numerischen Spalten um.
+    *Leasing*, *Zustand* und *Fahrzeughalter* dürfen fehlen, z.B. wenn die
+    Leasing-Angebote schon beim Lesen entfernt wurden.
+    """
+
+    AutoDF = AutoDF.copy()
+    AutoDF["Marke"] = AutoDF["Titel"].str.split(r"\s+").str[0]
+    for column, terms in EQUIPMENT.items():
+        contains = AutoDF["Untertitel"].str.contains(terms[0])
+        for term in terms[1:]:
+            contains = contains | AutoDF["Untertitel"].str.contains(term)
+        #nicht im Untertitel erwähnte Ausstattung ist nicht vorhanden
+        AutoDF[column] = contains.replace(np.nan, False)
+    AutoDF["Stadt"] = AutoDF["Standort"].str.split(" ").str[-1]
+
+    #Kaufpreis ohne nachfolgenden Leasingpreis
+    AutoDF["Preis"] = AutoDF["Preis"].replace("(,-).*", "", regex=True).str.replace(r"[^0-9]+", "", regex=True)
+    AutoDF["Erstzulassung"] = AutoDF["Erstzulassung"].replace(".*/", "", regex=True).replace(r"[^0-9]+", "", regex=True)
+    AutoDF["PS"] = AutoDF["PS"].replace([".*kW"], "", regex=True).replace(r"[^0-9]+", "", regex=True)
+    AutoDF["km"] = AutoDF["km"].replace(r"[^0-9]+", "", regex=True)
+    AutoDF["Verbrauch_l_pro_100km"] = AutoDF["Verbrauch_l_pro_100km"].replace(
+        [r"\(l/100 km\)", "l/100 km", r"\(komb.\)"], "", regex=True)
+    AutoDF["Emissionen_g_pro_km"] = AutoDF["Emissionen_g_pro_km"].replace(r"[^0-9]+", "", regex=True)
+
+    #Verbrauch und Emissionen 0 sind nur bei Elektroautos korrekt
+    for column in ("Verbrauch_l_pro_100km", "Emissionen_g_pro_km"):
+        AutoDF[column] = AutoDF[column].replace(["-", "", "0"], np.nan, regex=True)
+        AutoDF.loc[AutoDF.Kraftstoff == "Elektro", column] = 0
+    for column in ("Erstzulassung", "km", "PS"):
+        AutoDF[column] = AutoDF[column].replace(["-", ""], np.nan, regex=True)
+    AutoDF["Verbrauch_l_pro_100km"] = AutoDF["Verbrauch_l_pro_100km"].replace(",", ".", regex=True)
+
+    AutoDF = AutoDF[AutoDF["Verbrauch_l_pro_100km"].notna() & AutoDF["Emissionen_g_pro_km"].notna()
+                    & AutoDF["km"].notna() & AutoDF["PS"].notna()]
+    if "Leasing" in AutoDF.columns:
+        AutoDF = AutoDF[~AutoDF["Leasing"].replace({0.0: False, 1.0: True}).astype(bool)]
+    AutoDF = AutoDF.drop(columns=["Zustand", "Leasing", "Fahrzeughalter", "Standort"], errors="ignore")
+    return AutoDF.astype({column: dtype for column, dtype in CLEAN_TYPES.items() if column in AutoDF.columns})
+
+
+def cleanChunks(chunks):
+    """Bereinigt die Dataframes aus *chunks* einzeln mit :func:`cleanAutoDF`."""
+
+    for chunk in chunks:
+        yield cleanAutoDF(chunk)
+
+
+class ChunkAggregate:
+    """Gruppierte Kennzahlen wie ``df.groupby(by)[columns].agg(stats)``, schrittweise mit :meth:`add` berechnet.
+
+    count, sum, mean, min, max und std werden aus Teilergebnissen je Chunk
+    zusammengesetzt, sodass nur eine Zeile je Gruppe gespeichert wird; nur für
+    median werden die Werte von *columns* gesammelt.
+    """
+
+    STATS = ("count", "sum", "mean", "min", "max", "std", "median")
+    #Zusammenfassen der Teilergebnisse
+    MERGE = {"count": "sum", "sum": "sum", "squares": "sum", "min": "min", "max": "max"}
+
+    def __init__(self, by, columns, stats=("count", "mean")):
+        unknown = [stat for stat in stats if stat not in self.STATS]
+        if unknown:
+            raise ValueError("Unbekannte Kennzahlen: %s (möglich: %s)" % (", ".join(unknown), ", ".join(self.STATS)))
+        self.by = by
+        self.columns = [columns] if isinstance(columns, str) else list(columns)
+        self.stats = list(stats)
+        self.rows = 0
+        self._parts = {}
+        self._values = []
+
+    def add(self, df):
+        """Übernimmt den Chunk *df* in die Kennzahlen."""
+
+        grouped = df.groupby(self.by)[self.columns]
+        parts = {"count": grouped.count(), "sum": grouped.sum(), "min": grouped.min(), "max": grouped.max(),
+                 "squares": df.assign(**{column: df[column].astype("float64") ** 2 for column in self.columns})
+                 .groupby(self.by)[self.columns].sum()}
+        for name, part in parts.items():
+            if name in self._parts:
+                part = pd.concat([self._parts[name], part]).groupby(level=list(range(part.index.nlevels))) \
+                    .agg(self.MERGE[name])
+            self._parts[name] = part
+        if "median" in self.stats:
+            self._values.append(df[([self.by] if isinstance(self.by, str) else list(self.by)) + self.columns])
+        self.rows += len(df)
+        return self
+
+    def result(self):
+        """Gibt die Kennzahlen als Dataframe mit den Spalten (Spalte, Kennzahl) zurück."""
+
+        if not self._parts:
+            raise ValueError("Es wurde noch kein Chunk hinzugefügt")
+        count, total = self._parts["count"], self._parts["sum"]
+        results = {}
+        for stat in self.stats:
+            if stat in ("count", "sum", "min", "max"):
+                results[stat] = self._parts[stat]
+            elif stat == "mean":
+                results[stat] = total / count.where(count > 0)
+            elif stat == "std":
+                #Stichprobenstandardabweichung wie bei pandas (ddof=1)
+                results[stat] = np.sqrt(((self._parts["squares"] - total ** 2 / count) / (count - 1))
+                                        .where(count > 1).clip(lower=0))
+            else:
+                results[stat] = pd.concat(self._values).groupby(self.by)[self.columns].median()
+        frame = pd.concat(results, axis=1).swaplevel(axis=1)
+        return frame[pd.MultiIndex.from_product([self.columns, self.stats])]
@@ -0,0 +1,556 @@
+"""Asynchrone Crawl-Engine für die Autoscout24 Suchergebnisseiten.
+
+Statt die 32 Jahre x 20 Seiten nacheinander abzurufen, werden die Seiten
+nebenläufig geladen. Die Anzahl gleichzeitiger Requests ist insgesamt und
+pro Host begrenzt, damit die Webseite nicht überlastet wird.
+
+Je Erstzulassungsjahr wird zunächst die erste Seite geladen. Aus der dort
+angegebenen Anzahl an Angeboten ergibt sich, wie viele Seiten es tatsächlich
+gibt; nur diese werden anschließend abgerufen. Fehlt die Angabe, wird Seite
+für Seite weitergeblättert, bis eine Seite keine Angebote hat oder die
+vorherige Seite wiederholt. Eine Seite aus lauter bereits gesehenen Angeboten
+beendet die Suche nicht.
+
+Mit einem :class:`~autoscout24.journal.CrawlJournal` wird jede fertige Seite
+gespeichert, sodass ein abgebrochener Crawl dort fortgesetzt wird, wo er
+aufgehört hat.
+
+Statt eines festen Limits kann ein :class:`~autoscout24.ratecontrol.AimdLimiter`
+die Anzahl gleichzeitiger Requests während des Crawls an Latenz und
+Drosselung durch den Server anpassen.
+
+Laden und Verarbeiten der Seiten sind getrennte Stufen: Die geladenen Seiten
+werden über eine begrenzte Queue an die Parser übergeben, die mit
+*parseWorkers* > 0 in einem ``ProcessPoolExecutor`` laufen. So blockiert das
+CPU-lastige Parsen nicht das Laden weiterer Seiten, und es liegen nie mehr
+als *queueSize* ungeparste Seiten im Speicher. Mit ``parser="lxml"`` wird
+statt BeautifulSoup der schnellere lxml-Parser verwendet, mit
+``parser="nextdata"`` werden die in die Seite eingebetteten Next.js-Daten
+gelesen.
+
+Mit :meth:`Crawler.iterListings` werden die Fahrzeuge jeder fertigen Seite
+sofort als RecordBuilder geliefert, statt erst am Ende das komplette
+AutoDFraw zu erzeugen, z.B. um sie mit dem
+:class:`~autoscout24.parquet.ParquetSink` fortlaufend zu speichern.
+"""
+
+import asyncio
+import math
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+import requests
+
+from .extract import PAGE_SIZE, listingIDs, pageFingerprint, parsePage, timedParsePage
+from .fields import ID_COLUMN, priceKey
+from .records import RecordBuilder
+from .seen import SeenStore
+from .session import CrawlerSession
+
+BASELINK = "https://www.autoscout24.de/lst?fregfrom="
+
+
+def buildURL(freg, page, baselink=BASELINK):
+    """Erstellt die URL einer Suchergebnisseite für das Erstzulassungsjahr *freg*."""
+
+    return baselink + str(freg) + "&fregto=" + str(freg) + "&page=" + str(page)
+
+
+def runSync(coro):
+    """Führt *coro* aus, auch wenn bereits ein Event Loop läuft (z.B. in Jupyter)."""
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    #In Jupyter läuft bereits ein Event Loop, daher wird ein eigener Thread verwendet
+    result = {}
+
+    def target():
+        try:
+            result["value"] = asyncio.run(coro)
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+async def _gatherAll(coros):
+    """Wie ``asyncio.gather``, bricht bei einem Fehler oder Abbruch aber auch die übrigen Coroutinen ab.
+
+    So laufen keine Requests oder Parser mehr, nachdem der Crawl beendet und
+    die Executoren heruntergefahren wurden.
+    """
+
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@dataclass
+class CrawlSummary:
+    """Kennzahlen eines Crawl-Durchlaufs."""
+
+    requests: int = 0
+    planned: int = 0
+    resumed: int = 0
+    rows: int = 0
+    seconds: float = 0.0
+    connections: int = 0
+    reused: int = 0
+    retries: int = 0
+    cacheHits: int = 0
+    cacheRevalidated: int = 0
+    cacheMisses: int = 0
+    limiter: dict = None
+    listings: int = 0
+    duplicates: int = 0
+    inserted: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    failed: list = field(default_factory=list)
+
+    @property
+    def saved(self):
+        return max(0, self.planned - self.requests - self.resumed - len(self.failed))
+
+    @property
+    def cacheHitRatio(self):
+        lookups = self.cacheHits + self.cacheRevalidated + self.cacheMisses
+        return (self.cacheHits + self.cacheRevalidated) / lookups if lookups else 0.0
+
+    @property
+    def duplicateRate(self):
+        return self.duplicates / self.listings if self.listings else 0.0
+
+    def __str__(self):
+        lines = ["%d Seiten mit %d Fahrzeugen in %.1f s gecrawlt" % (self.requests, self.rows, self.seconds),
+                 "%d von %d Requests durch vorzeitiges Ende der Paginierung eingespart" % (self.saved, self.planned),
+                 "%d Verbindungen aufgebaut, %d Mal wiederverwendet, %d Retries" % (self.connections, self.reused, self.retries)]
+        if self.resumed:
+            lines.append("%d Seiten aus dem Journal übernommen" % self.resumed)
+        if self.cacheHits + self.cacheRevalidated + self.cacheMisses:
+            lines.append("Cache-Trefferquote %.0f%% (%d frisch, %d revalidiert, %d neu geladen)"
+                         % (100 * self.cacheHitRatio, self.cacheHits, self.cacheRevalidated, self.cacheMisses))
+        if self.limiter is not None and self.limiter["p50"] is not None:
+            lines.append("Nebenläufigkeit zuletzt %d, Latenz p50 %.0f ms / p95 %.0f ms, %d Mal gedrosselt"
+                         % (self.limiter["concurrency"], 1000 * self.limiter["p50"], 1000 * self.limiter["p95"],
+                            self.limiter["throttled"]))
+        if self.duplicates:
+            lines.append("%d von %d Angeboten doppelt (%.1f%%), nicht erneut geparst"
+                         % (self.duplicates, self.listings, 100 * self.duplicateRate))
+        if self.inserted + self.changed + self.unchanged:
+            lines.append("Delta: %d neue Angebote, %d Preisänderungen, %d unverändert"
+                         % (self.inserted, self.changed, self.unchanged))
+        if self.failed:
+            lines.append("%d Seiten fehlgeschlagen" % len(self.failed))
+        return "\n".join(lines)
+
+
+class Crawler:
+    """Lädt Suchergebnisseiten nebenläufig und erzeugt daraus das AutoDFraw.
+
+    *maxConcurrency* begrenzt die insgesamt gleichzeitig laufenden Requests,
+    *perHostLimit* die gleichzeitigen Requests pro Host. Mit *hostDelay* wird
+    zusätzlich ein Mindestabstand in Sekunden zwischen zwei Requests an
+    denselben Host eingehalten.
+
+    Alle Requests laufen über die :class:`~autoscout24.session.CrawlerSession`
+    *session*. Ohne Angabe wird eine Session mit einem Pool von
+    *maxConcurrency* Verbindungen erstellt.
+
+    Ist ein *journal* angegeben, werden dort erledigte Seiten nicht erneut
+    geladen und neu geladene Seiten sofort gespeichert.
+
+    Mit einem *limiter* (:class:`~autoscout24.ratecontrol.AimdLimiter`) wird
+    die Nebenläufigkeit adaptiv gesteuert; *maxConcurrency* ist dann nur noch
+    die Größe des Thread Pools.
+
+    *parseWorkers* ist die Anzahl Prozesse für das Parsen (0: Parsen im
+    Crawler-Thread), *queueSize* die maximale Anzahl geladener, noch nicht
+    geparster Seiten (Standard: doppelte Anzahl Parser). *parser* wählt das
+    Parser-Backend aus :data:`~autoscout24.extract.PARSERS`.
+
+    Mit einem *archive* (:class:`~autoscout24.archive.PageArchive`) wird jede
+    vom Server übertragene Seite archiviert, um sie später mit
+    :func:`~autoscout24.archive.replayArchive` ohne Netzwerk neu zu parsen.
+
+    Angebote, deren ID im Crawl bereits vorkam, werden nicht erneut geparst
+    und nicht doppelt übernommen. Ohne *seen* wird dafür je Crawl ein neuer
+    :class:`~autoscout24.seen.SeenStore` im Speicher verwendet; ein
+    SeenStore mit Datei sollte zusammen mit dem *journal* verwendet werden.
+
+    Inkrementeller Modus: Ist *known* ein dict listing_id -> Preis der bereits
+    gespeicherten Angebote, liefert der Crawl nur neue Angebote und
+    Preisänderungen. Die Seiten eines Jahres werden dann nacheinander geladen,
+    bis eine Seite nur noch bekannte, unveränderte Angebote enthält.
+
+    Mit *metrics* (:class:`~autoscout24.metrics.CrawlMetrics`) werden Zeiten
+    und Größen aller Requests sowie Parse-Zeit und Fahrzeuge je Seite in
+    Histogrammen erfasst und, falls ``metrics.path`` gesetzt ist, am Ende des
+    Crawls exportiert. Ohne *metrics* wird nichts gemessen. Die Histogramme
+    stehen unter :attr:`crawlMetrics`, :meth:`metrics` liefert dagegen die
+    Live-Kennzahlen des Crawls.
+    """
+
+    def __init__(self, baselink=BASELINK, maxConcurrency=8, perHostLimit=4, hostDelay=0.0, session=None,
+                 journal=None, limiter=None, parseWorkers=0, queueSize=None, parser="bs4",
+                 archive=None, seen=None, known=None, metrics=None):
+        self.baselink = baselink
+        self.maxConcurrency = maxConcurrency
+        self.perHostLimit = perHostLimit
+        self.hostDelay = hostDelay
+        self.session = session or CrawlerSession(poolSize=maxConcurrency, metrics=metrics)
+        if metrics is not None and self.session.metrics is None:
+            self.session.metrics = metrics
+        self.crawlMetrics = metrics
+        self.journal = journal
+        self.limiter = limiter
+        self.parseWorkers = parseWorkers
+        self.queueSize = queueSize or 2 * max(1, parseWorkers)
+        self.parser = parser
+        self.archive = archive
+        self.seen = seen
+        self.known = known
+        self.summary = CrawlSummary()
+
+    def crawl(self, fregList, pages=20):
+        """Crawlt *pages* Seiten je Erstzulassungsjahr und gibt das AutoDFraw zurück."""
+
+        return runSync(self.crawlAsync(fregList, pages))
+
+    def iterListings(self, fregList, pages=20, maxPending=4):
+        """Generator, der die Fahrzeuge jeder fertigen Seite als RecordBuilder liefert.
+
+        Die Seiten kommen in der Reihenfolge, in der sie fertig werden. Der Crawl
+        läuft in einem eigenen Thread und wartet, sobald *maxPending* Seiten
+        noch nicht abgeholt wurden, sodass nie der ganze Crawl im Speicher liegt.
+        Wird der Generator vorzeitig geschlossen, werden die laufenden Requests
+        und Parser abgebrochen.
+        """
+
+        pending = queue.Queue(maxPending)
+        stopped = threading.Event()
+        finished = object()
+
+        async def onPage(freg, page, records):
+            while not stopped.is_set():
+                try:
+                    return await asyncio.to_thread(pending.put, records, timeout=0.1)
+                except queue.Full:
+                    continue
+
+        async def run():
+            #Bei vorzeitigem Abbruch des Generators wird der Crawl abgebrochen; crawlAsync beendet
+            #dann alle Requests und Parser und fährt die Executoren herunter
+            crawl = asyncio.ensure_future(self.crawlAsync(fregList, pages, onPage))
+            while not crawl.done():
+                await asyncio.wait([crawl], timeout=0.1)
+                if stopped.is_set():
+                    crawl.cancel()
+                    break
+            await crawl
+
+        def target():
+            try:
+                asyncio.run(run())
+                pending.put(finished)
+            except BaseException as e:
+                if not stopped.is_set():
+                    pending.put(e)
+
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = pending.get()
+                if item is finished:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            #Bei vorzeitigem Abbruch des Generators wird der Crawl beendet
+            stopped.set()
+            while thread.is_alive():
+                try:
+                    pending.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+    async def crawlAsync(self, fregList, pages=20, onPage=None):
+        """Crawlt die Seiten und gibt das AutoDFraw zurück.
+
+        Mit *onPage* wird stattdessen jede neue Seite sofort an die Coroutine
+        ``onPage(freg, page, records)`` übergeben und nichts gesammelt.
+        """
+
+        collected = []
+
+        async def collect(freg, page, records):
+            collected.append((freg, page, records))
+
+        self._onPage = onPage or collect
+        self.summary = CrawlSummary(planned=len(fregList) * pages)
+        self._seen = self.seen if self.seen is not None else SeenStore()
+        self._parsing = set()
+        self._slots = asyncio.Semaphore(self.maxConcurrency)
+        self._hostSlots = defaultdict(lambda: asyncio.Semaphore(self.perHostLimit))
+        self._nextRequest = defaultdict(float)
+        before = self.session.stats()
+        start = time.perf_counter()
+
+        threads = max(self.maxConcurrency, self.limiter.maxLimit if self.limiter is not None else 0)
+        processes = ProcessPoolExecutor(self.parseWorkers) if self.parseWorkers else None
+        self._parseQueue = asyncio.Queue(self.queueSize)
+        parsers = [asyncio.create_task(self._parseStage(processes)) for _ in range(max(1, self.parseWorkers))]
+        try:
+            with ThreadPoolExecutor(threads) as self._executor:
+                await _gatherAll(self._crawlQuery(freg, pages) for freg in fregList)
+        finally:
+            for parser in parsers:
+                parser.cancel()
+            await asyncio.gather(*parsers, return_exceptions=True)
+            if processes is not None:
+                processes.shutdown(cancel_futures=True)
+
+        stats = self.session.stats()
+        self.summary.seconds = time.perf_counter() - start
+        for key in ("connections", "reused", "retries", "cacheHits", "cacheRevalidated", "cacheMisses"):
+            setattr(self.summary, key, stats[key] - before[key])
+        if self.limiter is not None:
+            self.summary.limiter = self.limiter.metrics()
+        if self.crawlMetrics is not None and self.crawlMetrics.path:
+            self.crawlMetrics.export()
+        if onPage is not None:
+            return None
+
+        #Reihenfolge der Seiten entspricht der sequentiellen Schleife; das Dataframe wird nur einmal erzeugt
+        records = RecordBuilder()
+        for _, _, page in sorted(collected, key=lambda item: item[:2]):
+            records.extend(page)
+        return records.toDataFrame()
+
+    def metrics(self):
+        """Live-Kennzahlen des laufenden Crawls, z.B. aktuelle Nebenläufigkeit und p50/p95-Latenz."""
+
+        metrics = {"requests": self.summary.requests, "failed": len(self.summary.failed)}
+        if self.limiter is not None:
+            metrics.update(self.limiter.metrics())
+        else:
+            metrics["concurrency"] = self.maxConcurrency
+        return metrics
+
+    async def _crawlQuery(self, freg, pages):
+        """Crawlt die Seiten eines Erstzulassungsjahres."""
+
+        seen = set()
+        first = await self._crawlPage(freg, 0, seen)
+        resultCount = first[1] if first is not None else None
+        lastPage = pages if resultCount is None else min(pages, math.ceil(resultCount / PAGE_SIZE))
+        if resultCount is not None and self.known is None:
+            #Anzahl der Seiten ist bekannt, die restlichen Seiten werden parallel geladen
+            await _gatherAll(self._crawlPage(freg, page, seen) for page in range(1, lastPage))
+        else:
+            #Weiterblättern, bis eine Seite keine Angebote hat oder sich wiederholt, im inkrementellen
+            #Modus auch sobald eine Seite nur bekannte, unveränderte Angebote enthält
+            result = first
+            for page in range(1, lastPage):
+                if result is not None and not result[2]:
+                    break
+                result = await self._crawlPage(freg, page, seen)
+
+    async def _crawlPage(self, freg, page, seen):
+        """Lädt eine Seite und gibt (RecordBuilder, Anzahl Suchergebnisse, weiter) zurück, None bei Fehlern.
+
+        *weiter* sagt, ob nach dieser Seite weitergeblättert wird. Das entscheidet
+        die Seite, wie sie geladen wurde: sie hat Angebote und ist keine
+        Wiederholung einer bereits geladenen Seite desselben Jahres (*seen*).
+        Dass doppelte Angebote entfernt wurden, beendet die Suche also nicht.
+        Die übrigen Fahrzeuge gehen sofort an ``onPage``.
+        """
+
+        result = await self._crawlUnit(freg, page)
+        if result is None:
+            return None
+        records, resultCount, listings = result
+        fingerprint = hash(tuple(listings)) if listings else pageFingerprint(records)
+        more = (len(listings) > 0 or not records.empty) and fingerprint not in seen
+        seen.add(fingerprint)
+        if self.known is not None:
+            parsed = len(records)
+            records = self._delta(records)
+            #Ende erst, wenn alle Angebote der Seite bekannt und unverändert sind, nicht schon wenn sie doppelt waren
+            more = more and (not records.empty or parsed < len(listings))
+        if more and not records.empty:
+            self.summary.rows += len(records)
+            await self._onPage(freg, page, records)
+        return records, resultCount, more
+
+    def _delta(self, records):
+        #Nur neue Angebote und Preisänderungen gegenüber self.known übernehmen
+        positions = []
+        ids = records.data.get(ID_COLUMN) or [None] * len(records)
+        for i, (listingID, price) in enumerate(zip(ids, records.data["Preis"])):
+            if listingID not in self.known:
+                self.summary.inserted += 1
+            elif priceKey(self.known[listingID]) != priceKey(price):
+                self.summary.changed += 1
+            else:
+                self.summary.unchanged += 1
+                continue
+            positions.append(i)
+        return records.subset(positions)
+
+    async def _crawlUnit(self, freg, page):
+        """Lädt eine Seite und gibt (RecordBuilder, Anzahl Suchergebnisse, Angebots-IDs) zurück, None bei Fehlern.
+
+        Die IDs sind alle Angebote der Seite, auch die als doppelt übersprungenen.
+        """
+
+        if self.journal is not None:
+            done = self.journal.load(freg, page)
+            if done is not None:
+                self.summary.resumed += 1
+                if ID_COLUMN in done[0].data:
+                    self._seen.add(done[0].data[ID_COLUMN])
+                return done
+
+        URL = buildURL(freg, page, self.baselink)
+        try:
+            html = await self._fetch(URL)
+        except requests.RequestException:
+            #Seite auch nach allen Retries nicht erreichbar, der Crawl läuft weiter
+            self.summary.failed.append(URL)
+            return None
+        #Bereits bekannte oder gerade auf einer anderen Seite geparste Angebote werden vor dem Parsen
+        #anhand ihrer ID erkannt; gespeichert werden die IDs erst, wenn die Seite im Journal steht,
+        #damit nach einem Abbruch keine Angebote fehlen
+        ids = listingIDs(html)
+        skip = frozenset(listingID for listingID in ids if listingID in self._seen or listingID in self._parsing)
+        new = [listingID for listingID in ids if listingID not in skip]
+        self._parsing.update(new)
+        self.summary.listings += len(ids)
+        self.summary.duplicates += len(skip)
+        try:
+            records, resultCount = await self._parse(html, skip)
+            if self.journal is not None:
+                self.journal.record(freg, page, records, resultCount, listings=ids)
+            self._seen.add(new)
+        finally:
+            self._parsing.difference_update(new)
+        return records, resultCount, ids
+
+    async def _parse(self, html, skip=frozenset()):
+        #Übergabe an die Parse-Stufe; ist die Queue voll, wartet das Laden
+        done = asyncio.get_running_loop().create_future()
+        await self._parseQueue.put((html, skip, done))
+        return await done
+
+    async def _parseStage(self, processes):
+        loop = asyncio.get_running_loop()
+        while True:
+            html, skip, done = await self._parseQueue.get()
+            try:
+                if self.crawlMetrics is not None:
+                    result = await self._timedParse(loop, processes, html, skip)
+                elif processes is None:
+                    result = parsePage(html, self.parser, skip)
+                else:
+                    result = await loop.run_in_executor(processes, parsePage, html, self.parser, skip)
+            except Exception as e:
+                done.set_exception(e)
+            else:
+                done.set_result(result)
+            finally:
+                self._parseQueue.task_done()
+
+    async def _timedParse(self, loop, processes, html, skip):
+        #Die Zeit wird im Parser-Prozess gemessen, ohne die Übertragung zwischen den Prozessen
+        if processes is None:
+            result, seconds = timedParsePage(html, self.parser, skip)
+        else:
+            result, seconds = await loop.run_in_executor(processes, timedParsePage, html, self.parser, skip)
+        self.crawlMetrics.observe("parse_seconds", seconds)
+        self.crawlMetrics.observe("rows_per_page", len(result[0]))
+        return result
+
+    async def _fetch(self, URL):
+        host = urlsplit(URL).netloc
+        slots = self.limiter if self.limiter is not None else self._slots
+        async with slots, self._hostSlots[host]:
+            await self._politeness(host)
+            loop = asyncio.get_running_loop()
+            try:
+                result = await loop.run_in_executor(self._executor, self._download, URL)
+            except (requests.ConnectionError, requests.Timeout):
+                if self.limiter is not None:
+                    self.limiter.onTimeout()
+                raise
+        self.summary.requests += 1
+        if self.limiter is not None:
+            self._feedback(result)
+        return result.text
+
+    def _download(self, URL):
+        #Läuft im Thread Pool; Seiten direkt aus dem Cache wurden bereits archiviert
+        result = self.session.fetch(URL)
+        if self.archive is not None and result.attempts:
+            self.archive.append(URL, result.text, result.status)
+        return result
+
+    def _feedback(self, result):
+        #Rückmeldung an den AIMD Limiter; Seiten direkt aus dem Cache zählen nicht
+        if result.throttled:
+            self.limiter.onThrottle(result.retryAfter)
+        elif result.errors:
+            self.limiter.onTimeout()
+        elif result.attempts:
+            self.limiter.onSuccess(result.seconds)
+
+    async def _politeness(self, host):
+        #Mindestabstand zwischen zwei Requests an denselben Host einhalten
+        now = time.monotonic()
+        wait = self._nextRequest[host] - now
+        self._nextRequest[host] = max(now, self._nextRequest[host]) + self.hostDelay
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def iterListings(fregList, pages=20, **kwargs):
+    """Generator über die Fahrzeuge aller Suchergebnisseiten für *fregList*, je Seite ein RecordBuilder.
+
+    Weitere Parameter werden an den :class:`Crawler` übergeben.
+    """
+
+    return Crawler(**kwargs).iterListings(fregList, pages)
+
+
+def crawlAutoDF(fregList, pages=20, **kwargs):
+    """Crawlt alle Suchergebnisseiten für *fregList* und gibt das AutoDFraw zurück.
+
+    Weitere Parameter werden an den :class:`Crawler` übergeben.
+    """
+
+    crawler = Crawler(**kwargs)
+    AutoDFraw = crawler.crawl(fregList, pages)
+    print(crawler.summary)
+    if crawler.crawlMetrics is not None:
+        #Histogramme als Tabelle mit Anzahl, Mittelwert, p50 und p95
+        print(crawler.crawlMetrics)
+    return AutoDFraw
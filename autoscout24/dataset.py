@@ -0,0 +1,183 @@
+"""Roh- und bereinigte Daten als nach Erstzulassungsjahr partitionierter Parquet-Datensatz.
+
+Statt ``AutoDF_raw.xlsx`` werden die Daten mit festem Schema als Parquet
+gespeichert: ein Verzeichnis je Jahr (``Jahr=2016/...``), in dem die Spalten
+einzeln und komprimiert abgelegt sind. Beim Laden werden nur die benötigten
+Spalten gelesen (*columns*) und über *filters* ganze Jahresverzeichnisse und
+Row Groups übersprungen. Da das Schema gespeichert ist, bleiben die Datentypen
+erhalten, z.B. *Leasing* als bool statt 0.0/1.0 wie beim Excel.
+
+Für das bereinigte AutoDF gibt es zusätzlich eine unkomprimierte Arrow
+IPC-Datei (Feather V2), die mit :func:`readFeather` per Memory Map geöffnet
+wird. Die numerischen Spalten des Dataframes verweisen dann direkt auf die
+Seiten der Datei im Page Cache des Betriebssystems, sodass mehrere Kernel und
+Prozesse denselben Arbeitsspeicher teilen statt je eine eigene Kopie zu laden.
+"""
+
+import os
+import re
+import shutil
+
+import pandas as pd
+
+from .fields import COLUMNS, ID_COLUMN
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow ist optional
+    pa = ds = pq = None
+
+#Spalte des Dataframe-Index und Partitionsspalte mit dem Jahr der Erstzulassung
+INDEX_COLUMN = "index"
+PARTITION_COLUMN = "Jahr"
+YEAR = re.compile(r"(\d{4})")
+
+CLEAN_TYPES = {"Preis": "int64", "km": "int64", "PS": "int64", "Emissionen_g_pro_km": "int64",
+               "Erstzulassung": "float64", "Verbrauch_l_pro_100km": "float64",
+               "Alufelgen": "bool", "Sitzheizung": "bool", "Klimaanlage": "bool", "Einparkhilfe": "bool",
+               "Navigationssystem": "bool"}
+CLEAN_COLUMNS = ["Titel", "Version", "Untertitel", "Preis", "km", "Erstzulassung", "PS", "Getriebe", "Kraftstoff",
+                 "Verbrauch_l_pro_100km", "Emissionen_g_pro_km", "listing_id", "Marke", "Alufelgen", "Sitzheizung",
+                 "Klimaanlage", "Einparkhilfe", "Navigationssystem", "Stadt"]
+
+
+def _requirePyarrow():
+    if pa is None:
+        raise ImportError("Für den Parquet-Datensatz wird das Paket pyarrow benötigt (pip install pyarrow)")
+
+
+def _schema(types):
+    _requirePyarrow()
+    return pa.schema([(INDEX_COLUMN, pa.int64())] + [(column, pa.from_numpy_dtype(type) if type != "string"
+                                                       else pa.string()) for column, type in types])
+
+
+def rawSchema():
+    """Schema des AutoDFraw: alle Spalten als Text, *Leasing* als bool."""
+
+    return _schema([(column, "bool" if column == "Leasing" else "string") for column in COLUMNS])
+
+
+def cleanSchema():
+    """Schema des bereinigten AutoDF nach dem Feature Engineering."""
+
+    return _schema([(column, CLEAN_TYPES.get(column, "string")) for column in CLEAN_COLUMNS])
+
+
+def partitioning():
+    return ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.int16())]), flavor="hive")
+
+
+def partitionYear(erstzulassung):
+    """Jahr der Erstzulassung als Int16, aus "MM/JJJJ" (roh) oder der bereinigten Jahreszahl."""
+
+    if pd.api.types.is_numeric_dtype(erstzulassung):
+        return erstzulassung.round().astype("Int16")
+    return pd.to_numeric(erstzulassung.str.extract(YEAR, expand=False), errors="coerce").astype("Int16")
+
+
+def _toTable(df, schema, nanAsNull=True):
+    #Dataframe inklusive Index als Arrow-Tabelle mit den Datentypen aus schema
+    missing = [name for name in schema.names if name not in (INDEX_COLUMN, ID_COLUMN) and name not in df.columns]
+    if missing:
+        raise ValueError("Spalten fehlen im Dataframe: %s" % ", ".join(missing))
+    frame = df.rename_axis(INDEX_COLUMN).reset_index()
+    #Daten von vor Einführung der listing_id, z.B. AutoDF_raw.xlsx, erhalten eine leere Spalte
+    if ID_COLUMN in schema.names and ID_COLUMN not in frame.columns:
+        frame[ID_COLUMN] = None
+    #Reihenfolge der Spalten wie im Dataframe
+    fields = [schema.field(column) if column in schema.names
+              else pa.Schema.from_pandas(frame[[column]], preserve_index=False).field(column)
+              for column in frame.columns]
+    arrays = [pa.array(frame[field.name], type=field.type,
+                       from_pandas=nanAsNull or not pa.types.is_floating(field.type)) for field in fields]
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def writeDataset(df, path, schema=None, compression="zstd", rowGroupSize=100000):
+    """Schreibt *df* als nach Erstzulassungsjahr partitionierten Parquet-Datensatz nach *path*.
+
+    *schema* ist :func:`rawSchema` (Standard) oder :func:`cleanSchema`. Spalten
+    aus *schema* müssen in *df* enthalten sein und erhalten den Datentyp aus
+    *schema*; nur *listing_id* darf fehlen und wird dann leer gespeichert.
+    Weitere Spalten werden mit ihrem eigenen Datentyp gespeichert.
+    Ein bestehender Datensatz in *path* wird ersetzt.
+    """
+
+    _requirePyarrow()
+    table = _toTable(df, schema or rawSchema())
+    table = table.append_column(pa.field(PARTITION_COLUMN, pa.int16()),
+                                pa.array(partitionYear(df["Erstzulassung"]), type=pa.int16(), from_pandas=True))
+    #Jahre, die im neuen Stand fehlen, dürfen nicht im Datensatz zurückbleiben
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    ds.write_dataset(table, path, format="parquet", partitioning=partitioning(), max_rows_per_group=rowGroupSize,
+                     file_options=ds.ParquetFileFormat().make_write_options(compression=compression))
+
+
+def openDataset(path):
+    """Gibt den Parquet-Datensatz in *path* als ``pyarrow.dataset.Dataset`` zurück."""
+
+    _requirePyarrow()
+    return ds.dataset(path, format="parquet", partitioning=partitioning())
+
+
+def readDataset(path, columns=None, filters=None):
+    """Lädt den Parquet-Datensatz *path* als Dataframe.
+
+    *columns* wählt die zu lesenden Spalten (Standard: alle außer der
+    Partitionsspalte *Jahr*). *filters* ist ein pyarrow-Ausdruck oder eine
+    Liste von Bedingungen wie bei ``pd.read_parquet``, z.B.
+    ``[("Jahr", ">=", 2015), ("Kraftstoff", "==", "Elektro")]``; Bedingungen
+    auf *Jahr* überspringen ganze Verzeichnisse.
+    """
+
+    dataset = openDataset(path)
+    if columns is None:
+        columns = [name for name in dataset.schema.names if name != PARTITION_COLUMN]
+    if filters is not None and not isinstance(filters, ds.Expression):
+        filters = pq.filters_to_expression(filters)
+    read = list(columns) if INDEX_COLUMN in columns else [INDEX_COLUMN] + list(columns)
+    df = dataset.to_table(columns=read, filter=filters).to_pandas()
+    return df.set_index(INDEX_COLUMN).sort_index()
+
+
+def writeFeather(df, path, schema=None):
+    """Schreibt *df* als unkomprimierte Arrow IPC-Datei *path* zum Öffnen mit :func:`readFeather`.
+
+    *schema* ist :func:`cleanSchema` (Standard) oder :func:`rawSchema`. Alle
+    Spalten liegen in einem einzigen Record Batch und fehlende Fließkommawerte
+    als NaN statt als null vor, damit beim Lesen nichts umgewandelt werden muss.
+    """
+
+    _requirePyarrow()
+    table = _toTable(df, schema or cleanSchema(), nanAsNull=False).combine_chunks()
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=max(1, len(table)))
+
+
+def readFeather(path, columns=None, arrowStrings=False):
+    """Öffnet die Arrow IPC-Datei *path* per Memory Map und gibt das Dataframe zurück.
+
+    Der Index und die numerischen Spalten ohne null werden nicht kopiert,
+    sondern verweisen auf die gemappte Datei; das Dataframe darf daher nicht
+    verändert werden (``df.copy()`` für eine eigene Kopie). bool-Spalten sind
+    in Arrow bitweise gespeichert und werden entpackt, Textspalten je Prozess
+    als Python-Objekte erzeugt, mit *arrowStrings* stattdessen als
+    ``string[pyarrow]`` ohne Kopie. *columns* wählt die zu lesenden Spalten.
+    """
+
+    _requirePyarrow()
+    source = pa.memory_map(path, "r")
+    table = pa.ipc.open_file(source).read_all()
+    if columns is not None:
+        table = table.select([INDEX_COLUMN] + [column for column in columns if column != INDEX_COLUMN])
+    mapper = {pa.string(): pd.StringDtype("pyarrow")}.get if arrowStrings else None
+    #split_blocks verhindert, dass pandas gleichartige Spalten in einen gemeinsamen Block kopiert;
+    #der Index wird zugewiesen, da set_index das Dataframe kopieren würde
+    df = table.drop([INDEX_COLUMN]).to_pandas(split_blocks=True, types_mapper=mapper)
+    df.index = pd.Index(table.column(INDEX_COLUMN).to_numpy(), name=INDEX_COLUMN)
+    return df
@@ -0,0 +1,520 @@
+"""Speichern der gecrawlten Angebote in der Tabelle *autoscout24cars*.
+
+Im inkrementellen Modus werden die bereits gespeicherten Angebote (ID und
+Preis) aus der Datenbank gelesen, nur neue Angebote und Preisänderungen
+gecrawlt und anschließend eingefügt bzw. aktualisiert, statt täglich den
+kompletten Crawl erneut zu speichern.
+
+Große Mengen werden mit :func:`copyLoad` per ``COPY ... FROM STDIN`` in
+PostgreSQL geladen statt mit ``DataFrame.to_sql`` als einzelne INSERTs.
+:func:`upsertLoad` lädt einen Crawl per COPY in eine temporäre Tabelle und
+übernimmt ihn von dort mit ``INSERT ... ON CONFLICT (listing_id) DO UPDATE``
+in die bestehende Tabelle, sodass neue Crawls gespeichert werden können,
+ohne die Tabelle zu löschen.
+
+:func:`readChunks` liest die Tabelle über einen serverseitigen Cursor in
+Dataframes fester Größe, statt sie mit ``pd.read_sql_query`` komplett in den
+Arbeitsspeicher zu laden; Spaltenauswahl und Bedingungen werden dabei bereits
+in SQL ausgewertet.
+
+Mit :func:`migrateSchema` wird die Tabelle in ein verwaltetes Schema
+überführt: nach dem Jahr der Erstzulassung (*Jahr*, wie beim Parquet-Datensatz)
+in Partitionen aufgeteilt, mit den aus den Rohdaten berechneten Spalten
+*Marke* und *Preis_EUR*, B-Tree-Indizes für die üblichen Filter und
+Gruppierungen und einem BRIN-Index auf dem Crawlzeitpunkt *crawled_at*.
+:func:`upsertLoad` berechnet diese Spalten beim Laden neuer Crawls.
+"""
+
+import io
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from .crawl import Crawler
+from .dataset import CLEAN_TYPES, PARTITION_COLUMN
+from .fields import COLUMNS, ID_COLUMN
+from .records import RecordBuilder
+
+TABLE = "autoscout24cars"
+
+#Datentyp der Spalten des AutoDFraw, alle weiteren Spalten nach dtype wie bei to_sql
+CAR_TYPES = {column: "BOOLEAN" if column == "Leasing" else "TEXT" for column in COLUMNS}
+#dtype.kind -> Datentyp in PostgreSQL
+SQL_TYPES = {"b": "BOOLEAN", "i": "BIGINT", "u": "BIGINT", "f": "DOUBLE PRECISION", "M": "TIMESTAMP"}
+#Datentyp der numerischen Spalten des bereinigten AutoDF, für copyLoad(..., types=CLEAN_SQL_TYPES)
+CLEAN_SQL_TYPES = {column: SQL_TYPES[pd.api.types.pandas_dtype(dtype).kind] for column, dtype in CLEAN_TYPES.items()}
+#Darstellung von NaN im CSV, damit leere Texte nicht als NULL geladen werden
+COPY_NULL = "\\N"
+#Im verwalteten Schema aus den Rohdaten berechnete Spalten: Datentyp und SQL-Ausdruck wie im Notebook.
+#Angebote ohne Jahr der Erstzulassung erhalten Jahr 0 und liegen in der Default-Partition.
+DERIVED = {PARTITION_COLUMN: ("SMALLINT NOT NULL DEFAULT 0",
+                              "COALESCE(CAST(substring(\"Erstzulassung\" from '(\\d{4})') AS SMALLINT), 0)"),
+           "Marke": ("TEXT", "(regexp_split_to_array(\"Titel\", '\\s+'))[1]"),
+           "Preis_EUR": ("BIGINT", "CAST(NULLIF(regexp_replace(regexp_replace(\"Preis\", ',-.*', ''), '[^0-9]+', '',"
+                                   " 'g'), '') AS BIGINT)")}
+#Zeitpunkt, zu dem das Angebot eingefügt oder zuletzt geändert wurde
+CRAWLED_AT = "crawled_at"
+#Spalten mit B-Tree-Index im verwalteten Schema
+INDEXED = ["Marke", "Kraftstoff", "Getriebe", "Preis_EUR"]
+#Python-Typ der Spalte -> dtype der gelesenen Chunks
+CHUNK_TYPES = {bool: "bool", int: "int64", float: "float64"}
+
+
+@dataclass
+class DeltaSummary:
+    """Änderungen eines inkrementellen Crawls an der Tabelle."""
+
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    table: str = TABLE
+
+    def __str__(self):
+        return "%s: %d Angebote eingefügt, %d Preise aktualisiert, %d unverändert" % (
+            self.table, self.inserted, self.updated, self.unchanged)
+
+
+@dataclass
+class LoadSummary:
+    """Ergebnis eines Ladevorgangs mit :func:`copyLoad`."""
+
+    rows: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    table: str = TABLE
+
+    def __str__(self):
+        return "%s: %d Zeilen in %d Batches in %.1f s geladen (%.0f Zeilen/s)" % (
+            self.table, self.rows, self.batches, self.seconds, self.rows / self.seconds if self.seconds else 0.0)
+
+
+@dataclass
+class UpsertSummary(LoadSummary):
+    """Ergebnis eines Ladevorgangs mit :func:`upsertLoad`."""
+
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    copySeconds: float = 0.0
+    mergeSeconds: float = 0.0
+
+    def __str__(self):
+        return ("%s: %d Zeilen per COPY in %.1f s bereitgestellt, %d eingefügt, %d aktualisiert, %d unverändert "
+                "in %.1f s übernommen" % (self.table, self.rows, self.copySeconds, self.inserted, self.updated,
+                                          self.unchanged, self.mergeSeconds))
+
+
+@dataclass
+class MigrationSummary:
+    """Ergebnis von :func:`migrateSchema`."""
+
+    rows: int = 0
+    duplicates: int = 0
+    partitions: int = 0
+    seconds: float = 0.0
+    migrated: bool = False
+    table: str = TABLE
+
+    def __str__(self):
+        if not self.migrated:
+            return "%s: Tabelle ist bereits partitioniert" % self.table
+        return "%s: %d Zeilen in %d Partitionen übernommen, %d doppelte listing_id entfernt, %.1f s" % (
+            self.table, self.rows, self.partitions, self.duplicates, self.seconds)
+
+
+def sqlType(column, dtype, types=None):
+    #Spalten des AutoDFraw bleiben Text, auch wenn sie im ersten Batch nur NaN enthalten
+    return (types or {}).get(column) or CAR_TYPES.get(column) or SQL_TYPES.get(dtype.kind, "TEXT")
+
+
+def _frames(data, index):
+    #DataFrame oder Iterator über DataFrames/RecordBuilder, ohne eigenen Index fortlaufend nummeriert
+    if isinstance(data, pd.DataFrame):
+        yield data
+        return
+    start = 0
+    for frame in data:
+        if isinstance(frame, RecordBuilder):
+            frame = frame.toDataFrame()
+        if index:
+            frame = frame.set_axis(range(start, start + len(frame)))
+        start += len(frame)
+        yield frame
+
+
+def _createTable(cursor, frame, table, index, indexLabel, types=None):
+    #gleiche Tabelle wie DataFrame.to_sql, inklusive Index auf der Index-Spalte
+    columns = ['"%s" %s' % (column, sqlType(column, dtype, types)) for column, dtype in frame.dtypes.items()]
+    if index:
+        columns.insert(0, '"%s" BIGINT' % indexLabel)
+    cursor.execute('CREATE TABLE "%s" (%s)' % (table, ", ".join(columns)))
+    if index:
+        cursor.execute('CREATE INDEX "ix_%s_%s" ON "%s" ("%s")' % (table, indexLabel, table, indexLabel))
+
+
+def _copyFrames(cursor, frames, table, batchSize, summary, index=True, indexLabel="index", prepare=None):
+    #Schreibt die Dataframes als CSV in einen Puffer und überträgt je batchSize Zeilen mit einem COPY.
+    #prepare wird vor dem ersten COPY mit dem ersten Dataframe aufgerufen. Gibt die Spalten zurück.
+    columns = None
+    statement = None
+    buffer = io.StringIO()
+    pending = 0
+
+    def flush():
+        buffer.seek(0)
+        cursor.copy_expert(statement, buffer)
+        buffer.seek(0)
+        buffer.truncate()
+        summary.batches += 1
+
+    for frame in frames:
+        if statement is None:
+            if prepare is not None:
+                prepare(frame)
+            columns = ([indexLabel] if index else []) + list(frame.columns)
+            statement = "COPY \"%s\" (%s) FROM STDIN WITH (FORMAT csv, NULL '%s')" % (
+                table, ", ".join('"%s"' % column for column in columns), COPY_NULL)
+        offset = 0
+        while offset < len(frame):
+            part = frame.iloc[offset:offset + batchSize - pending]
+            part.to_csv(buffer, header=False, index=index, na_rep=COPY_NULL)
+            offset += len(part)
+            pending += len(part)
+            summary.rows += len(part)
+            if pending >= batchSize:
+                flush()
+                pending = 0
+    if pending:
+        flush()
+    return columns
+
+
+def _checkPostgres(engine):
+    if engine.dialect.name != "postgresql":
+        raise ValueError("COPY wird nur von PostgreSQL unterstützt, nicht von %s" % engine.dialect.name)
+
+
+def copyLoad(engine, data, table=TABLE, batchSize=100000, index=True, indexLabel="index", ifExists="fail",
+             types=None):
+    """Lädt *data* per ``COPY ... FROM STDIN`` in die PostgreSQL-Tabelle *table*.
+
+    *data* ist ein Dataframe wie das AutoDFraw oder ein Iterator über
+    Dataframes bzw. RecordBuilder, z.B. aus :func:`~autoscout24.crawl.iterListings`.
+    Die Zeilen werden als CSV in einen Puffer geschrieben und je *batchSize*
+    Zeilen mit einem COPY übertragen; alle Batches laufen in einer Transaktion,
+    sodass bei einem Fehler nichts geladen wird. *index*, *indexLabel* und
+    *ifExists* ("fail", "replace" oder "append") wie bei ``DataFrame.to_sql``.
+    Die Spalten des AutoDFraw werden als Text angelegt; *types* (Spalte ->
+    Datentyp in PostgreSQL) gibt abweichende Datentypen vor, z.B.
+    :data:`CLEAN_SQL_TYPES` für das bereinigte AutoDF. Gibt eine
+    :class:`LoadSummary` zurück.
+    """
+
+    _checkPostgres(engine)
+    if ifExists not in ("fail", "replace", "append"):
+        raise ValueError("ifExists muss 'fail', 'replace' oder 'append' sein, nicht %r" % ifExists)
+    summary = LoadSummary(table=table)
+    start = time.perf_counter()
+    exists = inspect(engine).has_table(table)
+    if exists and ifExists == "fail":
+        raise ValueError("Tabelle %s existiert bereits" % table)
+
+    with engine.begin() as conn:
+        cursor = conn.connection.driver_connection.cursor()
+        if exists and ifExists == "replace":
+            cursor.execute('DROP TABLE "%s"' % table)
+            exists = False
+
+        def prepare(frame):
+            if not exists:
+                _createTable(cursor, frame, table, index, indexLabel, types)
+
+        _copyFrames(cursor, _frames(data, index), table, batchSize, summary, index, indexLabel, prepare)
+    summary.seconds = time.perf_counter() - start
+    return summary
+
+
+def _partitioned(cursor, table):
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))",
+                   ('"%s"' % table,))
+    return cursor.fetchone()[0]
+
+
+def _createPartitions(cursor, table, years):
+    #je Jahr eine Partition, Jahr 0 (unbekannt) in der Default-Partition; gibt die Anzahl zurück
+    years = sorted(year for year in set(years) if year)
+    for year in years:
+        cursor.execute('CREATE TABLE IF NOT EXISTS "%s_%d" PARTITION OF "%s" FOR VALUES FROM (%d) TO (%d)'
+                       % (table, year, table, year, year + 1))
+    cursor.execute('CREATE TABLE IF NOT EXISTS "%s_default" PARTITION OF "%s" DEFAULT' % (table, table))
+    return len(years) + 1
+
+
+def _createIndexes(cursor, table, indexLabel):
+    cursor.execute('CREATE INDEX IF NOT EXISTS "ix_%s_%s" ON "%s" ("%s")' % (table, indexLabel, table, indexLabel))
+    #eindeutige Indizes auf partitionierten Tabellen müssen die Partitionsspalte enthalten
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS "ux_%s_%s" ON "%s" (%s, "%s")'
+                   % (table, ID_COLUMN, table, ID_COLUMN, PARTITION_COLUMN))
+    for column in INDEXED:
+        cursor.execute('CREATE INDEX IF NOT EXISTS "ix_%s_%s" ON "%s" ("%s")' % (table, column, table, column))
+    #die Zeilen werden in der Reihenfolge des Crawls angehängt, daher genügt ein BRIN-Index
+    cursor.execute('CREATE INDEX IF NOT EXISTS "brin_%s_%s" ON "%s" USING brin (%s)'
+                   % (table, CRAWLED_AT, table, CRAWLED_AT))
+
+
+def migrateSchema(engine, table=TABLE, indexLabel="index"):
+    """Überführt *table* in das verwaltete, nach *Jahr* partitionierte Schema mit Indizes.
+
+    Die bestehenden Spalten werden übernommen und *Jahr*, *Marke*, *Preis_EUR*
+    sowie *crawled_at* (Zeitpunkt der Migration) ergänzt. Je listing_id und
+    Jahr bleibt nur der Datensatz mit dem höchsten Index erhalten. Alles läuft
+    in einer Transaktion; eine bereits partitionierte Tabelle bleibt
+    unverändert. Neue Crawls werden danach mit :func:`upsertLoad` geladen.
+    Gibt eine :class:`MigrationSummary` zurück.
+    """
+
+    _checkPostgres(engine)
+    if not inspect(engine).has_table(table):
+        raise ValueError("Tabelle %s existiert nicht" % table)
+    ensureListingID(engine, table)
+    summary = MigrationSummary(table=table)
+    start = time.perf_counter()
+    legacy = "%s_legacy" % table
+
+    with engine.begin() as conn:
+        cursor = conn.connection.driver_connection.cursor()
+        if _partitioned(cursor, table):
+            summary.seconds = time.perf_counter() - start
+            return summary
+        cursor.execute('ALTER TABLE "%s" RENAME TO "%s"' % (table, legacy))
+        cursor.execute("SELECT attname, format_type(atttypid, atttypmod) FROM pg_attribute"
+                       " WHERE attrelid = to_regclass(%s) AND attnum > 0 AND NOT attisdropped ORDER BY attnum",
+                       ('"%s"' % legacy,))
+        columns = [(name, type) for name, type in cursor.fetchall() if name not in DERIVED and name != CRAWLED_AT]
+        definitions = ['"%s" %s' % column for column in columns]
+        definitions += ['"%s" %s' % (column, type) for column, (type, _) in DERIVED.items()]
+        definitions.append("%s TIMESTAMPTZ NOT NULL DEFAULT now()" % CRAWLED_AT)
+        cursor.execute('CREATE TABLE "%s" (%s) PARTITION BY RANGE ("%s")'
+                       % (table, ", ".join(definitions), PARTITION_COLUMN))
+        cursor.execute('SELECT DISTINCT %s FROM "%s"' % (DERIVED[PARTITION_COLUMN][1], legacy))
+        summary.partitions = _createPartitions(cursor, table, [year for year, in cursor.fetchall()])
+
+        target = ", ".join(['"%s"' % name for name, _ in columns] + ['"%s"' % column for column in DERIVED])
+        source = ", ".join(['"%s"' % name for name, _ in columns] + [expression for _, expression in DERIVED.values()])
+        cursor.execute('INSERT INTO "%s" (%s) SELECT DISTINCT ON (%s, %s) %s FROM "%s" WHERE %s IS NOT NULL'
+                       ' ORDER BY %s, %s, "%s" DESC' % (table, target, ID_COLUMN, DERIVED[PARTITION_COLUMN][1], source,
+                                                       legacy, ID_COLUMN, ID_COLUMN, DERIVED[PARTITION_COLUMN][1],
+                                                       indexLabel))
+        summary.rows = cursor.rowcount
+        cursor.execute('INSERT INTO "%s" (%s) SELECT %s FROM "%s" WHERE %s IS NULL'
+                       % (table, target, source, legacy, ID_COLUMN))
+        summary.rows += cursor.rowcount
+        cursor.execute('SELECT COUNT(*) FROM "%s"' % legacy)
+        summary.duplicates = cursor.fetchone()[0] - summary.rows
+        #Indizes erst nach dem Kopieren anlegen, die Namen sind mit der alten Tabelle frei geworden
+        cursor.execute('DROP TABLE "%s"' % legacy)
+        _createIndexes(cursor, table, indexLabel)
+        cursor.execute('ANALYZE "%s"' % table)
+    summary.migrated = True
+    summary.seconds = time.perf_counter() - start
+    return summary
+
+
+def upsertLoad(engine, data, table=TABLE, batchSize=100000, indexLabel="index"):
+    """Lädt *data* per COPY in eine temporäre Tabelle und übernimmt es mit einem Upsert in *table*.
+
+    Angebote, deren listing_id bereits gespeichert ist, werden aktualisiert,
+    sofern sich ein Wert geändert hat; alle anderen werden mit fortlaufendem
+    Index angehängt. Fehlt *table*, wird sie wie bei :func:`copyLoad` angelegt.
+    Ein eindeutiger Index auf listing_id wird bei Bedarf erstellt. Bei einer
+    mit :func:`migrateSchema` partitionierten Tabelle werden *Jahr*, *Marke*
+    und *Preis_EUR* berechnet, fehlende Jahrespartitionen angelegt und
+    *crawled_at* bei neuen und geänderten Angeboten gesetzt. *data* wie
+    bei :func:`copyLoad`; alles läuft in einer Transaktion. Gibt eine
+    :class:`UpsertSummary` zurück.
+    """
+
+    _checkPostgres(engine)
+    summary = UpsertSummary(table=table)
+    start = time.perf_counter()
+    exists = inspect(engine).has_table(table)
+    if exists:
+        ensureListingID(engine, table)
+    stage = "%s_stage" % table
+
+    with engine.begin() as conn:
+        cursor = conn.connection.driver_connection.cursor()
+        managed = exists and _partitioned(cursor, table)
+        keys = [ID_COLUMN, PARTITION_COLUMN] if managed else [ID_COLUMN]
+
+        def prepare(frame):
+            if not exists:
+                _createTable(cursor, frame, table, True, indexLabel)
+            if not managed:
+                cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS "ux_%s_%s" ON "%s" (%s)'
+                               % (table, ID_COLUMN, table, ID_COLUMN))
+            cursor.execute('CREATE TEMP TABLE "%s" (LIKE "%s" INCLUDING DEFAULTS) ON COMMIT DROP' % (stage, table))
+
+        columns = _copyFrames(cursor, _frames(data, True), stage, batchSize, summary, True, indexLabel, prepare)
+        summary.copySeconds = time.perf_counter() - start
+        if columns is None:
+            summary.seconds = summary.copySeconds
+            return summary
+
+        values = [column for column in columns if column not in [indexLabel] + keys]
+        compared = values
+        if managed:
+            derived = [column for column in DERIVED if column not in columns]
+            cursor.execute('UPDATE "%s" SET %s' % (stage, ", ".join('"%s" = %s' % (column, DERIVED[column][1])
+                                                                    for column in derived)))
+            cursor.execute('SELECT DISTINCT "%s" FROM "%s"' % (PARTITION_COLUMN, stage))
+            _createPartitions(cursor, table, [year for year, in cursor.fetchall()])
+            compared = values + [column for column in derived if column not in keys]
+            #crawled_at ändert sich nur mit den übrigen Werten
+            values = compared + [CRAWLED_AT]
+        key = ", ".join('"%s"' % column for column in keys)
+        quoted = ", ".join('"%s"' % column for column in values)
+        nextIndex = '(SELECT COALESCE(MAX("%s"), -1) FROM "%s") + ROW_NUMBER() OVER (ORDER BY "%s")' % (
+            indexLabel, table, indexLabel)
+        #neue Zeilen erhalten einen höheren Index als alle bisherigen, aktualisierte behalten ihren;
+        #xmax lässt sich bei partitionierten Tabellen in RETURNING nicht abfragen
+        cursor.execute('SELECT COALESCE(MAX("%s"), -1) FROM "%s"' % (indexLabel, table))
+        last = cursor.fetchone()[0]
+        #je listing_id nur der letzte Datensatz, da ON CONFLICT jede Zeile nur einmal ändern darf
+        cursor.execute(
+            'WITH upserted AS ('
+            ' INSERT INTO "%(table)s" ("%(index)s", %(key)s, %(columns)s)'
+            ' SELECT %(next)s, %(key)s, %(columns)s FROM'
+            ' (SELECT DISTINCT ON (%(key)s) * FROM "%(stage)s" WHERE %(id)s IS NOT NULL'
+            '  ORDER BY %(key)s, "%(index)s" DESC) AS latest'
+            ' ON CONFLICT (%(key)s) DO UPDATE SET %(set)s'
+            ' WHERE (%(current)s) IS DISTINCT FROM (%(excluded)s)'
+            ' RETURNING "%(index)s" > %(last)d AS inserted)'
+            ' SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) FROM upserted'
+            % {"table": table, "stage": stage, "index": indexLabel, "id": ID_COLUMN, "key": key, "columns": quoted,
+               "next": nextIndex, "last": last,
+               "set": ", ".join('"%s" = EXCLUDED."%s"' % (column, column) for column in values),
+               "current": ", ".join('"%s"."%s"' % (table, column) for column in compared),
+               "excluded": ", ".join('EXCLUDED."%s"' % column for column in compared)})
+        summary.inserted, summary.updated = cursor.fetchone()
+        cursor.execute('SELECT COUNT(*) FROM (SELECT DISTINCT %s FROM "%s" WHERE %s IS NOT NULL) AS listings'
+                       % (key, stage, ID_COLUMN))
+        summary.unchanged = cursor.fetchone()[0] - summary.inserted - summary.updated
+        #Angebote ohne listing_id können nicht zugeordnet werden und werden angehängt
+        cursor.execute('INSERT INTO "%s" ("%s", %s, %s) SELECT %s, %s, %s FROM "%s" WHERE %s IS NULL'
+                       % (table, indexLabel, key, quoted, nextIndex, key, quoted, stage, ID_COLUMN))
+        summary.inserted += cursor.rowcount
+    summary.seconds = time.perf_counter() - start
+    summary.mergeSeconds = summary.seconds - summary.copySeconds
+    return summary
+
+
+def _chunkTypes(engine, table):
+    #dtype je Spalte aus den Spaltentypen der Tabelle, Text und unbekannte Typen bleiben object
+    types = {}
+    for column in inspect(engine).get_columns(table):
+        try:
+            types[column["name"]] = CHUNK_TYPES.get(column["type"].python_type)
+        except NotImplementedError:
+            types[column["name"]] = None
+    return types
+
+
+def readChunks(engine, table=TABLE, columns=None, where=None, params=None, chunkSize=50000, indexLabel="index",
+               dtypes=None):
+    """Liest *table* über einen serverseitigen Cursor und gibt Dataframes mit je *chunkSize* Zeilen zurück.
+
+    *columns* wählt die Spalten (Standard: alle), *where* ist eine Bedingung in
+    SQL mit Parametern *params* im Format ``:name``, z.B.
+    ``where='"Leasing" IS NOT TRUE'``, sodass nicht benötigte Zeilen gar nicht
+    übertragen werden. Die Zeilen werden nach *indexLabel* sortiert und als
+    Index gesetzt. Die Datentypen ergeben sich aus der Tabelle wie bei
+    ``read_sql`` (Ganzzahlen mit NULL als float64, bool mit NULL als object)
+    und können mit *dtypes* festgelegt werden. Mit psycopg2 hält die
+    Datenbank das Ergebnis in einem benannten Cursor, im Client liegt immer
+    nur ein Chunk.
+    """
+
+    types = _chunkTypes(engine, table)
+    if columns is None:
+        columns = [column for column in types if column != indexLabel]
+    read = ([indexLabel] if indexLabel else []) + [column for column in columns if column != indexLabel]
+    sql = 'SELECT %s FROM "%s"' % (", ".join('"%s"' % column for column in read), table)
+    if where:
+        sql += " WHERE %s" % where
+    if indexLabel:
+        sql += ' ORDER BY "%s"' % indexLabel
+
+    with engine.connect() as conn:
+        #stream_results ist bei psycopg2 ein benannter Cursor auf dem Server
+        result = conn.execution_options(stream_results=True, max_row_buffer=chunkSize).execute(text(sql), params or {})
+        for rows in result.partitions(chunkSize):
+            frame = pd.DataFrame.from_records(rows, columns=read)
+            for column in read:
+                dtype = types.get(column)
+                if dtype is not None and frame[column].isna().any():
+                    dtype = "float64" if dtype == "int64" else None
+                if dtype is not None:
+                    frame[column] = frame[column].astype(dtype)
+            if dtypes:
+                frame = frame.astype(dtypes)
+            yield frame.set_index(indexLabel) if indexLabel else frame
+
+
+def ensureListingID(engine, table=TABLE):
+    """Ergänzt eine vor Einführung der listing_id angelegte Tabelle um diese Spalte."""
+
+    columns = [column["name"] for column in inspect(engine).get_columns(table)]
+    if ID_COLUMN not in columns:
+        with engine.begin() as conn:
+            conn.execute(text('ALTER TABLE "%s" ADD COLUMN %s TEXT' % (table, ID_COLUMN)))
+
+
+def loadKnownListings(engine, table=TABLE):
+    """Gibt ein dict listing_id -> Preis aller gespeicherten Angebote zurück (leer ohne Tabelle)."""
+
+    if not inspect(engine).has_table(table):
+        return {}
+    ensureListingID(engine, table)
+    with engine.connect() as conn:
+        rows = conn.execute(text('SELECT %s, "Preis" FROM "%s" WHERE %s IS NOT NULL' % (ID_COLUMN, table, ID_COLUMN)))
+        return dict(rows.fetchall())
+
+
+def writeDelta(engine, deltaDF, known, table=TABLE):
+    """Fügt neue Angebote aus *deltaDF* ein und aktualisiert die Preise bekannter Angebote.
+
+    Beides läuft über :func:`upsertLoad`, sodass bei einer mit
+    :func:`migrateSchema` verwalteten Tabelle auch *Jahr*, *Marke*,
+    *Preis_EUR* und *crawled_at* gesetzt werden. *known* ist das dict aus
+    :func:`loadKnownListings`, das nach dem Schreiben dem neuen Stand
+    entspricht. Gibt eine :class:`DeltaSummary` zurück.
+    """
+
+    summary = DeltaSummary(table=table)
+    if deltaDF.empty:
+        return summary
+    upserted = upsertLoad(engine, deltaDF, table)
+    known.update(zip(deltaDF[ID_COLUMN], deltaDF["Preis"]))
+    summary.inserted = upserted.inserted
+    summary.updated = upserted.updated
+    return summary
+
+
+def crawlIncremental(engine, fregList, pages=20, table=TABLE, **kwargs):
+    """Crawlt nur neue Angebote und Preisänderungen und schreibt sie in *table*.
+
+    Weitere Parameter werden an den :class:`~autoscout24.crawl.Crawler`
+    übergeben. Gibt (Dataframe der Änderungen, :class:`DeltaSummary`) zurück.
+    """
+
+    known = loadKnownListings(engine, table)
+    crawler = Crawler(known=known, **kwargs)
+    deltaDF = crawler.crawl(fregList, pages)
+    print(crawler.summary)
+    summary = writeDelta(engine, deltaDF, known, table)
+    summary.unchanged = crawler.summary.unchanged
+    print(summary)
+    return deltaDF, summary
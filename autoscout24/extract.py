@@ -0,0 +1,148 @@
+"""Extraktion der Fahrzeugdaten aus einer Autoscout24 Suchergebnisseite."""
+
+import re
+import time
+
+from bs4 import BeautifulSoup
+
+from .fields import buildRecord, classify, isVehicleDetailList
+from .lxmlparse import etree, parseLxmlRecords
+from .nextdata import parseNextDataRecords
+from .records import RecordBuilder
+from .session import defaultSession
+
+#Pro Suchergebnisseite werden maximal 20 Fahrzeuge angezeigt
+PAGE_SIZE = 20
+
+#Überschrift der Ergebnisliste, z.B. "1.234 Angebote für Gebrauchtwagen"
+RESULT_COUNT = re.compile(r">\s*([\d.]+)\s+Angebote")
+
+#ID eines Angebots im Attribut id des article Elements
+LISTING_ID = re.compile(r'<article\b[^>]*?\bid="([^"]+)"')
+
+
+def parseSoupRecords(html, skip=()):
+    """Extrahiert die Fahrzeuge einer Suchergebnisseite mit BeautifulSoup als :class:`RecordBuilder`.
+
+    Angebote, deren ID in *skip* enthalten ist, werden übersprungen.
+    """
+
+    soup=BeautifulSoup(html,"html.parser")
+    records = RecordBuilder()
+
+    for car in soup.find_all("article"):
+        listingID = car.get("id")
+        if listingID in skip:
+            continue
+        #Titel, Preis, Standort und VehicleDetailTable in einem Durchlauf über das Angebot
+        found = {}
+        for element in car.descendants:
+            if element.name is None:
+                continue
+            key = classify(element.name, element.get("class") or (), element.get("style"))
+            if key is None or key in found:
+                continue
+            if key == "Details":
+                VehicleDetailList = [c.text for c in element]
+                if isVehicleDetailList(VehicleDetailList):
+                    found[key] = VehicleDetailList
+            else:
+                found[key] = element.text
+        records.append(buildRecord(found, listingID))
+
+    return records
+
+
+def parseNextRecords(html, skip=()):
+    """Extrahiert die Fahrzeuge aus dem ``__NEXT_DATA__`` JSON oder, falls es fehlt, über den DOM."""
+
+    records = parseNextDataRecords(html, skip)
+    if records is not None:
+        return records
+    return parseLxmlRecords(html, skip) if etree is not None else parseSoupRecords(html, skip)
+
+
+#Verfügbare Parser, "lxml" ist deutlich schneller und liefert dieselben Daten,
+#"nextdata" liest die eingebetteten Next.js-Daten und nur ohne diese den DOM
+PARSERS = {"bs4": parseSoupRecords, "lxml": parseLxmlRecords, "nextdata": parseNextRecords}
+
+
+def parsePageRecords(html, parser="bs4", skip=()):
+    """Extrahiert die Fahrzeuge einer Suchergebnisseite als :class:`RecordBuilder`.
+
+    *parser* wählt das Backend aus :data:`PARSERS`. Angebote mit einer ID aus
+    *skip* werden nicht geparst.
+    """
+
+    try:
+        parse = PARSERS[parser]
+    except KeyError:
+        raise ValueError("Unbekannter Parser %r, verfügbar: %s" % (parser, ", ".join(PARSERS))) from None
+    return parse(html, skip)
+
+
+def parsePageCarDF(html, parser="bs4"):
+    """Erzeugt das pageCarDF aus dem HTML-Quelltext einer Suchergebnisseite."""
+
+    return parsePageRecords(html, parser).toDataFrame()
+
+
+def extractPageCarDF(URL, session=None, parser="bs4", metrics=None):
+    """Lädt die Suchergebnisseite *URL* und gibt das pageCarDF zurück.
+
+    Ohne *session* wird die gemeinsame :func:`~autoscout24.session.defaultSession`
+    verwendet, sodass aufeinanderfolgende Aufrufe die Verbindung wiederverwenden.
+    Mit *metrics* (:class:`~autoscout24.metrics.CrawlMetrics`) werden
+    Parse-Zeit und Anzahl Fahrzeuge erfasst.
+    """
+
+    session = session or defaultSession()
+    html = session.get(URL)
+    if metrics is None:
+        return parsePageCarDF(html, parser)
+    start = time.perf_counter()
+    records = parsePageRecords(html, parser)
+    metrics.observe("parse_seconds", time.perf_counter() - start)
+    metrics.observe("rows_per_page", len(records))
+    return records.toDataFrame()
+
+
+def parseResultCount(html):
+    """Gibt die Gesamtzahl der Suchergebnisse laut Überschrift zurück (oder None)."""
+
+    match = RESULT_COUNT.search(html)
+    if match is None:
+        return None
+    return int(match.group(1).replace(".", ""))
+
+
+def listingIDs(html):
+    """IDs aller Angebote einer Seite, ohne die Seite zu parsen."""
+
+    return LISTING_ID.findall(html)
+
+
+def pageFingerprint(records):
+    """Fingerabdruck der Fahrzeuge einer Seite, um wiederholte Seiten zu erkennen."""
+
+    return hash(tuple(tuple(map(str, row)) for row in records.rows()))
+
+
+def parsePage(html, parser="bs4", skip=()):
+    """Verarbeitet eine Suchergebnisseite zu (RecordBuilder, Anzahl Suchergebnisse).
+
+    Die Funktion ist auf Modulebene definiert, damit sie auch in einem
+    ``ProcessPoolExecutor`` ausgeführt werden kann. Die Spaltenlisten des
+    RecordBuilders lassen sich günstiger zwischen Prozessen übertragen als ein
+    Dataframe.
+    """
+
+    return parsePageRecords(html, parser, skip), parseResultCount(html)
+
+
+def timedParsePage(html, parser="bs4", skip=()):
+    """Wie :func:`parsePage`, gibt zusätzlich die Parse-Zeit in Sekunden zurück."""
+
+    start = time.perf_counter()
+    result = parsePage(html, parser, skip)
+    return result, time.perf_counter() - start
@@ -0,0 +1,75 @@
+"""Zuordnung der HTML-Elemente eines Angebots zu den Spalten des pageCarDF.
+
+Beide Parser-Backends laufen je ``article`` einmal über alle Elemente, ordnen
+jedes Element mit :func:`classify` einem Feld zu und erzeugen daraus mit
+:func:`buildRecord` genau einen Datensatz pro Fahrzeug.
+"""
+
+import re
+
+import numpy as np
+
+CAR_COLUMNS = ["Titel", "Version", "Untertitel", "Preis", "Leasing", "Standort"]
+DETAIL_COLUMNS = ["km", "Erstzulassung", "PS", "Zustand", "Fahrzeughalter", "Getriebe", "Kraftstoff",
+                  "Verbrauch_l_pro_100km", "Emissionen_g_pro_km"]
+#Stabile ID des Angebots aus dem Attribut id des article Elements
+ID_COLUMN = "listing_id"
+COLUMNS = CAR_COLUMNS + DETAIL_COLUMNS + [ID_COLUMN]
+
+#(Klassen-Präfix, Tag, Feld)
+PREFIXES = (("ListItem_version", "span", "Version"),
+            ("ListItem_subtitle", "span", "Untertitel"),
+            ("ListItem_pricerow", "div", "Preis"),
+            ("LeasingPrice_price", "span", "Leasingrate"))
+DETAIL_TABLE = "VehicleDetailTable_container__mUUbY"
+ADDRESS_STYLE = "grid-area:address"
+
+
+def classify(tag, classes, style):
+    """Feld des Elements mit Tag *tag*, Klassen *classes* und Style *style*, sonst None."""
+
+    if tag == "h2":
+        return "Titel"
+    if tag == "span" and style and style.startswith(ADDRESS_STYLE):
+        return "Standort"
+    for cls in classes:
+        if tag == "div" and cls == DETAIL_TABLE:
+            return "Details"
+        for prefix, prefixTag, key in PREFIXES:
+            if tag == prefixTag and cls.startswith(prefix):
+                return key
+    return None
+
+
+def isVehicleDetailList(cells):
+    #VehicleDetailTables mit Länge 3 sind extra Tabellen bei Leasing Wagen und werden übersprungen
+    return len(cells) >= len(DETAIL_COLUMNS)
+
+
+def priceKey(price):
+    """Preis als Ziffernfolge, damit z.B. "€ 15.090,-" und "15090" als gleich gelten."""
+
+    return re.sub(r"\D", "", price) if isinstance(price, str) else price
+
+
+def buildRecord(found, listingID=None):
+    """Erzeugt den Datensatz eines Fahrzeugs aus den gefundenen Feldern *found*.
+
+    *found* enthält je Feld den Text des ersten passenden Elements und unter
+    ``"Details"`` die Einträge der VehicleDetailTable. *listingID* ist die ID
+    des Angebots.
+    """
+
+    #Ohne Preis Element handelt es sich um einen Leasing Wagen
+    leasing = "Preis" not in found
+    if leasing and "Leasingrate" not in found:
+        raise AttributeError("Weder Preis noch Leasingrate gefunden")
+    record = {"Titel": found.get("Titel", np.nan), "Version": found.get("Version", np.nan),
+              "Untertitel": found.get("Untertitel", np.nan),
+              "Preis": found["Leasingrate"] if leasing else found["Preis"], "Leasing": leasing,
+              "Standort": found.get("Standort", np.nan)}
+    details = found.get("Details", ())
+    for i, column in enumerate(DETAIL_COLUMNS):
+        record[column] = details[i] if i < len(details) else np.nan
+    record[ID_COLUMN] = listingID or np.nan
+    return record
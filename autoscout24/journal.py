@@ -0,0 +1,88 @@
+"""Crawl-Journal, um einen abgebrochenen Crawl fortsetzen zu können.
+
+Jede fertig verarbeitete Seite (Erstzulassungsjahr, Seite) wird mit ihren
+Fahrzeugdaten in einer SQLite-Datei gespeichert. Bricht der Crawl ab, werden
+beim erneuten Start alle bereits erledigten Seiten aus dem Journal gelesen und
+nur die fehlenden Seiten geladen.
+"""
+
+import json
+import sqlite3
+import time
+
+from .fields import ID_COLUMN
+from .records import RecordBuilder
+
+
+class CrawlJournal:
+    """Journal der erledigten Seiten eines Crawls in der SQLite-Datei *path*.
+
+    Für einen komplett neuen Crawl wird das Journal mit :meth:`clear` geleert
+    oder eine neue Datei verwendet.
+    """
+
+    def __init__(self, path="autoscout24_journal.sqlite"):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS units (
+                                freg INTEGER NOT NULL,
+                                page INTEGER NOT NULL,
+                                resultCount INTEGER,
+                                rows TEXT NOT NULL,
+                                finishedAt REAL NOT NULL,
+                                PRIMARY KEY (freg, page))""")
+        self._db.commit()
+
+    def load(self, freg, page):
+        """Gibt (RecordBuilder, Anzahl Suchergebnisse, Angebots-IDs) einer erledigten Seite zurück, sonst None.
+
+        Die IDs sind alle Angebote der Seite, auch die beim Parsen übersprungenen;
+        ältere Journale ohne IDs liefern die IDs der gespeicherten Fahrzeuge.
+        """
+
+        row = self._db.execute("SELECT resultCount, rows FROM units WHERE freg = ? AND page = ?",
+                               (freg, page)).fetchone()
+        if row is None:
+            return None
+        resultCount, rows = row
+        rows = json.loads(rows)
+        records = RecordBuilder.fromRows(rows["data"], rows["columns"])
+        listings = rows.get("listings")
+        if listings is None:
+            listings = list(records.data.get(ID_COLUMN, []))
+        return records, resultCount, listings
+
+    def record(self, freg, page, records, resultCount=None, listings=None):
+        """Speichert die Fahrzeuge *records* (:class:`RecordBuilder`) einer fertig verarbeiteten Seite.
+
+        *listings* sind die IDs aller Angebote der Seite vor dem Entfernen doppelter Angebote.
+        """
+
+        rows = {"columns": records.columns, "data": records.rows()}
+        if listings is not None:
+            rows["listings"] = list(listings)
+        rows = json.dumps(rows)
+        self._db.execute("INSERT OR REPLACE INTO units VALUES (?, ?, ?, ?, ?)",
+                         (freg, page, resultCount, rows, time.time()))
+        self._db.commit()
+
+    def finished(self):
+        """Liste der erledigten (freg, page) Paare."""
+
+        return self._db.execute("SELECT freg, page FROM units ORDER BY freg, page").fetchall()
+
+    def clear(self):
+        """Leert das Journal, damit der nächste Crawl von vorne beginnt."""
+
+        self._db.execute("DELETE FROM units")
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
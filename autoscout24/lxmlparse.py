@@ -0,0 +1,88 @@
+"""Schneller Parser für die Suchergebnisseiten auf Basis von lxml.
+
+Statt für jedes Element eine ``lambda L: L.startswith(...)`` Funktion
+aufzurufen, werden alle relevanten Elemente eines Angebots mit einem einmalig
+kompilierten XPath-Ausdruck in Dokumentreihenfolge ausgewählt. Die Ergebnisse
+entsprechen Feld für Feld denen des BeautifulSoup-Parsers in
+:func:`~autoscout24.extract.parseSoupRecords`.
+"""
+
+from .fields import ADDRESS_STYLE, DETAIL_TABLE, PREFIXES, buildRecord, classify, isVehicleDetailList
+from .records import RecordBuilder
+
+try:
+    from lxml import etree
+    from lxml import html as lxmlhtml
+except ImportError:  # pragma: no cover - lxml ist optional
+    etree = lxmlhtml = None
+
+
+def _classPrefix(tag, prefix):
+    #Wie BeautifulSoup: irgendeine der Klassen beginnt mit prefix
+    return ".//%s[contains(concat(' ', normalize-space(@class)), ' %s')]" % (tag, prefix)
+
+
+def _compile():
+    candidates = [".//h2", ".//span[starts-with(@style, '%s')]" % ADDRESS_STYLE,
+                  ".//div[contains(concat(' ', normalize-space(@class), ' '), ' %s ')]" % DETAIL_TABLE]
+    candidates += [_classPrefix(tag, prefix) for prefix, tag, _ in PREFIXES]
+    return {
+        "articles": etree.XPath("//article"),
+        #Vereinigung aller Kandidaten, lxml liefert sie in Dokumentreihenfolge
+        "candidates": etree.XPath(" | ".join(candidates)),
+        "text": etree.XPath("string()"),
+    }
+
+
+_SELECTORS = None
+
+
+def _selectors():
+    global _SELECTORS
+    if _SELECTORS is None:
+        if etree is None:
+            raise ImportError("Für den Parser 'lxml' wird das Paket lxml benötigt (pip install lxml)")
+        _SELECTORS = _compile()
+    return _SELECTORS
+
+
+def _children(node, text):
+    #Textknoten und Elemente in Dokumentreihenfolge, wie die Iteration über ein BeautifulSoup Tag
+    if node.text:
+        yield node.text
+    for child in node:
+        if isinstance(child.tag, str):
+            yield text(child)
+        if child.tail:
+            yield child.tail
+
+
+def parseLxmlRecords(html, skip=()):
+    """Extrahiert die Fahrzeuge einer Suchergebnisseite mit lxml als :class:`RecordBuilder`.
+
+    Angebote, deren ID in *skip* enthalten ist, werden übersprungen.
+    """
+
+    sel = _selectors()
+    text = sel["text"]
+    root = lxmlhtml.document_fromstring(html)
+
+    records = RecordBuilder()
+    for car in sel["articles"](root):
+        listingID = car.get("id")
+        if listingID in skip:
+            continue
+        found = {}
+        for element in sel["candidates"](car):
+            key = classify(element.tag, element.get("class", "").split(), element.get("style"))
+            if key is None or key in found:
+                continue
+            if key == "Details":
+                VehicleDetailList = list(_children(element, text))
+                if isVehicleDetailList(VehicleDetailList):
+                    found[key] = VehicleDetailList
+            else:
+                found[key] = text(element)
+        records.append(buildRecord(found, listingID))
+
+    return records
@@ -0,0 +1,128 @@
+"""Messwerte des Crawlers als Histogramme mit Export für Prometheus und als JSON.
+
+Je Request werden DNS-Auflösung, Verbindungsaufbau, Time to First Byte,
+Download und Größe der Antwort erfasst, je Seite die Parse-Zeit und die
+Anzahl der Fahrzeuge. Die Werte werden nur in feste Buckets einsortiert,
+sodass die Messung kaum Zeit und konstanten Speicher benötigt. Ohne
+:class:`CrawlMetrics` (``metrics=None``) wird gar nicht gemessen.
+"""
+
+import bisect
+import json
+import threading
+
+PREFIX = "autoscout24_"
+
+SECONDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES = tuple(1024 * 2 ** i for i in range(15))
+ROWS = (0, 1, 5, 10, 15, 19, 20, 25, 50)
+
+#Name -> (Beschreibung, Buckets)
+HISTOGRAMS = {
+    "dns_seconds": ("Dauer der DNS-Auflösung neuer Verbindungen", SECONDS),
+    "connect_seconds": ("Dauer des Verbindungsaufbaus (TCP und TLS) neuer Verbindungen", SECONDS),
+    "ttfb_seconds": ("Zeit vom Senden des Requests bis zum ersten Byte der Antwort", SECONDS),
+    "download_seconds": ("Dauer der Übertragung des Antworttextes", SECONDS),
+    "response_bytes": ("Größe der übertragenen Seiten in Bytes", BYTES),
+    "parse_seconds": ("Dauer des Parsens einer Seite", SECONDS),
+    "rows_per_page": ("Anzahl Fahrzeuge je geparster Seite", ROWS),
+}
+
+
+class Histogram:
+    """Histogramm mit festen oberen Bucket-Grenzen *buckets*."""
+
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Schätzt das Quantil *q* durch lineare Interpolation innerhalb des Buckets."""
+
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def prometheus(self):
+        """Histogramm im Textformat von Prometheus."""
+
+        name = PREFIX + self.name
+        lines = ["# HELP %s %s" % (name, self.description), "# TYPE %s histogram" % name]
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append('%s_bucket{le="%g"} %d' % (name, bound, cumulative))
+        lines.append('%s_bucket{le="+Inf"} %d' % (name, self.count))
+        lines.append("%s_sum %r" % (name, self.sum))
+        lines.append("%s_count %d" % (name, self.count))
+        return "\n".join(lines)
+
+    def report(self):
+        return {"count": self.count, "sum": self.sum, "mean": self.sum / self.count if self.count else None,
+                "p50": self.quantile(0.5), "p95": self.quantile(0.95), "p99": self.quantile(0.99),
+                "buckets": dict(zip(map(str, self.buckets + ("+Inf",)), self.counts))}
+
+
+class CrawlMetrics:
+    """Histogramme eines Crawls.
+
+    Ist *path* angegeben, schreibt der Crawler am Ende des Crawls
+    ``<path>.prom`` (Prometheus Textformat, z.B. für den node_exporter) und
+    ``<path>.json``.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.histograms = {name: Histogram(name, description, buckets)
+                           for name, (description, buckets) in HISTOGRAMS.items()}
+
+    def observe(self, name, value):
+        self.histograms[name].observe(value)
+
+    def __getitem__(self, name):
+        return self.histograms[name]
+
+    def prometheus(self):
+        return "\n".join(histogram.prometheus() for histogram in self.histograms.values()) + "\n"
+
+    def report(self):
+        return {name: histogram.report() for name, histogram in self.histograms.items()}
+
+    def export(self, path=None):
+        """Schreibt ``<path>.prom`` und ``<path>.json`` und gibt die beiden Dateinamen zurück."""
+
+        path = path or self.path
+        with open(path + ".prom", "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        with open(path + ".json", "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+        return path + ".prom", path + ".json"
+
+    def __str__(self):
+        lines = ["%-18s %8s %10s %10s %10s" % ("Messwert", "Anzahl", "Mittel", "p50", "p95")]
+        for name, histogram in self.histograms.items():
+            if histogram.count:
+                report = histogram.report()
+                lines.append("%-18s %8d %10.4g %10.4g %10.4g"
+                             % (name, histogram.count, report["mean"], report["p50"], report["p95"]))
+        return "\n".join(lines)
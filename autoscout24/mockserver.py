@@ -0,0 +1,210 @@
+"""Lokaler Ersatz-Server für Autoscout24, der gespeicherte Suchergebnisseiten ausliefert.
+
+Die Seiten liegen als ``<freg>_<page>.html`` in einem Verzeichnis (siehe
+``fixtures/pages`` mit synthetischen Seiten aus :mod:`autoscout24.synthetic`).
+Für Seiten ohne Datei wird eine Ergebnisseite ohne Fahrzeuge zurückgegeben.
+Der :class:`MockServer` erzeugt die Seiten bei jedem Request synthetisch,
+sodass beliebig viele Jahreszahlen und Seiten gecrawlt werden können.
+
+Um das Verhalten des Crawlers unter Last zu testen, kann jede Antwort um
+*latency* Sekunden verzögert werden, fest oder zufällig aus einer Verteilung
+wie :func:`lognormalLatency`. Mit *maxInFlight* antwortet der Server mit 429
+und ``Retry-After``, sobald mehr Requests gleichzeitig laufen; mit
+*throttleRate* und *errorRate* antwortet er auf den jeweiligen Anteil der
+Requests zufällig mit 429 bzw. 503.
+"""
+
+import hashlib
+import math
+import os
+import random
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from .synthetic import SyntheticPages
+
+EMPTY_PAGE = "<!DOCTYPE html><html lang=\"de\"><head><meta charset=\"utf-8\"/></head><body><div id=\"__next\"><main></main></div></body></html>"
+
+
+def uniformLatency(low, high):
+    """Antwortzeit gleichverteilt zwischen *low* und *high* Sekunden."""
+
+    return lambda rng: rng.uniform(low, high)
+
+
+def lognormalLatency(median, sigma=0.5):
+    """Log-normalverteilte Antwortzeit mit Median *median* Sekunden, größeres *sigma* ergibt längere Ausreißer."""
+
+    return lambda rng: rng.lognormvariate(math.log(median), sigma)
+
+
+def spikyLatency(latency, spike, rate=0.01):
+    """Antwortzeit *latency*, bei dem Anteil *rate* der Requests *spike* Sekunden."""
+
+    return lambda rng: spike if rng.random() < rate else latency
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != "/lst":
+            self.send_error(404)
+            return
+        replay = self.server.replay
+        with replay.lock:
+            replay.requests += 1
+            replay.inFlight += 1
+            throttle = replay.maxInFlight is not None and replay.inFlight > replay.maxInFlight
+            draw = replay.rng.random()
+            if not throttle:
+                throttle = draw < replay.throttleRate
+            error = not throttle and draw < replay.throttleRate + replay.errorRate
+            if throttle:
+                replay.throttled += 1
+            if error:
+                replay.errors += 1
+            delay = replay.delay()
+        try:
+            if throttle:
+                self._tooManyRequests()
+            elif error:
+                time.sleep(delay)
+                self._serviceUnavailable()
+            else:
+                time.sleep(delay)
+                self._page(url)
+        finally:
+            with replay.lock:
+                replay.inFlight -= 1
+
+    def _tooManyRequests(self):
+        self.send_response(429)
+        self.send_header("Retry-After", str(self.server.replay.retryAfter))
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _serviceUnavailable(self):
+        self.send_response(503)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _page(self, url):
+        query = parse_qs(url.query)
+        freg = query.get("fregfrom", [""])[0]
+        page = query.get("page", ["0"])[0]
+        body = self.server.replay.page(freg, page).encode("utf-8")
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(self.server.replay.started, usegmt=True))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ReplayServer:
+    """HTTP-Server auf localhost, der die Seiten aus *pageDir* ausliefert.
+
+    Wird als Context Manager verwendet; ``baselink`` kann direkt an den
+    :class:`~autoscout24.crawl.Crawler` übergeben werden::
+
+        with ReplayServer("fixtures/pages") as server:
+            AutoDFraw = Crawler(baselink=server.baselink).crawl([2015, 2016], pages=4)
+
+    *latency* ist die Antwortzeit in Sekunden oder eine Verteilung, z.B.
+    ``lognormalLatency(0.05)``. *throttleRate* und *errorRate* sind die
+    Anteile der Requests, die mit 429 bzw. 503 beantwortet werden; *seed*
+    macht Latenzen und Fehler reproduzierbar.
+    """
+
+    def __init__(self, pageDir, host="127.0.0.1", port=0, latency=0.0, maxInFlight=None, retryAfter=1,
+                 throttleRate=0.0, errorRate=0.0, seed=None):
+        self.pageDir = pageDir
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.maxInFlight = maxInFlight
+        self.retryAfter = retryAfter
+        self.throttleRate = throttleRate
+        self.errorRate = errorRate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.inFlight = 0
+        self.throttled = 0
+        self.errors = 0
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def baselink(self):
+        return "http://%s:%d/lst?fregfrom=" % (self.host, self.port)
+
+    def delay(self):
+        """Antwortzeit des nächsten Requests in Sekunden."""
+
+        return self.latency(self.rng) if callable(self.latency) else self.latency
+
+    def page(self, freg, page):
+        path = os.path.join(self.pageDir, "%s_%s.html" % (freg, page))
+        if not os.path.exists(path):
+            return EMPTY_PAGE
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _ReplayHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.replay = self
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class MockServer(ReplayServer):
+    """Ersatz-Server, der synthetische Suchergebnisseiten bei jedem Request erzeugt statt Dateien auszuliefern.
+
+    *pages* ist eine :class:`~autoscout24.synthetic.SyntheticPages`, die
+    festlegt, wie viele Angebote je Jahreszahl existieren und wie hoch die
+    Anteile von Leasing Wagen und fehlenden Angaben sind. Alle weiteren
+    Parameter wie bei :class:`ReplayServer`::
+
+        with MockServer(SyntheticPages(listings=400), latency=lognormalLatency(0.05), errorRate=0.01) as server:
+            AutoDFraw = Crawler(baselink=server.baselink).crawl(range(1990, 2022))
+    """
+
+    def __init__(self, pages=None, **kwargs):
+        super().__init__(None, **kwargs)
+        self.pages = pages or SyntheticPages()
+
+    def page(self, freg, page):
+        return self.pages.page(freg, page)
@@ -0,0 +1,104 @@
+"""Extraktion der Fahrzeuge aus den eingebetteten Next.js-Daten einer Seite.
+
+Die Suchergebnisseiten werden mit Next.js erzeugt und enthalten alle
+Angebote zusätzlich als JSON im Script-Tag ``__NEXT_DATA__``. Das Script wird
+mit einer einfachen Textsuche gefunden und mit orjson (falls installiert)
+dekodiert, ohne den DOM aufzubauen. Die Angebote werden direkt auf die Spalten
+des pageCarDF abgebildet. Fehlt das JSON, wird der DOM-Parser verwendet.
+"""
+
+import json
+
+import numpy as np
+
+from .fields import DETAIL_COLUMNS, ID_COLUMN
+from .records import RecordBuilder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson ist optional
+    orjson = None
+
+SCRIPT_ID = 'id="__NEXT_DATA__"'
+
+#iconName der vehicleDetails -> Spalte der VehicleDetailTable
+DETAIL_ICONS = dict(zip(["mileage_road", "calendar", "speedometer", "car", "person", "gearbox", "gas_pump",
+                         "water_drop", "leaf"], DETAIL_COLUMNS))
+
+
+def findNextData(html):
+    """Gibt den Inhalt des ``__NEXT_DATA__`` Scripts zurück, None wenn die Seite keins enthält."""
+
+    tag = html.find(SCRIPT_ID)
+    if tag < 0:
+        return None
+    start = html.find(">", tag) + 1
+    end = html.find("</script>", start)
+    if start == 0 or end < 0:
+        return None
+    return html[start:end]
+
+
+def loadJSON(text):
+    return orjson.loads(text) if orjson is not None else json.loads(text)
+
+
+def _value(data, key):
+    #Fehlende Werte und JSON null werden wie beim DOM-Parser NaN
+    value = data.get(key)
+    return np.nan if value is None else value
+
+
+def listingRecord(listing):
+    """Bildet ein Angebot aus ``props.pageProps.listings`` auf einen Datensatz des pageCarDF ab.
+
+    Wie beim DOM-Parser (:func:`~autoscout24.fields.buildRecord`) ist ein
+    Angebot ohne Preis und ohne Leasingrate ein Fehler.
+    """
+
+    vehicle = listing.get("vehicle") or {}
+    price = listing.get("price")
+    leasing = listing.get("leasing")
+    location = listing.get("location") or {}
+
+    title = " ".join(filter(None, (vehicle.get("make"), vehicle.get("model"))))
+    if price:
+        priceText = _value(price, "priceFormatted")
+    elif leasing:
+        priceText = _value(leasing, "priceFormatted")
+    else:
+        raise AttributeError("Weder Preis noch Leasingrate gefunden")
+    if location:
+        place = "%s-%s %s" % (location.get("countryCode", ""), location.get("zip", ""), location.get("city", ""))
+    else:
+        place = np.nan
+
+    record = {"Titel": title or np.nan, "Version": _value(vehicle, "modelVersionInput"),
+              "Untertitel": _value(vehicle, "subtitle"), "Preis": priceText, "Leasing": not price,
+              "Standort": place, ID_COLUMN: _value(listing, "id")}
+    for detail in listing.get("vehicleDetails") or ():
+        column = DETAIL_ICONS.get(detail.get("iconName"))
+        if column is not None:
+            record.setdefault(column, _value(detail, "data"))
+    return record
+
+
+def parseNextDataRecords(html, skip=()):
+    """Extrahiert die Fahrzeuge aus ``__NEXT_DATA__`` als RecordBuilder, None ohne verwertbares JSON.
+
+    Angebote, deren ID in *skip* enthalten ist, werden übersprungen.
+    """
+
+    text = findNextData(html)
+    if text is None:
+        return None
+    try:
+        listings = loadJSON(text)["props"]["pageProps"]["listings"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    records = RecordBuilder()
+    for listing in listings:
+        if listing.get("id") in skip:
+            continue
+        records.append(listingRecord(listing))
+    return records
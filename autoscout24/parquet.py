@@ -0,0 +1,80 @@
+"""Schreiben der gecrawlten Fahrzeuge in eine Parquet-Datei während des Crawls.
+
+Der :class:`ParquetSink` nimmt die RecordBuilder einzelner Seiten entgegen
+und schreibt jeweils *rowGroupSize* Datensätze als eine Row Group. Zusammen
+mit :meth:`~autoscout24.crawl.Crawler.iterListings` ist der Speicherbedarf
+damit durch die Größe einer Row Group begrenzt und nicht durch den gesamten
+Crawl.
+"""
+
+from .crawl import Crawler
+from .fields import COLUMNS
+from .records import RecordBuilder
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow ist optional
+    pa = pq = None
+
+
+def carSchema(columns=COLUMNS):
+    """Arrow-Schema des AutoDFraw: alle Spalten als Text, *Leasing* als bool."""
+
+    return pa.schema([(column, pa.bool_() if column == "Leasing" else pa.string()) for column in columns])
+
+
+class ParquetSink:
+    """Schreibt Datensätze in Row Groups von *rowGroupSize* Zeilen in die Datei *path*."""
+
+    def __init__(self, path, rowGroupSize=10000, compression="zstd"):
+        if pq is None:
+            raise ImportError("Für den ParquetSink wird das Paket pyarrow benötigt (pip install pyarrow)")
+        self.path = path
+        self.rowGroupSize = rowGroupSize
+        self.schema = carSchema()
+        self.rows = 0
+        self.rowGroups = 0
+        self._buffer = RecordBuilder()
+        self._writer = pq.ParquetWriter(path, self.schema, compression=compression)
+
+    def write(self, records):
+        """Übernimmt die Datensätze *records* (:class:`RecordBuilder`)."""
+
+        self._buffer.extend(records)
+        while len(self._buffer) >= self.rowGroupSize:
+            self._flush(self._buffer.take(self.rowGroupSize))
+
+    def _flush(self, records):
+        arrays = [pa.array(records.data[field.name], type=field.type, from_pandas=True) for field in self.schema]
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema), row_group_size=self.rowGroupSize)
+        self.rows += len(records)
+        self.rowGroups += 1
+
+    def close(self):
+        """Schreibt die restlichen Datensätze als letzte, kleinere Row Group und schließt die Datei."""
+
+        if len(self._buffer):
+            self._flush(self._buffer.take(len(self._buffer)))
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def crawlToParquet(fregList, path, pages=20, rowGroupSize=10000, **kwargs):
+    """Crawlt alle Suchergebnisseiten für *fregList* direkt in die Parquet-Datei *path*.
+
+    Weitere Parameter werden an den :class:`~autoscout24.crawl.Crawler`
+    übergeben. Gibt die :class:`~autoscout24.crawl.CrawlSummary` zurück.
+    """
+
+    crawler = Crawler(**kwargs)
+    with ParquetSink(path, rowGroupSize) as sink:
+        for records in crawler.iterListings(fregList, pages):
+            sink.write(records)
+    print(crawler.summary)
+    return crawler.summary
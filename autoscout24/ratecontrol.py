@@ -0,0 +1,133 @@
+"""Adaptive Steuerung der Nebenläufigkeit des Crawlers (AIMD).
+
+Solange Latenz und Fehlerrate unauffällig sind, wird das Limit gleichzeitiger
+Requests additiv erhöht (etwa um *increase* pro Latenzzyklus). Bei einem 429,
+einem Timeout oder einem deutlichen Anstieg der Latenz wird es mit dem Faktor
+*decrease* multiplikativ gesenkt. Ein ``Retry-After`` des Servers pausiert
+alle weiteren Requests für die angegebene Zeit.
+"""
+
+import asyncio
+import time
+from collections import deque
+
+
+def percentile(values, q):
+    """Perzentil *q* (0..1) der Werte *values* (nächstgelegener Rang)."""
+
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[round(q * (len(ordered) - 1))]
+
+
+class AimdLimiter:
+    """Nebenläufigkeitslimit mit Additive Increase / Multiplicative Decrease.
+
+    Das Limit liegt immer zwischen *minLimit* und *maxLimit*. Als Latenzspitze
+    gilt, wenn der Median der letzten Requests mehr als *latencySpike* Mal so
+    hoch ist wie der Median über das gesamte Fenster von *window* Requests.
+    """
+
+    def __init__(self, initial=4, minLimit=1, maxLimit=32, increase=1.0, decrease=0.5, latencySpike=2.0, window=200):
+        self.limit = float(initial)
+        self.minLimit = minLimit
+        self.maxLimit = maxLimit
+        self.increase = increase
+        self.decrease = decrease
+        self.latencySpike = latencySpike
+        self.inFlight = 0
+        self.throttled = 0
+        self.timeouts = 0
+        self.decreases = 0
+
+        self._latencies = deque(maxlen=window)
+        self._recent = deque(maxlen=10)
+        self._pausedUntil = 0.0
+        self._lastDecrease = 0.0
+        self._loop = None
+        self._cond = None
+
+    @property
+    def concurrency(self):
+        """Aktuell erlaubte Anzahl gleichzeitiger Requests."""
+
+        return max(self.minLimit, int(self.limit))
+
+    def _condition(self):
+        #Die Condition gehört zum Event Loop des laufenden Crawls
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def acquire(self):
+        cond = self._condition()
+        async with cond:
+            while self.inFlight >= self.concurrency:
+                await cond.wait()
+            self.inFlight += 1
+        pause = self._pausedUntil - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+
+    async def release(self):
+        cond = self._condition()
+        async with cond:
+            self.inFlight -= 1
+            cond.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.release()
+
+    def onSuccess(self, latency):
+        """Erfolgreicher Request mit der Latenz *latency* in Sekunden."""
+
+        self._latencies.append(latency)
+        self._recent.append(latency)
+        if self._isSpike():
+            self._decrease()
+        else:
+            self.limit = min(self.maxLimit, self.limit + self.increase / self.limit)
+
+    def onThrottle(self, retryAfter=None):
+        """Der Server hat mit 429 geantwortet."""
+
+        self.throttled += 1
+        if retryAfter:
+            self._pausedUntil = max(self._pausedUntil, time.monotonic() + retryAfter)
+        self._decrease()
+
+    def onTimeout(self):
+        """Timeout, Verbindungsfehler oder Serverfehler."""
+
+        self.timeouts += 1
+        self._decrease()
+
+    def _isSpike(self):
+        if len(self._latencies) < 2 * self._recent.maxlen:
+            return False
+        return percentile(self._recent, 0.5) > self.latencySpike * percentile(self._latencies, 0.5)
+
+    def _decrease(self):
+        #Höchstens eine Reduktion pro Latenzzyklus, da mehrere parallele Requests dasselbe Signal sehen
+        now = time.monotonic()
+        if now - self._lastDecrease < (percentile(self._latencies, 0.5) or 0.0):
+            return
+        self._lastDecrease = now
+        self.decreases += 1
+        self.limit = max(self.minLimit, self.limit * self.decrease)
+        self._recent.clear()
+
+    def metrics(self):
+        """Aktuelle Kennzahlen: Nebenläufigkeit, p50/p95-Latenz und Anzahl Drosselungen."""
+
+        latencies = list(self._latencies)
+        return {"concurrency": self.concurrency, "inFlight": self.inFlight,
+                "p50": percentile(latencies, 0.5), "p95": percentile(latencies, 0.95),
+                "throttled": self.throttled, "timeouts": self.timeouts, "decreases": self.decreases}
@@ -0,0 +1,78 @@
+"""Spaltenweises Sammeln der Fahrzeugdatensätze.
+
+``DataFrame.append`` und ``pd.concat`` kopieren bei jedem Aufruf das gesamte
+Dataframe, sodass das zeilenweise Aufbauen des AutoDFraw quadratisch mit der
+Anzahl Fahrzeuge wächst. Der :class:`RecordBuilder` hängt die Werte stattdessen
+an eine Python-Liste je Spalte an und erzeugt erst am Ende des Crawls einmalig
+das Dataframe.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .fields import COLUMNS
+
+
+class RecordBuilder:
+    """Datensätze in Spaltenlisten, z.B. einer Suchergebnisseite oder eines ganzen Crawls."""
+
+    def __init__(self, columns=COLUMNS):
+        self.columns = list(columns)
+        self.data = {column: [] for column in self.columns}
+
+    @classmethod
+    def fromRows(cls, rows, columns=COLUMNS):
+        """Erzeugt einen RecordBuilder aus einer Liste von Zeilen mit den Spalten *columns*."""
+
+        records = cls(columns)
+        for column, values in zip(records.columns, zip(*rows)):
+            records.data[column].extend(values)
+        return records
+
+    def append(self, record):
+        """Hängt den Datensatz *record* (dict) an, fehlende Spalten werden NaN."""
+
+        for column, values in self.data.items():
+            values.append(record.get(column, np.nan))
+
+    def extend(self, other):
+        """Hängt alle Datensätze des RecordBuilders *other* an."""
+
+        if not len(other):
+            return
+        for column, values in self.data.items():
+            values.extend(other.data.get(column, [np.nan] * len(other)))
+
+    def take(self, n):
+        """Entfernt die ersten *n* Datensätze und gibt sie als neuen RecordBuilder zurück."""
+
+        head = RecordBuilder(self.columns)
+        for column, values in self.data.items():
+            head.data[column] = values[:n]
+            del values[:n]
+        return head
+
+    def subset(self, positions):
+        """Neuer RecordBuilder mit den Datensätzen an den Positionen *positions*."""
+
+        part = RecordBuilder(self.columns)
+        for column, values in self.data.items():
+            part.data[column] = [values[i] for i in positions]
+        return part
+
+    def __len__(self):
+        return len(self.data[self.columns[0]]) if self.columns else 0
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def rows(self):
+        """Datensätze als Liste von Zeilen in der Reihenfolge von :attr:`columns`."""
+
+        return [list(row) for row in zip(*self.data.values())]
+
+    def toDataFrame(self):
+        """Erzeugt das Dataframe mit einem einzigen Aufruf von ``pd.DataFrame``."""
+
+        return pd.DataFrame(self.data, columns=self.columns)
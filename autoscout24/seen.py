@@ -0,0 +1,70 @@
+"""Menge der bereits gecrawlten Angebote, um Duplikate zu überspringen.
+
+Während des Blätterns verschieben sich die Suchergebnisse, sodass dasselbe
+Fahrzeug auf zwei Seiten oder in zwei Jahresabfragen erscheinen kann. Die
+IDs werden im Speicher gehalten und optional in einer SQLite-Datei
+gespeichert, damit sie auch nach dem Fortsetzen eines abgebrochenen Crawls
+noch bekannt sind.
+"""
+
+import sqlite3
+
+
+class SeenStore:
+    """IDs der Angebote, die im aktuellen Crawl bereits verarbeitet wurden.
+
+    Ohne *path* liegt die Menge nur im Speicher. Mit *path* werden neue IDs
+    zusätzlich in der SQLite-Datei gespeichert und beim Öffnen geladen; für
+    einen komplett neuen Crawl wird sie mit :meth:`clear` geleert.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._db = None
+        self._seen = set()
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS seen (listing_id TEXT PRIMARY KEY)")
+            self._db.commit()
+            self._seen.update(listingID for listingID, in self._db.execute("SELECT listing_id FROM seen"))
+
+    def add(self, listingIDs):
+        """Merkt sich *listingIDs* und gibt die Menge der davon bereits bekannten IDs zurück."""
+
+        known = set()
+        new = []
+        for listingID in listingIDs:
+            if listingID in self._seen:
+                known.add(listingID)
+            else:
+                self._seen.add(listingID)
+                new.append(listingID)
+        if new and self._db is not None:
+            self._db.executemany("INSERT OR IGNORE INTO seen VALUES (?)", [(listingID,) for listingID in new])
+            self._db.commit()
+        return known
+
+    def __contains__(self, listingID):
+        return listingID in self._seen
+
+    def __len__(self):
+        return len(self._seen)
+
+    def clear(self):
+        """Vergisst alle IDs, damit der nächste Crawl von vorne beginnt."""
+
+        self._seen.clear()
+        if self._db is not None:
+            self._db.execute("DELETE FROM seen")
+            self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,295 @@
+"""HTTP-Schicht des Crawlers mit Connection Pool, Timeouts und Retries.
+
+Alle Requests laufen über eine gemeinsame ``requests.Session``, damit
+Verbindungen (Keep-Alive) wiederverwendet werden und nicht für jede Seite ein
+neuer TCP- und TLS-Handshake nötig ist.
+
+Mit einer :class:`~autoscout24.metrics.CrawlMetrics` messen neue Verbindungen
+DNS-Auflösung und Verbindungsaufbau selbst, damit die Zeit eines Requests in
+DNS, Verbindungsaufbau, Time to First Byte und Download aufgeteilt werden
+kann. Ohne *metrics* wird der normale HTTPAdapter von requests verwendet.
+"""
+
+import random
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+#Statuscodes, bei denen ein Request mit Backoff wiederholt wird
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+USER_AGENT = "Mozilla/5.0 (compatible; Autoscout24ExplorationBook)"
+
+
+def parseRetryAfter(value):
+    """Gibt den Retry-After Header in Sekunden zurück (Sekunden oder HTTP-Datum)."""
+
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+#Zeiten des Verbindungsaufbaus im aktuellen Thread, gesetzt von den Timed*Connection Klassen
+_timing = threading.local()
+
+
+class _TimedConnectionMixin:
+    def _new_conn(self):
+        #DNS-Auflösung getrennt messen; verbunden wird wie bei urllib3 der Reihe nach mit allen
+        #Adressen der gewünschten Adressfamilie, bis eine Verbindung zustande kommt
+        host = self._dns_host
+        start = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(host.strip("[]"), self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except OSError:
+            #Fehlermeldung wie gewohnt von urllib3
+            return super()._new_conn()
+        _timing.dns = time.perf_counter() - start
+        error = None
+        try:
+            for *_, address in addresses:
+                self._dns_host = address[0]
+                try:
+                    return super()._new_conn()
+                except (NewConnectionError, ConnectTimeoutError) as e:
+                    error = e
+            raise error
+        finally:
+            self._dns_host = host
+
+    def connect(self):
+        _timing.dns = 0.0
+        start = time.perf_counter()
+        super().connect()
+        _timing.connect = time.perf_counter() - start - _timing.dns
+        _timing.new = True
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter, dessen neue Verbindungen DNS-Auflösung und Verbindungsaufbau messen."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": TimedHTTPConnectionPool,
+                                                   "https": TimedHTTPSConnectionPool}
+
+
+@dataclass
+class FetchResult:
+    """Ergebnis eines (ggf. mehrfach versuchten) Requests."""
+
+    URL: str
+    text: str
+    status: int
+    seconds: float
+    attempts: int = 1
+    throttled: int = 0
+    retryAfter: float = None
+    fromCache: bool = False
+    errors: int = 0
+
+
+class CrawlerSession:
+    """Gemeinsame HTTP-Session für alle Requests eines Crawls.
+
+    *poolSize* ist die Anzahl offener Verbindungen pro Host, *connectTimeout*
+    und *readTimeout* sind die Deadlines in Sekunden für Verbindungsaufbau und
+    Antwort. Bei Verbindungsfehlern, Timeouts und den Statuscodes aus
+    ``RETRY_STATUSES`` wird bis zu *retries* Mal mit exponentiellem Backoff
+    wiederholt; ein ``Retry-After`` Header des Servers wird berücksichtigt.
+
+    Mit einem :class:`~autoscout24.cache.ResponseCache` als *cache* werden
+    frische Seiten ohne Request aus dem Cache gelesen und ältere Seiten per
+    Conditional GET revalidiert.
+
+    Mit *metrics* (:class:`~autoscout24.metrics.CrawlMetrics`) werden die
+    Zeiten und Größen aller Requests erfasst. Nur dann werden Verbindungen
+    über den :class:`TimedHTTPAdapter` aufgebaut; ohne *metrics* entsteht kein
+    zusätzlicher Aufwand.
+    """
+
+    def __init__(self, poolSize=10, connectTimeout=5.0, readTimeout=30.0, retries=4, backoff=0.5, maxBackoff=30.0,
+                 cache=None, metrics=None):
+        self.cache = cache
+        self.connectTimeout = connectTimeout
+        self.readTimeout = readTimeout
+        self.retries = retries
+        self.backoff = backoff
+        self.maxBackoff = maxBackoff
+
+        self.poolSize = poolSize
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": USER_AGENT})
+        self.adapter = None
+        self.metrics = metrics
+
+        self._lock = threading.Lock()
+        self.retryCount = 0
+
+    @property
+    def metrics(self):
+        return self._metrics
+
+    @metrics.setter
+    def metrics(self, metrics):
+        #Der Adapter wird nur gewechselt, wenn Messung ein- oder ausgeschaltet wird
+        self._metrics = metrics
+        adapterClass = HTTPAdapter if metrics is None else TimedHTTPAdapter
+        if type(self.adapter) is adapterClass:
+            return
+        if self.adapter is not None:
+            self.adapter.close()
+        self.adapter = adapterClass(pool_connections=10, pool_maxsize=self.poolSize, pool_block=True, max_retries=0)
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+    def fetch(self, URL):
+        """Lädt *URL* und gibt ein :class:`FetchResult` zurück."""
+
+        entry = self.cache.lookup(URL) if self.cache is not None else None
+        if entry is not None and entry.fresh:
+            return FetchResult(URL, entry.text, 200, 0.0, 0, fromCache=True)
+
+        #Conditional GET: der Server antwortet mit 304, wenn sich die Seite nicht geändert hat
+        headers = {}
+        if entry is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry is not None and entry.lastModified:
+            headers["If-Modified-Since"] = entry.lastModified
+
+        throttled = errors = 0
+        retryAfter = None
+        for attempt in range(self.retries + 1):
+            _timing.new = False
+            start = time.perf_counter()
+            try:
+                response = self.session.get(URL, headers=headers, timeout=(self.connectTimeout, self.readTimeout),
+                                            stream=True)
+                headersAt = time.perf_counter()
+                #Antworttext vollständig laden, damit die Verbindung an den Pool zurückgeht
+                response.content
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+                errors += 1
+                self._wait(attempt, None)
+                continue
+            if self.metrics is not None:
+                self._observe(start, headersAt, response)
+
+            if response.status_code in RETRY_STATUSES:
+                if response.status_code == 429:
+                    throttled += 1
+                else:
+                    errors += 1
+                retryAfter = parseRetryAfter(response.headers.get("Retry-After"))
+                if attempt < self.retries:
+                    self._wait(attempt, retryAfter)
+                    continue
+            seconds = time.perf_counter() - start
+            if response.status_code == 304 and entry is not None:
+                self.cache.refresh(URL)
+                return FetchResult(URL, entry.text, 304, seconds, attempt + 1, throttled, retryAfter, True, errors)
+            response.raise_for_status()
+            if self.cache is not None:
+                self.cache.store(URL, response.text, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+            return FetchResult(URL, response.text, response.status_code, seconds, attempt + 1, throttled, retryAfter,
+                               False, errors)
+
+    def _observe(self, start, headersAt, response):
+        end = time.perf_counter()
+        setup = 0.0
+        if _timing.new:
+            setup = _timing.dns + _timing.connect
+            self.metrics.observe("dns_seconds", _timing.dns)
+            self.metrics.observe("connect_seconds", _timing.connect)
+        self.metrics.observe("ttfb_seconds", max(0.0, headersAt - start - setup))
+        self.metrics.observe("download_seconds", end - headersAt)
+        self.metrics.observe("response_bytes", len(response.content))
+
+    def get(self, URL):
+        """Lädt *URL* und gibt den HTML-Quelltext zurück."""
+
+        return self.fetch(URL).text
+
+    def _wait(self, attempt, retryAfter):
+        with self._lock:
+            self.retryCount += 1
+        delay = min(self.maxBackoff, self.backoff * 2 ** attempt)
+        delay = random.uniform(delay / 2, delay)
+        if retryAfter is not None:
+            delay = max(delay, retryAfter)
+        time.sleep(delay)
+
+    def stats(self):
+        """Anzahl Requests, neu aufgebauter und wiederverwendeter Verbindungen."""
+
+        connections = requests_ = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            connections += pool.num_connections
+            requests_ += pool.num_requests
+        reused = max(0, requests_ - connections)
+        stats = {"requests": requests_, "connections": connections, "reused": reused,
+                 "reuseRatio": reused / requests_ if requests_ else 0.0, "retries": self.retryCount,
+                 "cacheHits": 0, "cacheRevalidated": 0, "cacheMisses": 0}
+        if self.cache is not None:
+            stats.update(cacheHits=self.cache.hits, cacheRevalidated=self.cache.revalidated,
+                         cacheMisses=self.cache.misses)
+        return stats
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_defaultSession = None
+_defaultLock = threading.Lock()
+
+
+def defaultSession():
+    """Gibt die gemeinsam genutzte :class:`CrawlerSession` zurück."""
+
+    global _defaultSession
+    with _defaultLock:
+        if _defaultSession is None:
+            _defaultSession = CrawlerSession()
+        return _defaultSession
@@ -0,0 +1,189 @@
+"""Erzeugung synthetischer Suchergebnisseiten im Format von Autoscout24.
+
+Die Seiten haben denselben Aufbau wie die Suchergebnisseiten der Webseite;
+auch die Testseiten in ``fixtures`` wurden damit erzeugt: je Fahrzeug ein ``article`` mit Titel, Version,
+Untertitel, Preis oder Leasingrate (inklusive der zusätzlichen
+VehicleDetailTable der Leasing Wagen), VehicleDetailTable und Standort sowie
+optional alle Angebote als JSON im Script ``__NEXT_DATA__``. Jede Seite wird
+aus *seed*, Jahreszahl und Seitennummer deterministisch erzeugt, sodass
+wiederholte Requests dieselbe Seite liefern.
+"""
+
+import json
+import random
+import uuid
+
+PAGE_SIZE = 20
+MAX_PAGES = 20
+
+#(Marke, Modelle, Versionen)
+MAKES = [("Audi", ["A3", "A4", "A6", "Q5"], ["Sportback 1.4 TFSI", "Avant 2.0 TDI", "3.0 TDI quattro"]),
+         ("BMW", ["318", "520", "X3", "Z4"], ["d Touring", "i Luxury Line", "xDrive20d M Sport"]),
+         ("Mercedes-Benz", ["C 200", "E 220", "A 180"], ["T-Modell Avantgarde", "CDI BlueEfficiency", "AMG Line"]),
+         ("Volkswagen", ["Golf", "Passat", "Polo", "Tiguan"],
+          ["1.6 TDI Comfortline", "Variant 2.0 TDI Highline", "1.2 TSI Trendline"]),
+         ("Opel", ["Astra", "Corsa", "Insignia"], ["1.4 Turbo Edition", "Sports Tourer 1.6 CDTI", "1.2 Selection"]),
+         ("Ford", ["Focus", "Fiesta", "Kuga"], ["1.0 EcoBoost Titanium", "Turnier 1.5 TDCi", "ST-Line"]),
+         ("Tesla", ["Model 3", "Model S"], ["Long Range AWD", "Standard Range Plus"]),
+         ("Toyota", ["Yaris", "Corolla", "RAV 4"], ["1.5 Hybrid Team D", "2.5 Hybrid Lounge", "1.33 Cool"])]
+EXTRAS = ["Alufelgen", "Sitzheizung", "Klimaanlage", "Klimaautomatik", "Einparkhilfe hinten", "Navigationssystem",
+          "Tempomat", "Bluetooth", "Panoramadach", "Tüv neu"]
+CITIES = [("DE", "70173", "Stuttgart"), ("DE", "80331", "München"), ("DE", "10115", "Berlin"),
+          ("DE", "50667", "Köln"), ("DE", "20095", "Hamburg"), ("DE", "60311", "Frankfurt"),
+          ("DE", "68159", "Mannheim"), ("DE", "01067", "Dresden"), ("AT", "1010", "Wien")]
+FUELS = ["Benzin", "Diesel", "Elektro", "Elektro/Benzin", "Autogas"]
+GEARS = ["Schaltgetriebe", "Automatik", "Halbautomatik"]
+#iconName der vehicleDetails in __NEXT_DATA__, in der Reihenfolge der VehicleDetailTable
+ICONS = ["mileage_road", "calendar", "speedometer", "car", "person", "gearbox", "gas_pump", "water_drop", "leaf"]
+#Platzhalter der Webseite für fehlende Angaben in der VehicleDetailTable
+MISSING = {4: "- (Fahrzeughalter)", 5: "- (Getriebe)", 7: "- (l/100 km)", 8: "- (g/km)"}
+
+
+def formatNumber(n):
+    return "{:,}".format(n).replace(",", ".")
+
+
+def syntheticCar(rng, freg, leasing=False, missing=False):
+    """Zufälliges Fahrzeug mit Erstzulassung *freg* als dict."""
+
+    make, models, versions = rng.choice(MAKES)
+    model = rng.choice(models)
+    listingID = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+    if make == "Tesla":
+        fuel = "Elektro"
+    else:
+        fuel = rng.choice(FUELS[:2] if rng.random() < 0.85 else FUELS)
+    km = rng.randint(2, 300) * 1000 + rng.randint(0, 999)
+    kw = rng.randint(40, 250)
+    details = ["%s km" % formatNumber(km), "%02d/%s" % (rng.randint(1, 12), freg),
+               "%d kW (%d PS)" % (kw, round(kw * 1.35962)), "Gebraucht", "%d Fahrzeughalter" % rng.randint(1, 4),
+               rng.choice(GEARS), fuel]
+    if fuel == "Elektro":
+        details += ["- (l/100 km)", "0 g/km (komb.)"]
+    else:
+        consumption = rng.randint(38, 120) / 10
+        details += ["%s l/100 km (komb.)" % str(consumption).replace(".", ","),
+                    "%d g/km (komb.)" % round(consumption * 24)]
+    subtitle = ", ".join(rng.sample(EXTRAS, rng.randint(1, 5)))
+    if missing:
+        for i in rng.sample(sorted(MISSING), 2):
+            details[i] = MISSING[i]
+        if rng.random() < 0.6:
+            subtitle = None
+    country, zipCode, city = rng.choice(CITIES)
+    car = {"id": listingID, "make": make, "model": model, "version": rng.choice(versions), "subtitle": subtitle,
+           "price": "€ %s,-" % formatNumber(rng.randint(10, 900) * 100 - 10), "details": details,
+           "country": country, "zip": zipCode, "city": city, "leasing": None}
+    if leasing:
+        car["leasing"] = {"price": "€ %d,-" % rng.randint(99, 899),
+                          "details": ["%d Monate" % rng.choice([24, 36, 48]),
+                                      "%s km/Jahr" % formatNumber(rng.choice([10000, 15000])), "Privat"]}
+        car["price"] = None
+    return car
+
+
+def articleHTML(car):
+    """``article`` Element eines Fahrzeugs wie auf der Suchergebnisseite."""
+
+    parts = ['<article class="cldt-summary-full-item ListItem_article__qyYw7" id="%s" data-guid="%s">'
+             % (car["id"], car["id"]),
+             '<div class="ListItem_wrapper__TxHWu"><div class="ListItem_header__J6xlG">',
+             '<a href="/angebote/%s-%s-%s" class="ListItem_title__ndA4s">'
+             % (car["make"].lower(), car["model"].lower().replace(" ", "-"), car["id"]),
+             '<h2>%s %s</h2><span class="ListItem_version__5EWfi">%s</span></a>'
+             % (car["make"], car["model"], car["version"])]
+    if car["subtitle"]:
+        parts.append('<span class="ListItem_subtitle__VEw08">%s</span>' % car["subtitle"])
+    parts.append("</div>")
+    if car["leasing"]:
+        parts.append('<div class="LeasingPrice_wrapper__x6L0D"><span class="LeasingPrice_price__uA0sD">%s</span>'
+                     '<span class="LeasingPrice_suffix__r9Jd2">/Monat</span></div>' % car["leasing"]["price"])
+    elif car["price"]:
+        parts.append('<div class="ListItem_pricerow__ZqzKj"><p class="Price_price__APlgs">%s</p></div>'
+                     % car["price"])
+    tables = [car["details"]] + ([car["leasing"]["details"]] if car["leasing"] else [])
+    for cells in tables:
+        parts.append('<div class="VehicleDetailTable_container__mUUbY">')
+        parts += ['<span class="VehicleDetailTable_item__4n35N">%s</span>' % cell for cell in cells]
+        parts.append("</div>")
+    parts.append('</div><div class="SellerInfo_wrapper__s7bxK">')
+    parts.append('<span class="SellerInfo_address__leRMu" style="grid-area:address">%s-%s %s</span>'
+                 % (car["country"], car["zip"], car["city"]))
+    parts.append("</div></article>")
+    return "".join(parts)
+
+
+def listingJSON(car):
+    """Angebot wie in ``props.pageProps.listings`` von ``__NEXT_DATA__``."""
+
+    return {"id": car["id"],
+            "vehicle": {"make": car["make"], "model": car["model"], "modelVersionInput": car["version"],
+                        "subtitle": car["subtitle"]},
+            "price": {"priceFormatted": car["price"]} if car["price"] else None,
+            "leasing": {"priceFormatted": car["leasing"]["price"]} if car["leasing"] else None,
+            "location": {"countryCode": car["country"], "zip": car["zip"], "city": car["city"]},
+            "vehicleDetails": [{"data": data, "iconName": icon} for data, icon in zip(car["details"], ICONS)],
+            "url": "/angebote/%s" % car["id"]}
+
+
+def pageHTML(freg, page, cars, total, nextData=True):
+    """Suchergebnisseite *page* für Erstzulassung *freg* mit den Fahrzeugen *cars*."""
+
+    head = ('<!DOCTYPE html><html lang="de"><head><meta charset="utf-8"/><title>Gebrauchtwagen kaufen - AutoScout24'
+            '</title></head><body><div id="__next"><main class="ListPage_main__L0gsf">'
+            '<h1 class="ListHeader_title__0wxtF" data-testid="list-header-title">%s Angebote für Gebrauchtwagen</h1>'
+            '<div class="ListPage_container__Optya">' % formatNumber(total))
+    tail = "</div></main></div>"
+    if nextData:
+        data = {"props": {"pageProps": {"numberOfResults": total,
+                                        "numberOfPages": min(MAX_PAGES, -(-total // PAGE_SIZE)),
+                                        "listings": [listingJSON(car) for car in cars]}},
+                "page": "/lst", "query": {"fregfrom": str(freg), "fregto": str(freg), "page": str(page)}}
+        tail += ('<script id="__NEXT_DATA__" type="application/json">'
+                 + json.dumps(data, ensure_ascii=False, separators=(",", ":")) + "</script>")
+    return head + "".join(articleHTML(car) for car in cars) + tail + "</body></html>"
+
+
+class SyntheticPages:
+    """Quelle synthetischer Suchergebnisseiten für den :class:`~autoscout24.mockserver.MockServer`.
+
+    *listings* ist die Anzahl Angebote je Jahreszahl: eine feste Zahl, ein
+    dict Jahreszahl -> Anzahl oder None für eine zufällige Anzahl zwischen 0
+    und *maxListings*. Wie auf der Webseite sind höchstens 20 Seiten mit je 20
+    Fahrzeugen abrufbar. *leasingRate* und *missingRate* sind die Anteile der
+    Leasing Wagen und der Fahrzeuge mit fehlenden Angaben, *nextDataRate* der
+    Anteil der Seiten mit ``__NEXT_DATA__``.
+    """
+
+    def __init__(self, listings=None, seed=0, maxListings=600, leasingRate=0.08, missingRate=0.1, nextDataRate=1.0):
+        self.listings = listings
+        self.seed = seed
+        self.maxListings = maxListings
+        self.leasingRate = leasingRate
+        self.missingRate = missingRate
+        self.nextDataRate = nextDataRate
+
+    def total(self, freg):
+        """Anzahl Angebote für die Erstzulassung *freg*."""
+
+        if isinstance(self.listings, dict):
+            return self.listings.get(int(freg), 0)
+        if self.listings is not None:
+            return self.listings
+        return random.Random("%s-%s" % (self.seed, freg)).randint(0, self.maxListings)
+
+    def pages(self, freg):
+        """Anzahl abrufbarer Seiten für die Erstzulassung *freg*."""
+
+        return min(MAX_PAGES, -(-self.total(freg) // PAGE_SIZE))
+
+    def page(self, freg, page):
+        """HTML der Seite *page* (ab 0) für die Erstzulassung *freg*."""
+
+        total = self.total(freg)
+        page = int(page)
+        rng = random.Random("%s-%s-%s" % (self.seed, freg, page))
+        count = max(0, min(PAGE_SIZE, total - page * PAGE_SIZE)) if page < MAX_PAGES else 0
+        cars = [syntheticCar(rng, freg, leasing=rng.random() < self.leasingRate,
+                             missing=rng.random() < self.missingRate) for _ in range(count)]
+        return pageHTML(freg, page, cars, total, nextData=rng.random() < self.nextDataRate)
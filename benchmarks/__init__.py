@@ -0,0 +1 @@
+"""Benchmarks für Crawler und Datenverarbeitung, Aufruf z.B. mit ``python -m benchmarks.bench_pipeline``."""
@@ -0,0 +1,154 @@
+"""Benchmark-Suite der Parser-Backends auf dem synthetischen Korpus mit Baseline.
+
+Der Korpus besteht aus drei Gruppen von Suchergebnisseiten: ``normal``
+(``fixtures/pages``), ``leasing`` mit überwiegend Leasing Wagen
+(``fixtures/leasing``) und ``missing`` mit fehlenden Feldern, z.B. ohne
+Untertitel, Version oder VehicleDetailTable (``fixtures/missing``). Je Gruppe
+und Backend werden Seiten pro Sekunde, die Anzahl der für das Ergebnis einer
+Seite allokierten Speicherblöcke und der Spitzenverbrauch beim Parsen einer
+Seite (tracemalloc) gemessen und mit ``benchmarks/baseline.json`` verglichen.
+Weicht ein Wert um mehr als die Toleranz nach unten (Seiten/s) bzw. oben
+(Speicher) ab, endet die Suite mit Exit-Code 1::
+
+    python -m benchmarks.bench_corpus
+    python -m benchmarks.bench_corpus --update    # Baseline neu schreiben
+
+Die Seiten pro Sekunde hängen vom Rechner ab; auf einem anderen Rechner wird
+die Baseline daher zuerst mit ``--update`` erzeugt.
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+
+from autoscout24.extract import PARSERS, parsePageCarDF
+
+from .bench_parsers import checkParity, loadPages
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, "fixtures")
+CORPUS = {"normal": os.path.join(FIXTURES, "pages"),
+          "leasing": os.path.join(FIXTURES, "leasing"),
+          "missing": os.path.join(FIXTURES, "missing")}
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def pagesPerSecond(pages, parser, repeat, minTime=0.2):
+    """Beste Rate aus *repeat* Durchläufen, die jeweils mindestens *minTime* Sekunden dauern."""
+
+    best = 0.0
+    for _ in range(repeat):
+        parsed = 0
+        start = time.process_time()
+        while time.process_time() - start < minTime:
+            for html in pages.values():
+                parsePageCarDF(html, parser)
+            parsed += len(pages)
+        best = max(best, parsed / (time.process_time() - start))
+    return best
+
+
+def memory(pages, parser):
+    """Gibt (Speicherblöcke des Ergebnisses je Seite, maximaler Spitzenverbrauch in KiB) zurück."""
+
+    #einmal vorab parsen, damit Imports und Caches nicht mitgezählt werden
+    for html in pages.values():
+        parsePageCarDF(html, parser)
+    blocks = 0
+    peak = 0
+    tracemalloc.start()
+    try:
+        for html in pages.values():
+            gc.collect()
+            before = tracemalloc.take_snapshot()
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            pageCarDF = parsePageCarDF(html, parser)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+            #Referenzzyklen des DOM freigeben, sodass nur das Ergebnis gezählt wird
+            gc.collect()
+            after = tracemalloc.take_snapshot()
+            blocks += sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+            del pageCarDF
+    finally:
+        tracemalloc.stop()
+    return blocks / len(pages), peak / 1024
+
+
+def measure(pages, parser, repeat):
+    blocks, peak = memory(pages, parser)
+    return {"pagesPerSecond": round(pagesPerSecond(pages, parser, repeat), 1),
+            "blocksPerPage": round(blocks, 1), "peakKiB": round(peak, 1)}
+
+
+def regressions(result, baseline, speedTolerance, memoryTolerance):
+    """Gibt die Beschreibungen aller Werte zurück, die schlechter als *baseline* sind."""
+
+    found = []
+    if result["pagesPerSecond"] < baseline["pagesPerSecond"] * (1 - speedTolerance):
+        found.append("Seiten/s %.1f statt %.1f" % (result["pagesPerSecond"], baseline["pagesPerSecond"]))
+    for key, label in (("blocksPerPage", "Blöcke/Seite"), ("peakKiB", "Peak KiB")):
+        if result[key] > baseline[key] * (1 + memoryTolerance):
+            found.append("%s %.1f statt %.1f" % (label, result[key], baseline[key]))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--parsers", nargs="+", default=sorted(PARSERS))
+    parser.add_argument("--corpus", nargs="+", default=list(CORPUS), choices=list(CORPUS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--speed-tolerance", type=float, default=0.25,
+                        help="erlaubter Rückgang der Seiten/s als Anteil")
+    parser.add_argument("--memory-tolerance", type=float, default=0.10,
+                        help="erlaubter Anstieg von Blöcken und Peak als Anteil")
+    parser.add_argument("--update", action="store_true", help="Ergebnisse als neue Baseline speichern")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", FutureWarning)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    failed = False
+    print("%8s %8s %6s %8s %10s %13s %10s  %s" % ("Korpus", "Parser", "Seiten", "Parität", "Seiten/s",
+                                                    "Blöcke/Seite", "Peak KiB", "Baseline"))
+    for corpus in args.corpus:
+        pages = loadPages(CORPUS[corpus])
+        for name in args.parsers:
+            result = measure(pages, name, args.repeat)
+            results.setdefault(corpus, {})[name] = result
+            mismatches = checkParity(pages, name)
+            reference = baseline.get(corpus, {}).get(name)
+            if reference is None:
+                status = "-"
+            else:
+                found = regressions(result, reference, args.speed_tolerance, args.memory_tolerance)
+                status = "REGRESSION: " + ", ".join(found) if found else "ok"
+                failed = failed or (bool(found) and not args.update)
+            failed = failed or bool(mismatches)
+            print("%8s %8s %6d %8s %10.1f %13.1f %10.1f  %s"
+                  % (corpus, name, len(pages), "ok" if not mismatches else "FEHLER", result["pagesPerSecond"],
+                     result["blocksPerPage"], result["peakKiB"], status))
+            for page in mismatches:
+                print("  abweichend: %s" % page)
+
+    if args.update:
+        for corpus, parsers in results.items():
+            baseline.setdefault(corpus, {}).update(parsers)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print("Baseline gespeichert: %s" % args.baseline)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""End-to-End-Benchmark des Crawlers gegen den lokalen MockServer.
+
+Der MockServer erzeugt für jedes Erstzulassungsjahr synthetische
+Suchergebnisseiten mit log-normalverteilter Antwortzeit und beantwortet
+einen einstellbaren Anteil der Requests mit 429 bzw. 503. Für jede
+Nebenläufigkeit wird ein kompletter Crawl ausgeführt und Durchsatz sowie
+p50/p95/p99 der Request-Latenz (inklusive Retries) ausgegeben::
+
+    python -m benchmarks.bench_crawl --concurrency 4 8 16 --latency 0.05 --sigma 0.8 --error-rate 0.02
+"""
+
+import argparse
+import statistics
+import threading
+import time
+import warnings
+
+from autoscout24 import Crawler, CrawlerSession
+from autoscout24.mockserver import MockServer, lognormalLatency
+from autoscout24.synthetic import SyntheticPages
+
+from .bench_pipeline import YEARS
+
+
+class RecordingSession(CrawlerSession):
+    """CrawlerSession, die die Dauer jedes Requests inklusive Retries speichert."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies = []
+        self._latencyLock = threading.Lock()
+
+    def fetch(self, URL):
+        start = time.perf_counter()
+        result = super().fetch(URL)
+        with self._latencyLock:
+            self.latencies.append(time.perf_counter() - start)
+        return result
+
+
+def percentiles(values, qs=(50, 95, 99)):
+    cuts = statistics.quantiles(values, n=100) if len(values) > 1 else list(values) * 99
+    return [cuts[q - 1] for q in qs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--years", type=int, default=len(YEARS), help="Anzahl Erstzulassungsjahre ab 1990")
+    parser.add_argument("--listings", type=int, default=None,
+                        help="Angebote je Jahr (Standard: zufällig zwischen 0 und 600)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Median der Antwortzeit in Sekunden")
+    parser.add_argument("--sigma", type=float, default=0.5, help="Streuung der log-normalen Antwortzeit")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Anteil der Requests mit 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Anteil der Requests mit 429")
+    parser.add_argument("--leasing-rate", type=float, default=0.08)
+    parser.add_argument("--parser", default="lxml")
+    parser.add_argument("--workers", type=int, default=0, help="Anzahl Parse-Prozesse")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", FutureWarning)
+
+    years = YEARS[:args.years]
+    pages = SyntheticPages(listings=args.listings, seed=args.seed, leasingRate=args.leasing_rate)
+    expected = sum(min(400, pages.total(freg)) for freg in years)
+    print("%d Jahre, %d Seiten, %d Fahrzeuge, Latenz Median %.0f ms (sigma %.2f), 503: %.1f%%, 429: %.1f%%"
+          % (len(years), sum(pages.pages(freg) for freg in years), expected, 1000 * args.latency, args.sigma,
+             100 * args.error_rate, 100 * args.throttle_rate))
+    print("%11s %9s %9s %11s %9s %9s %9s %8s %9s" % ("Nebenläufig", "Sekunden", "Seiten/s", "Fahrzeuge/s",
+                                                     "p50 ms", "p95 ms", "p99 ms", "Retries", "Fahrzeuge"))
+    for concurrency in args.concurrency:
+        with MockServer(pages, latency=lognormalLatency(args.latency, args.sigma), errorRate=args.error_rate,
+                        throttleRate=args.throttle_rate, retryAfter=0, seed=args.seed) as server:
+            session = RecordingSession(poolSize=concurrency, backoff=0.05)
+            crawler = Crawler(baselink=server.baselink, maxConcurrency=concurrency, perHostLimit=concurrency,
+                              session=session, parseWorkers=args.workers, parser=args.parser)
+            start = time.perf_counter()
+            AutoDFraw = crawler.crawl(years)
+            seconds = time.perf_counter() - start
+        p50, p95, p99 = percentiles(session.latencies)
+        print("%11d %9.2f %9.1f %11.1f %9.1f %9.1f %9.1f %8d %9s"
+              % (concurrency, seconds, crawler.summary.requests / seconds, len(AutoDFraw) / seconds, 1000 * p50,
+                 1000 * p95, 1000 * p99, session.retryCount,
+                 "ok" if len(AutoDFraw) == expected else "%d/%d" % (len(AutoDFraw), expected)))
+
+
+if __name__ == "__main__":
+    main()
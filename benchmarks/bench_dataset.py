@@ -0,0 +1,74 @@
+"""Laden des AutoDFraw: Excel gegen den partitionierten Parquet-Datensatz.
+
+Ein synthetisches AutoDFraw wird als ``AutoDF_raw.xlsx`` (falls openpyxl
+installiert ist) und mit :func:`~autoscout24.dataset.writeDataset` als
+Parquet-Datensatz gespeichert. Gemessen wird das Laden des kompletten
+Datensatzes sowie mit Projektion auf wenige Spalten und Filter auf Jahr und
+Kraftstoff::
+
+    python -m benchmarks.bench_dataset --rows 10000 100000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+
+from autoscout24.dataset import readDataset, writeDataset
+
+from .bench_records import buildRecords, syntheticPages
+
+try:
+    import openpyxl
+except ImportError:  # pragma: no cover - openpyxl ist optional
+    openpyxl = None
+
+
+def timed(function, repeat):
+    """Beste Zeit aus *repeat* Aufrufen und das Ergebnis."""
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", FutureWarning)
+
+    if openpyxl is None:
+        print("openpyxl ist nicht installiert, read_excel wird nicht gemessen")
+    print("%8s %34s %10s %8s %8s" % ("Zeilen", "Verfahren", "ms", "Zeilen", "Spalten"))
+    for rows in args.rows:
+        AutoDFraw = buildRecords(syntheticPages(rows))
+        with tempfile.TemporaryDirectory() as directory:
+            excel = os.path.join(directory, "AutoDF_raw.xlsx")
+            dataset = os.path.join(directory, "AutoDF_raw")
+            writeDataset(AutoDFraw, dataset)
+            runs = []
+            if openpyxl is not None:
+                AutoDFraw.to_excel(excel)
+                runs.append(("read_excel", lambda: pd.read_excel(excel, index_col=0)))
+            runs += [("readDataset", lambda: readDataset(dataset)),
+                     ("readDataset, 3 Spalten", lambda: readDataset(dataset, columns=["Titel", "Preis", "km"])),
+                     ("readDataset, 3 Spalten, ab 2015", lambda: readDataset(
+                         dataset, columns=["Titel", "Preis", "km"], filters=[("Jahr", ">=", 2015)])),
+                     ("readDataset, Benzin ab 2015", lambda: readDataset(
+                         dataset, filters=[("Jahr", ">=", 2015), ("Kraftstoff", "==", "Benzin")]))]
+            for name, load in runs:
+                seconds, df = timed(load, args.repeat)
+                print("%8d %34s %10.1f %8d %8d" % (rows, name, 1000 * seconds, len(df), len(df.columns)))
+
+
+if __name__ == "__main__":
+    main()
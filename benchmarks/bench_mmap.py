@@ -0,0 +1,140 @@
+"""Arbeitsspeicher mehrerer Prozesse beim Laden des bereinigten AutoDF: Parquet gegen Arrow IPC per Memory Map.
+
+Ein synthetisches bereinigtes AutoDF mit *rows* Zeilen wird als
+Parquet-Datensatz (:func:`~autoscout24.dataset.writeDataset`) und als Arrow
+IPC-Datei (:func:`~autoscout24.dataset.writeFeather`) gespeichert. Für jedes
+Verfahren laden *consumers* gleichzeitig laufende Prozesse (wie mehrere Kernel
+oder Worker) das Dataframe, lesen alle numerischen Spalten und melden RSS, PSS
+und privaten Speicher aus ``/proc/self/smaps_rollup`` (nur Linux). PSS teilt
+gemeinsam genutzte Seiten auf die Prozesse auf, die Summe über alle Prozesse
+ist also der tatsächlich belegte Arbeitsspeicher::
+
+    python -m benchmarks.bench_mmap --rows 2000000 --consumers 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from autoscout24.dataset import CLEAN_COLUMNS, CLEAN_TYPES, cleanSchema, readDataset, readFeather, writeDataset, \
+    writeFeather
+
+MARKEN = ["Volkswagen", "BMW", "Mercedes-Benz", "Audi", "Opel", "Ford", "Skoda", "Renault", "Toyota", "Fiat"]
+TEXT = {"Getriebe": ["Schaltgetriebe", "Automatik", "Halbautomatik"],
+        "Kraftstoff": ["Benzin", "Diesel", "Elektro", "Elektro/Benzin", "Autogas (LPG)"],
+        "Stadt": ["Berlin", "Hamburg", "München", "Köln", "Stuttgart", "Leipzig"]}
+
+
+def syntheticClean(rows, seed=0):
+    """Synthetisches bereinigtes AutoDF mit den Spalten und Datentypen aus :func:`~autoscout24.dataset.cleanSchema`."""
+
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(index=pd.RangeIndex(rows))
+    for column in CLEAN_COLUMNS:
+        kind = CLEAN_TYPES.get(column, "string")
+        if kind == "int64":
+            df[column] = rng.integers(0, 200000, rows)
+        elif kind == "float64":
+            df[column] = rng.uniform(1990, 2022, rows).round(2)
+        elif kind == "bool":
+            df[column] = rng.random(rows) < 0.5
+        elif column == "Marke":
+            df[column] = rng.choice(MARKEN, rows)
+        elif column in TEXT:
+            df[column] = rng.choice(TEXT[column], rows)
+        else:
+            df[column] = np.char.add(column.lower() + " ", rng.integers(0, 1000, rows).astype(str)).astype(object)
+    df.loc[df.index % 50 == 0, "Verbrauch_l_pro_100km"] = np.nan
+    return df
+
+
+def loadParquet(path):
+    return readDataset(path)
+
+
+def loadFeather(path):
+    return readFeather(path)
+
+
+def loadFeatherArrowStrings(path):
+    return readFeather(path, arrowStrings=True)
+
+
+METHODS = [("Parquet (readDataset)", loadParquet, "parquet"),
+           ("Arrow IPC mmap (readFeather)", loadFeather, "feather"),
+           ("Arrow IPC mmap, string[pyarrow]", loadFeatherArrowStrings, "feather")]
+
+
+def memory():
+    """RSS, PSS und privater Speicher des aktuellen Prozesses in MiB."""
+
+    values = {}
+    with open("/proc/self/smaps_rollup") as smaps:
+        for line in smaps:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return values["Rss"], values["Pss"], values["Private_Clean"] + values["Private_Dirty"]
+
+
+def consumer(load, path, loaded, done, results):
+    before = memory()
+    start = time.perf_counter()
+    df = load(path)
+    #Alle numerischen Spalten einmal lesen, damit die Seiten tatsächlich im Prozess liegen
+    total = sum(float(df[column].sum()) for column in df.columns if pd.api.types.is_numeric_dtype(df[column]))
+    seconds = time.perf_counter() - start
+    #Messen, wenn alle Prozesse geladen haben, damit PSS die gemeinsame Nutzung zeigt
+    loaded.wait()
+    results.put((seconds, before, memory(), total))
+    done.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--consumers", type=int, default=4)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", FutureWarning)
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        parser.error("/proc/self/smaps_rollup ist nicht verfügbar (nur Linux)")
+
+    AutoDF = syntheticClean(args.rows)
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        paths = {"parquet": os.path.join(directory, "AutoDF_clean"),
+                 "feather": os.path.join(directory, "AutoDF_clean.arrow")}
+        writeDataset(AutoDF, paths["parquet"], cleanSchema())
+        writeFeather(AutoDF, paths["feather"])
+        del AutoDF
+        print("%d Zeilen, %d Prozesse, Arrow IPC-Datei %.0f MiB" % (args.rows, args.consumers,
+                                                                   os.path.getsize(paths["feather"]) / 2 ** 20))
+        print("%32s %9s %12s %12s %15s %14s" % ("Verfahren", "Laden ms", "RSS MiB/Proz", "PSS MiB/Proz",
+                                                "privat MiB/Proz", "PSS MiB gesamt"))
+        for name, load, kind in METHODS:
+            loaded, done = context.Barrier(args.consumers + 1), context.Barrier(args.consumers + 1)
+            results = context.Queue()
+            processes = [context.Process(target=consumer, args=(load, paths[kind], loaded, done, results))
+                         for _ in range(args.consumers)]
+            for process in processes:
+                process.start()
+            loaded.wait()
+            measured = [results.get() for _ in processes]
+            done.wait()
+            for process in processes:
+                process.join()
+            assert len({total for *_, total in measured}) == 1
+            #Speicher nach dem Laden abzüglich des Interpreters mit den importierten Modulen
+            rss, pss, private = (np.mean([after[i] - before[i] for _, before, after, _ in measured]) for i in range(3))
+            print("%32s %9.0f %12.1f %12.1f %15.1f %14.1f" % (name, 1000 * np.mean([m[0] for m in measured]), rss,
+                                                            pss, private, pss * args.consumers))
+
+
+if __name__ == "__main__":
+    main()
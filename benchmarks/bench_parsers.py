@@ -0,0 +1,87 @@
+"""Vergleich der Parser-Backends auf den synthetischen Testseiten.
+
+Für jede Seite aus ``fixtures/pages`` wird geprüft, dass alle Backends
+dieselben Datensätze wie der BeautifulSoup-Parser liefern (gleiche Spalten,
+Datentypen und Werte). Anschließend wird die Geschwindigkeit gemessen, für
+die Seiten mit ``__NEXT_DATA__`` zusätzlich JSON gegen DOM::
+
+    python -m benchmarks.bench_parsers --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+from autoscout24.extract import PARSERS, parsePageCarDF
+from autoscout24.nextdata import findNextData
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, "fixtures", "pages")
+
+
+def loadPages(directory=FIXTURES):
+    """Liest alle Testseiten aus *directory* als {Dateiname: HTML}."""
+
+    pages = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".html"):
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                pages[name] = f.read()
+    return pages
+
+
+def records(pageCarDF):
+    """Datensätze inklusive Datentypen, NaN wird als Text verglichen."""
+
+    return list(pageCarDF.columns), list(map(str, pageCarDF.dtypes)), repr(pageCarDF.values.tolist())
+
+
+def checkParity(pages, parser, reference="bs4"):
+    """Gibt die Seiten zurück, auf denen *parser* von *reference* abweicht."""
+
+    return [name for name, html in pages.items()
+            if records(parsePageCarDF(html, parser)) != records(parsePageCarDF(html, reference))]
+
+
+def measure(pages, parser, repeat):
+    """Seiten pro Sekunde des Parsers *parser*."""
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages.values():
+            parsePageCarDF(html, parser)
+    return repeat * len(pages) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--parsers", nargs="+", default=list(PARSERS))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", FutureWarning)
+
+    pages = loadPages()
+    failed = False
+    print("%d Seiten" % len(pages))
+    print("%8s %8s %12s %10s" % ("Parser", "Parität", "Seiten/s", "Faktor"))
+    baseline = None
+    for name in args.parsers:
+        mismatches = checkParity(pages, name)
+        failed = failed or bool(mismatches)
+        rate = measure(pages, name, args.repeat)
+        baseline = baseline or rate
+        print("%8s %8s %12.1f %10.1f" % (name, "ok" if not mismatches else "FEHLER", rate, rate / baseline))
+        for page in mismatches:
+            print("  abweichend: %s" % page)
+
+    withJSON = {name: html for name, html in pages.items() if findNextData(html) is not None}
+    if withJSON and "nextdata" in args.parsers:
+        print("%d von %d Seiten mit __NEXT_DATA__: JSON %.1f Seiten/s, DOM (lxml) %.1f Seiten/s"
+              % (len(withJSON), len(pages), measure(withJSON, "nextdata", args.repeat),
+                 measure(withJSON, "lxml", args.repeat)))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Seiten pro Sekunde des Crawlers in Abhängigkeit von der Anzahl Parse-Prozesse.
+
+Die synthetischen Seiten aus ``fixtures/pages`` werden für jedes
+Erstzulassungsjahr von 1990 bis 2021 über den lokalen ReplayServer
+ausgeliefert, sodass ein kompletter Crawl ohne Netzwerkzugriff läuft::
+
+    python -m benchmarks.bench_pipeline --workers 0 1 2 4
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import warnings
+
+from autoscout24 import Crawler
+from autoscout24.mockserver import ReplayServer
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, "fixtures", "pages")
+YEARS = list(range(1990, 2022))
+
+
+def buildPageDir(target, source="2016"):
+    """Kopiert die Seiten des Jahres *source* für alle Jahre aus YEARS nach *target*."""
+
+    pages = sorted(f for f in os.listdir(FIXTURES) if f.startswith(source + "_"))
+    for freg in YEARS:
+        for name in pages:
+            shutil.copy(os.path.join(FIXTURES, name), os.path.join(target, name.replace(source, str(freg), 1)))
+    return len(pages) * len(YEARS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({0, 1, 2, os.cpu_count() or 1}))
+    parser.add_argument("--latency", type=float, default=0.02, help="Antwortzeit des Servers in Sekunden")
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", FutureWarning)
+
+    with tempfile.TemporaryDirectory() as pageDir:
+        pages = buildPageDir(pageDir)
+        print("%d Seiten, %d CPU-Kerne, Latenz %.0f ms" % (pages, os.cpu_count() or 1, 1000 * args.latency))
+        print("%8s %10s %12s" % ("Parser", "Sekunden", "Seiten/s"))
+        with ReplayServer(pageDir, latency=args.latency) as server:
+            for workers in args.workers:
+                crawler = Crawler(baselink=server.baselink, maxConcurrency=args.concurrency,
+                                  perHostLimit=args.concurrency, parseWorkers=workers)
+                start = time.perf_counter()
+                crawler.crawl(YEARS)
+                seconds = time.perf_counter() - start
+                print("%8d %10.2f %12.1f" % (workers, seconds, crawler.summary.requests / seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Aufbau des AutoDFraw aus synthetischen Datensätzen: RecordBuilder gegen pd.concat.
+
+Wie im Crawl werden die Datensätze seitenweise zu je 20 Fahrzeugen erzeugt.
+Der :class:`~autoscout24.records.RecordBuilder` sammelt alle Seiten
+spaltenweise und erzeugt das Dataframe einmal am Ende; die frühere Variante
+hängt jede Seite mit ``pd.concat`` an das bisherige Dataframe an. Die Zeit pro
+Datensatz bleibt beim RecordBuilder von 1.000 bis 1.000.000 Datensätzen
+konstant::
+
+    python -m benchmarks.bench_records --sizes 1000 10000 100000 1000000
+"""
+
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from autoscout24.extract import PAGE_SIZE
+from autoscout24.fields import COLUMNS
+from autoscout24.records import RecordBuilder
+
+
+def syntheticRecord(rng, i):
+    """Ein Datensatz mit Werten wie auf den Suchergebnisseiten."""
+
+    leasing = rng.random() < 0.1
+    return {"Titel": "Marke%d Modell%d" % (i % 40, i % 300), "Version": "Version %d" % i, "Untertitel": "",
+            "Preis": "€ %d.-" % rng.randint(1000, 90000), "Leasing": leasing, "Standort": "DE-70173 Stuttgart",
+            "km": "%d km" % rng.randint(0, 300000), "Erstzulassung": "%02d/%d" % (rng.randint(1, 12), 1990 + i % 32),
+            "PS": "%d kW (%d PS)" % (100, 136), "Zustand": "Gebraucht", "Fahrzeughalter": "2 Fahrzeughalter",
+            "Getriebe": "Automatik", "Kraftstoff": "Benzin", "Verbrauch_l_pro_100km": "6,1 l/100 km (komb.)",
+            "Emissionen_g_pro_km": "139 g/km (komb.)"}
+
+
+def syntheticPages(n, seed=42):
+    """Liste von Seiten mit insgesamt *n* Datensätzen, je Seite eine Liste von dicts."""
+
+    rng = random.Random(seed)
+    records = [syntheticRecord(rng, i) for i in range(n)]
+    return [records[i:i + PAGE_SIZE] for i in range(0, n, PAGE_SIZE)]
+
+
+def buildRecords(pages):
+    AutoDFraw = RecordBuilder()
+    for page in pages:
+        pageRecords = RecordBuilder()
+        for record in page:
+            pageRecords.append(record)
+        AutoDFraw.extend(pageRecords)
+    return AutoDFraw.toDataFrame()
+
+
+def buildConcat(pages):
+    #Frühere Variante: ein Dataframe je Seite und pd.concat je Seite
+    AutoDFraw = pd.DataFrame()
+    for page in pages:
+        pageCarDF = pd.DataFrame(page, columns=COLUMNS)
+        AutoDFraw = pd.concat([AutoDFraw, pageCarDF], axis=0, ignore_index=True)
+    return AutoDFraw
+
+
+def measure(build, pages):
+    start = time.perf_counter()
+    AutoDFraw = build(pages)
+    return time.perf_counter() - start, AutoDFraw
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--concat-max", type=int, default=50000,
+                        help="größte Anzahl Datensätze für die quadratische concat-Variante")
+    args = parser.parse_args()
+
+    print("%10s %14s %14s %14s %14s" % ("Datensätze", "Builder s", "Builder µs/DS", "concat s", "concat µs/DS"))
+    for n in args.sizes:
+        pages = syntheticPages(n)
+        seconds, AutoDFraw = measure(buildRecords, pages)
+        assert len(AutoDFraw) == n
+        line = "%10d %14.3f %14.2f" % (n, seconds, 1e6 * seconds / n)
+        if n <= args.concat_max:
+            concatSeconds, concatDF = measure(buildConcat, pages)
+            assert concatDF.astype(str).equals(AutoDFraw.astype(str))
+            line += " %14.3f %14.2f" % (concatSeconds, 1e6 * concatSeconds / n)
+        else:
+            line += " %14s %14s" % ("-", "-")
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Crawl mit Seitenarchiv gegen erneutes Parsen aus dem Archiv.
+
+Die synthetischen Seiten aus ``fixtures/pages`` werden für alle
+Erstzulassungsjahre über den lokalen ReplayServer gecrawlt und dabei
+archiviert. Anschließend wird das Archiv mit
+:func:`~autoscout24.archive.replayArchive` ohne Netzwerk erneut verarbeitet
+und das Ergebnis mit dem Crawl verglichen::
+
+    python -m benchmarks.bench_replay --latency 0.2 --workers 1 4
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import warnings
+
+from autoscout24 import Crawler, PageArchive, replayArchive
+from autoscout24.mockserver import ReplayServer
+
+from .bench_pipeline import YEARS, buildPageDir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.2, help="Antwortzeit des Servers in Sekunden")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, os.cpu_count() or 1}))
+    parser.add_argument("--parser", default="lxml")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", FutureWarning)
+
+    with tempfile.TemporaryDirectory() as pageDir, tempfile.TemporaryDirectory() as archiveDir:
+        pages = buildPageDir(pageDir)
+        with ReplayServer(pageDir, latency=args.latency) as server, PageArchive(archiveDir) as archive:
+            crawler = Crawler(baselink=server.baselink, maxConcurrency=args.concurrency,
+                              perHostLimit=args.concurrency, parser=args.parser, archive=archive)
+            start = time.perf_counter()
+            AutoDFraw = crawler.crawl(YEARS)
+            crawlSeconds = time.perf_counter() - start
+            size = os.path.getsize(archive.dataPath)
+
+        print("%d Seiten, Archiv %.1f MB" % (pages, size / 1024 ** 2))
+        print("%-24s %10s" % ("Variante", "Sekunden"))
+        print("%-24s %10.2f" % ("Crawl", crawlSeconds))
+        for workers in args.workers:
+            start = time.perf_counter()
+            replayed = replayArchive(archiveDir, parser=args.parser, workers=workers)
+            seconds = time.perf_counter() - start
+            assert replayed.astype(str).equals(AutoDFraw.astype(str))
+            print("%-24s %10.2f" % ("Replay, %d Prozesse" % workers, seconds))
+
+
+if __name__ == "__main__":
+    main()
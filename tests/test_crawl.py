@@ -0,0 +1,72 @@
+"""Der nebenläufige Crawl liefert dasselbe AutoDFraw wie die sequentielle Schleife des Notebooks."""
+
+import asyncio
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from autoscout24 import Crawler, CrawlerSession, buildURL, extractPageCarDF
+from autoscout24.mockserver import MockServer, ReplayServer
+from autoscout24.synthetic import SyntheticPages
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, "fixtures", "pages")
+FREG_LIST = [2014, 2015, 2016]
+PAGES = 5
+
+
+@pytest.fixture(scope="module")
+def server():
+    with ReplayServer(FIXTURES) as server:
+        yield server
+
+
+def sequentialAutoDF(baselink):
+    #wie die Schleife im Notebook: jede Seite einzeln laden und anhängen
+    session = CrawlerSession()
+    frames = [extractPageCarDF(buildURL(freg, page, baselink), session=session)
+              for freg in FREG_LIST for page in range(PAGES)]
+    #leere Seiten würden beim concat Leasing zu float machen
+    return pd.concat([frame for frame in frames if not frame.empty], ignore_index=True)
+
+
+@pytest.mark.parametrize("parseWorkers", [0, 2])
+def test_crawlMatchesSequentialExtract(server, parseWorkers):
+    AutoDFraw = Crawler(baselink=server.baselink, parseWorkers=parseWorkers).crawl(FREG_LIST, pages=PAGES)
+
+    pd.testing.assert_frame_equal(AutoDFraw, sequentialAutoDF(server.baselink))
+
+
+@pytest.mark.parametrize("parseWorkers", [0, 2])
+def test_closingIterListingsStopsTheCrawl(caplog, capfd, parseWorkers):
+    with MockServer(SyntheticPages(listings=400), latency=0.05) as server:
+        crawler = Crawler(baselink=server.baselink, parseWorkers=parseWorkers)
+        listings = crawler.iterListings(range(1990, 2022))
+        for _, records in zip(range(3), listings):
+            assert not records.empty
+        listings.close()
+        requests = server.requests
+
+    assert requests < 32 * 20
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith("asyncio")]
+    #keine Fehler aus Requests oder Parsern, die nach dem Beenden der Executoren noch liefen
+    assert not [record for record in caplog.records if record.name == "asyncio"]
+    assert capfd.readouterr().err == ""
+
+
+def test_failingPageCancelsRemainingPages():
+    class Stop(Exception):
+        pass
+
+    async def onPage(freg, page, records):
+        raise Stop()
+
+    async def crawl(crawler):
+        with pytest.raises(Stop):
+            await crawler.crawlAsync(range(1990, 2022), onPage=onPage)
+        #nach dem Fehler laufen keine Requests oder Parser des Crawls weiter
+        return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    with MockServer(SyntheticPages(listings=400), latency=0.05) as server:
+        assert asyncio.run(crawl(Crawler(baselink=server.baselink))) == []
@@ -0,0 +1,89 @@
+"""Verwaltetes Schema von autoscout24cars: Migration, Upsert und inkrementeller Crawl.
+
+Benötigt eine PostgreSQL-Datenbank, deren SQLAlchemy-URL in der
+Umgebungsvariable AUTOSCOUT24_DB steht; ohne sie werden die Tests übersprungen.
+"""
+
+import os
+
+import pandas as pd
+import pytest
+import sqlalchemy
+
+from autoscout24 import Crawler
+from autoscout24.db import copyLoad, crawlIncremental, migrateSchema, upsertLoad
+from autoscout24.mockserver import ReplayServer
+
+URI = os.environ.get("AUTOSCOUT24_DB")
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, "fixtures", "pages")
+TABLE = "test_autoscout24cars"
+
+pytestmark = pytest.mark.skipif(not URI, reason="AUTOSCOUT24_DB ist nicht gesetzt")
+
+
+@pytest.fixture(scope="module")
+def server():
+    with ReplayServer(FIXTURES) as server:
+        yield server
+
+
+@pytest.fixture()
+def engine():
+    engine = sqlalchemy.create_engine(URI)
+    yield engine
+    with engine.begin() as conn:
+        conn.execute(sqlalchemy.text('DROP TABLE IF EXISTS "%s"' % TABLE))
+    engine.dispose()
+
+
+def query(engine, sql):
+    with engine.connect() as conn:
+        return conn.execute(sqlalchemy.text(sql)).fetchall()
+
+
+def test_migrateSchemaPartitionsAndDeduplicates(engine, server):
+    AutoDFraw = Crawler(baselink=server.baselink).crawl([2014, 2016])
+    #ein Angebot doppelt, wie nach mehreren Crawls mit to_sql
+    copyLoad(engine, pd.concat([AutoDFraw, AutoDFraw.iloc[:1]], ignore_index=True), TABLE)
+
+    summary = migrateSchema(engine, TABLE)
+    assert summary.migrated
+    assert summary.rows == len(AutoDFraw)
+    assert summary.duplicates == 1
+    assert not migrateSchema(engine, TABLE).migrated
+    (rows, years, withoutBrand), = query(engine, 'SELECT COUNT(*), COUNT(DISTINCT "Jahr"), '
+                                                 'COUNT(*) FILTER (WHERE "Marke" IS NULL) FROM "%s"' % TABLE)
+    assert (rows, years, withoutBrand) == (len(AutoDFraw), 2, 0)
+
+
+def test_upsertLoadUpdatesChangedListings(engine, server):
+    AutoDFraw = Crawler(baselink=server.baselink).crawl([2014])
+    copyLoad(engine, AutoDFraw, TABLE)
+    migrateSchema(engine, TABLE)
+
+    recrawl = AutoDFraw.copy()
+    recrawl.loc[0, "Preis"] = "€ 1.234,-"
+    summary = upsertLoad(engine, recrawl, TABLE)
+    assert (summary.inserted, summary.updated, summary.unchanged) == (0, 1, len(AutoDFraw) - 1)
+    assert query(engine, 'SELECT "Preis_EUR" FROM "%s" WHERE listing_id = \'%s\''
+                 % (TABLE, recrawl.loc[0, "listing_id"])) == [(1234,)]
+
+
+def test_crawlIncrementalOnMigratedTable(engine, server):
+    first = Crawler(baselink=server.baselink).crawl([2014])
+    copyLoad(engine, first, TABLE)
+    migrateSchema(engine, TABLE)
+    with engine.begin() as conn:
+        conn.execute(sqlalchemy.text('UPDATE "%s" SET "Preis" = \'€ 1,-\' WHERE "index" = 0' % TABLE))
+
+    _, summary = crawlIncremental(engine, [2014, 2015, 2016], baselink=server.baselink, table=TABLE)
+    expected = Crawler(baselink=server.baselink).crawl([2014, 2015, 2016])
+    assert (summary.inserted, summary.updated) == (len(expected) - len(first), 1)
+    (rows, listings, withoutYear, withoutBrand, withoutTime), = query(
+        engine, 'SELECT COUNT(*), COUNT(DISTINCT listing_id), COUNT(*) FILTER (WHERE "Jahr" = 0), '
+                'COUNT(*) FILTER (WHERE "Marke" IS NULL), COUNT(*) FILTER (WHERE crawled_at IS NULL) FROM "%s"'
+                % TABLE)
+    assert (rows, listings, withoutYear, withoutBrand, withoutTime) == (len(expected), len(expected), 0, 0, 0)
+    #Preis_EUR folgt dem aktualisierten Preis
+    assert query(engine, 'SELECT "Preis", "Preis_EUR" FROM "%s" WHERE "index" = 0' % TABLE) == [
+        (first.loc[0, "Preis"], int(first.loc[0, "Preis"].replace(".", "").strip("€ ,-")))]
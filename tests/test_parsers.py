@@ -0,0 +1,50 @@
+"""Die schnellen Parser lxml und nextdata liefern dieselben Datensätze wie BeautifulSoup."""
+
+import os
+
+import pandas as pd
+import pytest
+
+from autoscout24.extract import parsePageCarDF
+from autoscout24.nextdata import findNextData, parseNextDataRecords
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, "fixtures")
+
+
+def readPage(page):
+    with open(os.path.join(FIXTURES, page), encoding="utf-8") as f:
+        return f.read()
+
+
+PAGES = [os.path.join(directory, name) for directory in ("pages", "leasing", "missing")
+         for name in sorted(os.listdir(os.path.join(FIXTURES, directory))) if name.endswith(".html")]
+
+
+@pytest.mark.parametrize("parser", ["lxml", "nextdata"])
+@pytest.mark.parametrize("page", PAGES)
+def test_parserMatchesSoup(page, parser):
+    pytest.importorskip("lxml")
+    html = readPage(page)
+
+    pageCarDF = parsePageCarDF(html, parser)
+    assert not pageCarDF.empty
+    pd.testing.assert_frame_equal(pageCarDF, parsePageCarDF(html, "bs4"))
+
+
+@pytest.mark.parametrize("page", [page for page in PAGES if findNextData(readPage(page)) is not None])
+def test_nextDataMatchesSoup(page):
+    #nur das JSON, ohne Rückfall auf den DOM
+    html = readPage(page)
+
+    pd.testing.assert_frame_equal(parseNextDataRecords(html).toDataFrame(), parsePageCarDF(html, "bs4"))
+
+
+@pytest.mark.parametrize("parser", ["bs4", "lxml", "nextdata"])
+def test_listingWithoutPriceIsAnError(parser):
+    #ein Angebot ohne Preis und ohne Leasingrate, im DOM und im __NEXT_DATA__
+    if parser == "lxml":
+        pytest.importorskip("lxml")
+    html = readPage(os.path.join("noprice", "2012_0.html"))
+
+    with pytest.raises(AttributeError, match="Weder Preis noch Leasingrate"):
+        parsePageCarDF(html, parser)
@@ -0,0 +1,65 @@
+"""Der AimdLimiter reduziert die Nebenläufigkeit, sobald der Server drosselt, und hält Retry-After ein."""
+
+import asyncio
+import time
+
+import pytest
+import requests
+
+from autoscout24 import AimdLimiter, Crawler, CrawlerSession
+from autoscout24.mockserver import MockServer
+from autoscout24.synthetic import SyntheticPages
+
+
+def test_limiterBacksOffUnderThrottling():
+    limiter = AimdLimiter(initial=8, maxLimit=8)
+    with MockServer(SyntheticPages(listings=200), latency=0.05, maxInFlight=2, retryAfter=1) as server:
+        crawler = Crawler(baselink=server.baselink, maxConcurrency=8, perHostLimit=8,
+                          session=CrawlerSession(backoff=0.01), limiter=limiter)
+        AutoDFraw = crawler.crawl(range(2010, 2016), pages=10)
+        throttled = server.throttled
+
+    assert throttled > 0
+    assert not crawler.summary.failed
+    assert len(AutoDFraw) == 6 * 200
+    metrics = crawler.metrics()
+    assert limiter.decreases > 0
+    assert metrics["concurrency"] < 8
+    assert metrics["throttled"] > 0
+    assert 0 < metrics["p50"] <= metrics["p95"]
+
+
+def test_sessionHonoursRetryAfter():
+    #jeder Request wird gedrosselt; ohne Retry-After würde die Session nur 10 ms warten
+    session = CrawlerSession(retries=1, backoff=0.01)
+    with MockServer(maxInFlight=0, retryAfter=1) as server:
+        start = time.perf_counter()
+        with pytest.raises(requests.HTTPError):
+            session.fetch(server.baselink + "2016&fregto=2016&page=0")
+        seconds = time.perf_counter() - start
+
+    assert session.retryCount == 1
+    assert seconds >= 1
+
+
+def test_limiterPausesForRetryAfter():
+    limiter = AimdLimiter(initial=4)
+    limiter.onThrottle(retryAfter=0.3)
+
+    async def acquire():
+        start = time.perf_counter()
+        async with limiter:
+            return time.perf_counter() - start
+
+    assert asyncio.run(acquire()) >= 0.3
+    assert limiter.metrics()["throttled"] == 1
+
+
+def test_limiterIncreasesAdditively():
+    limiter = AimdLimiter(initial=4, maxLimit=8)
+    for _ in range(40):
+        limiter.onSuccess(0.05)
+    assert limiter.concurrency > 4
+    before = limiter.limit
+    limiter.onThrottle()
+    assert limiter.limit == before * limiter.decrease
@@ -0,0 +1,107 @@
+"""Doppelte Angebote werden übersprungen, ohne dass nach einem Abbruch Angebote fehlen."""
+
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from autoscout24 import Crawler, CrawlJournal, PageArchive, SeenStore, replayArchive
+from autoscout24.mockserver import MockServer, ReplayServer
+from autoscout24.synthetic import SyntheticPages
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, "fixtures", "pages")
+FREG_LIST = [2014, 2015, 2016]
+
+
+class Crash(Exception):
+    pass
+
+
+class CrashingJournal(CrawlJournal):
+    """Journal, das beim Speichern der *crashAt*-ten Seite abbricht, nachdem die Seite geparst wurde."""
+
+    def __init__(self, path, crashAt):
+        super().__init__(path)
+        self.crashAt = crashAt
+        self.recorded = 0
+
+    def record(self, freg, page, records, resultCount=None, listings=None):
+        self.recorded += 1
+        if self.recorded == self.crashAt:
+            raise Crash()
+        super().record(freg, page, records, resultCount, listings)
+
+
+class UncountedPages(SyntheticPages):
+    """Synthetische Seiten ohne Anzahl Suchergebnisse, der Crawl muss also weiterblättern."""
+
+    def page(self, freg, page):
+        return super().page(freg, page).replace(" Angebote für", " Gebrauchtwagen für")
+
+
+@pytest.fixture(scope="module")
+def server():
+    with ReplayServer(FIXTURES) as server:
+        yield server
+
+
+@pytest.fixture()
+def duplicatePages(tmp_path):
+    #2017 wiederholt die Seiten von 2016, alle Angebote dort sind also doppelt
+    for name in os.listdir(FIXTURES):
+        shutil.copy(os.path.join(FIXTURES, name), tmp_path)
+        if name.startswith("2016_"):
+            shutil.copy(os.path.join(FIXTURES, name), tmp_path / name.replace("2016", "2017"))
+    with ReplayServer(str(tmp_path)) as server:
+        yield server
+
+
+@pytest.mark.parametrize("crashAt", [1, 3, 6])
+def test_resumeAfterCrashKeepsAllListings(server, tmp_path, crashAt):
+    expected = Crawler(baselink=server.baselink).crawl(FREG_LIST)
+
+    seen = SeenStore(str(tmp_path / "seen.sqlite"))
+    with pytest.raises(Crash):
+        Crawler(baselink=server.baselink, journal=CrashingJournal(str(tmp_path / "journal.sqlite"), crashAt),
+                seen=seen).crawl(FREG_LIST)
+    seen.close()
+
+    with SeenStore(str(tmp_path / "seen.sqlite")) as seen:
+        resumed = Crawler(baselink=server.baselink, journal=CrawlJournal(str(tmp_path / "journal.sqlite")),
+                          seen=seen).crawl(FREG_LIST)
+    assert len(resumed) == len(expected)
+    assert sorted(resumed["listing_id"]) == sorted(expected["listing_id"])
+
+
+@pytest.mark.parametrize("known", [None, {}])
+def test_pageOfSeenListingsDoesNotEndPagination(tmp_path, known):
+    #Seite 0 besteht nur aus bereits gesehenen Angeboten, die Seiten danach müssen trotzdem geladen werden
+    with MockServer(UncountedPages(listings=60)) as server:
+        complete = Crawler(baselink=server.baselink).crawl([2016])
+        with SeenStore(str(tmp_path / "seen.sqlite")) as seen:
+            first = Crawler(baselink=server.baselink, seen=seen).crawl([2016], pages=1)
+            crawler = Crawler(baselink=server.baselink, seen=seen, known=known)
+            rest = crawler.crawl([2016])
+
+    assert len(complete) == 60
+    assert crawler.summary.duplicates == len(first) == 20
+    assert sorted(rest["listing_id"]) == sorted(set(complete["listing_id"]) - set(first["listing_id"]))
+
+
+def test_duplicateListingsAreSkipped(duplicatePages):
+    crawler = Crawler(baselink=duplicatePages.baselink)
+    AutoDFraw = crawler.crawl(FREG_LIST + [2017])
+
+    assert AutoDFraw["listing_id"].is_unique
+    assert len(AutoDFraw) == len(Crawler(baselink=duplicatePages.baselink).crawl(FREG_LIST))
+    assert crawler.summary.duplicates > 0
+
+
+def test_replayMatchesCrawl(duplicatePages, tmp_path):
+    pytest.importorskip("zstandard")
+    with PageArchive(str(tmp_path / "archive")) as archive:
+        AutoDFraw = Crawler(baselink=duplicatePages.baselink, archive=archive).crawl(FREG_LIST + [2017])
+
+    replayed = replayArchive(str(tmp_path / "archive"), parser="bs4", workers=1)
+    pd.testing.assert_frame_equal(replayed, AutoDFraw)
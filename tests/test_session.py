@@ -0,0 +1,49 @@
+"""Die Messung von DNS und Verbindungsaufbau ändert nicht, wie Verbindungen aufgebaut werden."""
+
+import os
+import socket
+
+import pytest
+from requests.adapters import HTTPAdapter
+
+from autoscout24 import CrawlerSession, CrawlMetrics
+from autoscout24.mockserver import ReplayServer
+from autoscout24.session import TimedHTTPAdapter
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, "fixtures", "pages")
+HOST = "autoscout24.test"
+
+
+@pytest.fixture()
+def server(monkeypatch):
+    #die erste Adresse von HOST lehnt Verbindungen ab, erst die zweite erreicht den Server
+    getaddrinfo = socket.getaddrinfo
+
+    def resolve(host, port, *args, **kwargs):
+        if host == HOST:
+            return getaddrinfo("127.0.0.2", port, *args, **kwargs) + getaddrinfo("127.0.0.1", port, *args, **kwargs)
+        return getaddrinfo(host, port, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", resolve)
+    with ReplayServer(FIXTURES) as server:
+        yield server
+
+
+@pytest.mark.parametrize("metrics", [None, CrawlMetrics()])
+def test_fetchTriesAllResolvedAddresses(server, metrics):
+    session = CrawlerSession(retries=0, metrics=metrics)
+    result = session.fetch("http://%s:%d/lst?fregfrom=2016&fregto=2016&page=0" % (HOST, server.port))
+
+    assert result.status == 200
+    if metrics is not None:
+        assert metrics["dns_seconds"].count == 1
+        assert metrics["connect_seconds"].count == 1
+
+
+def test_timedAdapterOnlyWithMetrics():
+    session = CrawlerSession()
+    assert type(session.adapter) is HTTPAdapter
+    session.metrics = CrawlMetrics()
+    assert type(session.adapter) is TimedHTTPAdapter
+    session.metrics = None
+    assert type(session.adapter) is HTTPAdapter